@@ -0,0 +1,82 @@
+"""
+Benchmark de tempo de importação do tuba_monitor (python -X importtime).
+
+Importa o módulo em um processo novo algumas vezes, reporta o tempo cumulativo
+(mediana) e falha (código de saída 1) se:
+- o tempo passar do limite informado; ou
+- alguma biblioteca de interface for carregada na importação, o que quebraria
+  o carregamento preguiçoso (e a importação em servidores sem Windows/GUI).
+
+Uso:
+    python benchmarks/bench_importacao.py [--repeticoes 5] [--limite-ms 250] [--top 10]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Não podem ser importados junto com o módulo: são carregados sob demanda
+PROIBIDOS = ("tkinter", "win10toast", "pystray", "PIL", "winsound")
+
+LINHA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def medir_uma_vez():
+    """
+    Returns:
+        tuple: (tempo cumulativo do tuba_monitor em µs, {módulo: (self µs, cumulativo µs)})
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import tuba_monitor"],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"Falha ao importar tuba_monitor (código {proc.returncode})")
+    modulos = {}
+    for linha in proc.stderr.splitlines():
+        m = LINHA.match(linha)
+        if m:
+            modulos[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+    return modulos["tuba_monitor"][1], modulos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--limite-ms", type=float, default=250.0, help="tempo máximo aceitável (mediana)")
+    parser.add_argument("--top", type=int, default=10, help="quantos módulos mais lentos listar")
+    args = parser.parse_args()
+
+    tempos = []
+    modulos = {}
+    for _ in range(args.repeticoes):
+        total, modulos = medir_uma_vez()
+        tempos.append(total)
+    mediana_ms = statistics.median(tempos) / 1000
+
+    print(f"tuba_monitor: mediana {mediana_ms:.1f} ms em {args.repeticoes} importação(ões) "
+          f"(min {min(tempos) / 1000:.1f} ms, max {max(tempos) / 1000:.1f} ms)")
+    print("Módulos com maior tempo próprio (última execução):")
+    for nome, (proprio, cumulativo) in sorted(modulos.items(), key=lambda m: -m[1][0])[:args.top]:
+        print(f"  {proprio / 1000:8.1f} ms  {nome}")
+
+    falhou = False
+    carregados = [n for n in modulos if n.split(".")[0] in PROIBIDOS]
+    if carregados:
+        print(f"ERRO: bibliotecas de interface importadas no carregamento: {sorted(carregados)}")
+        falhou = True
+    if mediana_ms > args.limite_ms:
+        print(f"ERRO: importação acima do limite ({mediana_ms:.1f} ms > {args.limite_ms:.1f} ms)")
+        falhou = True
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Benchmark do pipeline completo: iniciar_monitor em uma pasta temporária, com
+notificador e som falsos, sob cargas controladas.
+
+Cargas:
+- goteira: arquivos pequenos em ritmo constante;
+- rajada:  milhares de arquivos criados de uma vez;
+- grandes: arquivos grandes escritos devagar, em pedaços;
+- arvore:  arquivos espalhados em uma árvore profunda (pasta recursiva).
+
+Para cada carga mede, por arquivo:
+- evento:      início da escrita -> primeiro evento do watchdog;
+- pronto:      fim da escrita -> arquivo estável (arquivo_pronto);
+- notificacao: fim da escrita -> toast exibido (notificar_evento).
+
+Também mede arquivos/s, CPU do processo e RSS máximo. Roda sem interface
+(modo headless) e funciona no Linux.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--cargas goteira,rajada,grandes,arvore] [--json saida.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tuba_monitor
+
+CARGAS = ("goteira", "rajada", "grandes", "arvore")
+
+
+class NotificadorFalso:
+    """Só conta as chamadas; não exibe nada."""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def notificar(self, titulo, mensagem, duracao):
+        self.chamadas += 1
+
+
+class SomFalso:
+    def tocar(self, dados):
+        pass
+
+    def interromper(self):
+        pass
+
+
+class Cronometro:
+    """Instantes (time.time) de cada arquivo em cada etapa do pipeline."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.escrita = {}     # caminho -> (início, fim)
+        self.evento = {}
+        self.pronto = {}
+        self.notificado = {}
+        self.esperados = None  # definido quando o gerador termina
+        self.todos = threading.Event()
+
+    def escrito(self, caminho, inicio, fim):
+        with self.lock:
+            self.escrita[caminho] = (inicio, fim)
+
+    def marcar_pronto(self, caminho, detectado_em):
+        agora = time.time()
+        with self.lock:
+            self.pronto.setdefault(caminho, agora)
+            if detectado_em is not None:
+                self.evento.setdefault(caminho, detectado_em)
+
+    def marcar_notificado(self, evento):
+        agora = time.time()
+        with self.lock:
+            for e in [evento] + evento.membros:
+                self.notificado.setdefault(e.caminho, agora)
+            if self.esperados is not None and len(self.notificado) >= self.esperados:
+                self.todos.set()
+
+
+def instrumentar(cronometro):
+    """Intercepta arquivo_pronto e notificar_evento (antes de iniciar_monitor)."""
+    original_pronto = tuba_monitor.arquivo_pronto
+    original_notificar = tuba_monitor.notificar_evento
+
+    def arquivo_pronto(caminho, tamanho, rotulo=None, detectado_em=None):
+        cronometro.marcar_pronto(caminho, detectado_em)
+        original_pronto(caminho, tamanho, rotulo, detectado_em)
+
+    def notificar_evento(evento):
+        original_notificar(evento)
+        cronometro.marcar_notificado(evento)
+
+    tuba_monitor.arquivo_pronto = arquivo_pronto
+    tuba_monitor.notificar_evento = notificar_evento
+    return lambda: (setattr(tuba_monitor, "arquivo_pronto", original_pronto),
+                    setattr(tuba_monitor, "notificar_evento", original_notificar))
+
+
+def escrever(cronometro, caminho, tamanho=4, pedaco=None, pausa=0.0):
+    """Escreve um arquivo (em pedaços, com pausas, se pedido) e registra os instantes."""
+    inicio = time.time()
+    with open(caminho, "wb") as f:
+        if pedaco is None:
+            f.write(b"x" * tamanho)
+        else:
+            escritos = 0
+            while escritos < tamanho:
+                n = min(pedaco, tamanho - escritos)
+                f.write(b"x" * n)
+                f.flush()
+                escritos += n
+                if escritos < tamanho:
+                    time.sleep(pausa)
+    cronometro.escrito(caminho, inicio, time.time())
+
+
+def carga_goteira(pasta, cronometro, args):
+    intervalo = 1.0 / args.goteira_ritmo
+    for i in range(args.goteira_arquivos):
+        escrever(cronometro, os.path.join(pasta, f"goteira_{i:05d}.pdf"))
+        time.sleep(intervalo)
+    return args.goteira_arquivos
+
+
+def carga_rajada(pasta, cronometro, args):
+    total = 0
+    for r in range(args.rajadas):
+        for i in range(args.rajada_arquivos):
+            escrever(cronometro, os.path.join(pasta, f"rajada_{r:02d}_{i:05d}.pdf"))
+        total += args.rajada_arquivos
+        if r + 1 < args.rajadas:
+            time.sleep(args.rajada_intervalo)
+    return total
+
+
+def carga_grandes(pasta, cronometro, args):
+    tamanho = int(args.grandes_mb * 1024 * 1024)
+    pedaco = 256 * 1024
+    # Pausa entre pedaços para o arquivo levar ~grandes_segundos para ser escrito
+    pausa = args.grandes_segundos / max(1, tamanho // pedaco)
+    threads = [
+        threading.Thread(
+            target=escrever,
+            args=(cronometro, os.path.join(pasta, f"grande_{i:02d}.pdf"), tamanho, pedaco, pausa),
+        )
+        for i in range(args.grandes_arquivos)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return args.grandes_arquivos
+
+
+def carga_arvore(pasta, cronometro, args):
+    total = 0
+    for ramo in range(args.arvore_ramos):
+        atual = os.path.join(pasta, f"ramo_{ramo:02d}")
+        for nivel in range(args.arvore_profundidade):
+            atual = os.path.join(atual, f"nivel_{nivel:02d}")
+            os.makedirs(atual, exist_ok=True)
+            for i in range(args.arvore_por_nivel):
+                escrever(cronometro, os.path.join(atual, f"pedido_{i:03d}.pdf"))
+                total += 1
+    return total
+
+
+GERADORES = {
+    "goteira": carga_goteira,
+    "rajada": carga_rajada,
+    "grandes": carga_grandes,
+    "arvore": carga_arvore,
+}
+
+
+def percentis(valores):
+    if not valores:
+        return None
+    valores = sorted(valores)
+
+    def p(q):
+        return round(1000 * valores[min(len(valores) - 1, int(q * len(valores)))], 1)
+
+    return {"p50_ms": p(0.50), "p90_ms": p(0.90), "p99_ms": p(0.99), "max_ms": round(1000 * valores[-1], 1)}
+
+
+def rss_maximo_mb():
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return round(maximo / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def preparar_ambiente(base):
+    """Aponta todos os arquivos do TUBA para a pasta temporária e instala os backends falsos."""
+    tuba_monitor.CONFIG_PATH = os.path.join(base, "config.json")
+    tuba_monitor.INDICE_PATH = os.path.join(base, "tuba_indice.tsv")
+    tuba_monitor.INDICE_DIARIO_PATH = os.path.join(base, "tuba_indice.diario.tsv")
+    tuba_monitor.DIARIO_PATH = os.path.join(base, "tuba_pedidos.db")
+    tuba_monitor.CONTADORES_PATH = os.path.join(base, "tuba_contadores.json")
+    tuba_monitor.METRICAS_PATH = os.path.join(base, "tuba_metricas.json")
+    tuba_monitor.DUPLICADOS_PATH = os.path.join(base, "tuba_duplicados.tsv")
+    tuba_monitor.SAIDA_PATH = os.path.join(base, "tuba_saida.db")
+    tuba_monitor.HUB_ESTADO_PATH = os.path.join(base, "tuba_hub.json")
+    tuba_monitor.modo_headless = True
+    notificador = NotificadorFalso()
+    tuba_monitor._notificador = notificador
+    tuba_monitor._reprodutor = tuba_monitor.ReprodutorSom(SomFalso(), intervalo_minimo=0)
+    return notificador
+
+
+def executar_carga(nome, base, args):
+    pasta = os.path.join(base, nome)
+    os.makedirs(pasta)
+    with open(tuba_monitor.CONFIG_PATH, "w", encoding="utf-8") as f:
+        json.dump({
+            "pastas": [{"caminho": pasta, "recursivo": nome == "arvore", "rotulo": nome}],
+            "metricas": {"porta": 0, "intervalo_instantaneo": 0},
+        }, f)
+    # O TUBA guarda o config.json em memória: relê o arquivo desta carga
+    tuba_monitor.configuracao.recarregar()
+
+    cronometro = Cronometro()
+    restaurar = instrumentar(cronometro)
+    entradas = tuba_monitor.pastas_da_config(tuba_monitor.ler_config())
+    if not tuba_monitor.iniciar_monitor(entradas):
+        raise RuntimeError(f"iniciar_monitor falhou para {pasta}")
+    try:
+        # Deixa a recuperação inicial e o supervisor assentarem
+        time.sleep(1.0)
+        cpu_inicio = time.process_time()
+        inicio = time.time()
+        total = GERADORES[nome](pasta, cronometro, args)
+        with cronometro.lock:
+            cronometro.esperados = total
+            if len(cronometro.notificado) >= total:
+                cronometro.todos.set()
+        cronometro.todos.wait(args.timeout)
+        fim = max(cronometro.notificado.values(), default=time.time())
+        cpu = time.process_time() - cpu_inicio
+    finally:
+        tuba_monitor.parar_monitor()
+        restaurar()
+
+    with cronometro.lock:
+        latencia_evento = [cronometro.evento[c] - e[0] for c, e in cronometro.escrita.items() if c in cronometro.evento]
+        latencia_pronto = [cronometro.pronto[c] - e[1] for c, e in cronometro.escrita.items() if c in cronometro.pronto]
+        latencia_notif = [cronometro.notificado[c] - e[1] for c, e in cronometro.escrita.items()
+                          if c in cronometro.notificado]
+        notificados = len(cronometro.notificado)
+    duracao = max(fim - inicio, 1e-9)
+    return {
+        "carga": nome,
+        "arquivos": total,
+        "notificados": notificados,
+        "perdidos": total - notificados,
+        "duracao_s": round(duracao, 3),
+        "arquivos_por_s": round(notificados / duracao, 1),
+        "cpu_s": round(cpu, 3),
+        "rss_max_mb": rss_maximo_mb(),
+        "latencia_evento": percentis(latencia_evento),
+        "latencia_pronto": percentis(latencia_pronto),
+        "latencia_notificacao": percentis(latencia_notif),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cargas", default=",".join(CARGAS), help="lista separada por vírgulas")
+    parser.add_argument("--goteira-arquivos", type=int, default=50)
+    parser.add_argument("--goteira-ritmo", type=float, default=5.0, help="arquivos por segundo")
+    parser.add_argument("--rajada-arquivos", type=int, default=1000)
+    parser.add_argument("--rajadas", type=int, default=1)
+    parser.add_argument("--rajada-intervalo", type=float, default=5.0, help="segundos entre rajadas")
+    parser.add_argument("--grandes-arquivos", type=int, default=4)
+    parser.add_argument("--grandes-mb", type=float, default=20.0)
+    parser.add_argument("--grandes-segundos", type=float, default=5.0, help="tempo de escrita de cada arquivo")
+    parser.add_argument("--arvore-ramos", type=int, default=4)
+    parser.add_argument("--arvore-profundidade", type=int, default=10)
+    parser.add_argument("--arvore-por-nivel", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0, help="espera máxima pelas notificações de uma carga")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    cargas = [c.strip() for c in args.cargas.split(",") if c.strip()]
+    desconhecidas = [c for c in cargas if c not in GERADORES]
+    if desconhecidas:
+        parser.error(f"cargas desconhecidas: {desconhecidas} (disponíveis: {', '.join(CARGAS)})")
+
+    base = tempfile.mkdtemp(prefix="tuba_bench_pipeline_")
+    resultados = []
+    try:
+        notificador = preparar_ambiente(base)
+        for nome in cargas:
+            print(f"[{nome}] executando...")
+            resultado = executar_carga(nome, base, args)
+            resultados.append(resultado)
+            print(f"[{nome}] {json.dumps(resultado, ensure_ascii=False)}")
+        print(f"Toasts exibidos (inclui início/parada): {notificador.chamadas}")
+    finally:
+        tuba_monitor.encerrar_diario()
+        tuba_monitor.encerrar_metricas()
+        shutil.rmtree(base, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "plataforma": sys.platform,
+                "argumentos": vars(args),
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
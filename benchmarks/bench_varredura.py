@@ -0,0 +1,126 @@
+"""
+Benchmark: backend nativo (watchdog Observer) x backend de varredura.
+
+Cria uma pasta temporária com N arquivos, agenda-a em cada backend e mede:
+- CPU consumida pelo processo com a pasta ociosa;
+- latência de detecção (criação do arquivo -> on_created no Handler).
+
+Uso:
+    python benchmarks/bench_varredura.py [--arquivos 50000] [--ocioso 10] [--amostras 20] [--json saida.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+import tuba_monitor
+
+
+class HandlerCronometro(FileSystemEventHandler):
+    """Registra o instante em que cada arquivo de amostra foi visto."""
+
+    def __init__(self):
+        super().__init__()
+        self.vistos = {}
+        self.evento = threading.Event()
+
+    def on_created(self, event):
+        nome = os.path.basename(event.src_path)
+        if nome.startswith("amostra_") and nome not in self.vistos:
+            self.vistos[nome] = time.perf_counter()
+            self.evento.set()
+
+
+def popular(pasta, quantidade):
+    for i in range(quantidade):
+        with open(os.path.join(pasta, f"historico_{i:06d}.pdf"), "wb") as f:
+            f.write(b"%PDF")
+
+
+def medir(nome_backend, observador, pasta, ocioso, amostras):
+    handler = HandlerCronometro()
+    observador.schedule(handler, pasta, recursive=False)
+    observador.start()
+    try:
+        # Dá tempo para a primeira listagem (varredura) antes de medir
+        time.sleep(2)
+
+        cpu_inicio = time.process_time()
+        time.sleep(ocioso)
+        cpu_ocioso = time.process_time() - cpu_inicio
+
+        latencias = []
+        for i in range(amostras):
+            nome = f"amostra_{i:03d}.pdf"
+            handler.evento.clear()
+            criado_em = time.perf_counter()
+            with open(os.path.join(pasta, nome), "wb") as f:
+                f.write(b"%PDF")
+            limite = time.monotonic() + 60
+            while nome not in handler.vistos and time.monotonic() < limite:
+                handler.evento.wait(0.05)
+            if nome in handler.vistos:
+                latencias.append(handler.vistos[nome] - criado_em)
+            # Intervalo irregular entre chegadas, como na operação real
+            time.sleep(0.5 + (i % 5))
+    finally:
+        observador.stop()
+        observador.join(timeout=10)
+
+    resultado = {
+        "backend": nome_backend,
+        "cpu_ocioso_s": round(cpu_ocioso, 4),
+        "cpu_ocioso_pct": round(100 * cpu_ocioso / ocioso, 2),
+        "amostras": len(latencias),
+        "perdidas": amostras - len(latencias),
+    }
+    if latencias:
+        latencias.sort()
+        resultado.update({
+            "latencia_media_ms": round(1000 * statistics.mean(latencias), 1),
+            "latencia_p50_ms": round(1000 * latencias[len(latencias) // 2], 1),
+            "latencia_max_ms": round(1000 * latencias[-1], 1),
+        })
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arquivos", type=int, default=50000)
+    parser.add_argument("--ocioso", type=float, default=10.0, help="segundos medindo CPU com a pasta ociosa")
+    parser.add_argument("--amostras", type=int, default=20)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    resultados = []
+    for nome_backend, fabrica in (
+        ("nativo", Observer),
+        ("varredura", tuba_monitor.criar_observador_varredura),
+    ):
+        pasta = tempfile.mkdtemp(prefix="tuba_bench_")
+        try:
+            print(f"[{nome_backend}] criando {args.arquivos} arquivos em {pasta}...")
+            popular(pasta, args.arquivos)
+            resultado = medir(nome_backend, fabrica(), pasta, args.ocioso, args.amostras)
+            resultados.append(resultado)
+            print(f"[{nome_backend}] {resultado}")
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tuba_monitor  # noqa: E402
+
+ARQUIVOS_DO_APP = (
+    "CONFIG_PATH", "INDICE_PATH", "INDICE_DIARIO_PATH", "DIARIO_PATH", "CONTADORES_PATH",
+    "METRICAS_PATH", "DUPLICADOS_PATH", "SAIDA_PATH", "HUB_ESTADO_PATH",
+)
+
+
+@pytest.fixture
+def tuba(tmp_path, monkeypatch):
+    """O módulo tuba_monitor com todos os arquivos do app em uma pasta temporária."""
+    for nome in ARQUIVOS_DO_APP:
+        monkeypatch.setattr(tuba_monitor, nome, str(tmp_path / os.path.basename(getattr(tuba_monitor, nome))))
+    monkeypatch.setattr(tuba_monitor, "modo_headless", True)
+    monkeypatch.setattr(tuba_monitor, "configuracao", tuba_monitor.Configuracao())
+    monkeypatch.setattr(tuba_monitor, "pastas", [])
+    return tuba_monitor
@@ -0,0 +1,64 @@
+import pytest
+
+
+@pytest.fixture
+def toasts(tuba, monkeypatch):
+    exibidos = []
+    monkeypatch.setattr(tuba, "notificar", lambda titulo, mensagem, duracao=3: exibidos.append((titulo, mensagem)) or True)
+    monkeypatch.setattr(tuba, "tocar_som", lambda caminho, prioridade=0: None)
+    return exibidos
+
+
+def _eventos(tuba, quantidade, rotulo="loja"):
+    return [tuba.EventoArquivo(f"C:/pedidos/pedido_{i}.pdf", rotulo) for i in range(quantidade)]
+
+
+def test_rajada_vira_um_unico_evento(tuba):
+    entregues = []
+    # Janela longa: parar() entrega o grupo pendente, sem depender do relógio
+    agrupador = tuba.AgrupadorRajadas(entregues.append, janela=60)
+    agrupador.iniciar()
+    for evento in _eventos(tuba, 14):
+        agrupador.adicionar(evento)
+    agrupador.parar()
+
+    assert len(entregues) == 1
+    grupo = entregues[0]
+    assert grupo.quantidade == 14
+    assert len(grupo.membros) == 13
+    # Só os primeiros nomes são guardados, qualquer que seja o tamanho da rajada
+    assert grupo.mesclados == ["pedido_1.pdf", "pedido_2.pdf"]
+
+
+def test_sem_janela_os_eventos_passam_direto(tuba):
+    entregues = []
+    agrupador = tuba.AgrupadorRajadas(entregues.append, janela=0)
+    agrupador.iniciar()
+    for evento in _eventos(tuba, 3):
+        agrupador.adicionar(evento)
+    agrupador.parar()
+    assert [e.quantidade for e in entregues] == [1, 1, 1]
+
+
+def test_texto_do_resumo_da_rajada(tuba, toasts):
+    grupo, *resto = _eventos(tuba, 14)
+    for evento in resto:
+        grupo.mesclar(evento)
+    tuba.notificar_evento(grupo)
+
+    assert toasts == [(
+        "📄 Novos pedidos detectados!",
+        "14 novos pedidos (loja): pedido_0.pdf, pedido_1.pdf, pedido_2.pdf, … (+11)",
+    )]
+
+
+def test_rajada_de_varias_pastas_lista_os_canais(tuba, toasts):
+    grupo = tuba.EventoArquivo("C:/loja/a.pdf", "loja")
+    grupo.mesclar(tuba.EventoArquivo("C:/site/b.pdf", "site"))
+    tuba.notificar_evento(grupo)
+    assert toasts == [("📄 Novos pedidos detectados!", "2 novos pedidos (loja, site): a.pdf, b.pdf")]
+
+
+def test_arquivo_unico_mantem_o_toast_original(tuba, toasts):
+    tuba.notificar_evento(tuba.EventoArquivo("C:/pedidos/a.pdf", "loja"))
+    assert toasts == [("📄 Novo arquivo detectado! [loja]", "a.pdf")]
@@ -0,0 +1,86 @@
+import json
+import os
+
+import tuba_monitor
+
+
+def _escrever(tuba, dados):
+    with open(tuba.CONFIG_PATH, "w", encoding="utf-8") as f:
+        f.write(dados if isinstance(dados, str) else json.dumps(dados))
+
+
+def test_pastas_sao_validadas_campo_a_campo(tuba, tmp_path):
+    _escrever(tuba, {"pastas": [
+        {"caminho": 5},
+        {"caminho": str(tmp_path / "a"), "recursivo": "false", "backend": "ftp"},
+        str(tmp_path / "b"),
+        {"recursivo": True},
+    ]})
+    dados = tuba.ler_config()
+    # Só as entradas sem caminho válido caem; campos inválidos voltam ao padrão
+    assert dados["pastas"] == [{"caminho": str(tmp_path / "a")}, str(tmp_path / "b")]
+    entradas = tuba.pastas_da_config(dados)
+    assert [e["caminho"] for e in entradas] == [str(tmp_path / "a"), str(tmp_path / "b")]
+    assert entradas[0]["recursivo"] is False
+    assert entradas[0]["backend"] == "nativo"
+
+
+def test_regra_com_campo_invalido_e_descartada_inteira(tuba):
+    _escrever(tuba, {"regras": [{"nome": "ruim", "incluir": "*x*"}, {"nome": "boa", "incluir": ["*urg*"]}],
+                     "log": {"formato": "xml", "nivel": "DEBUG"}})
+    dados = tuba.ler_config()
+    assert [r["nome"] for r in dados["regras"]] == ["boa"]
+    assert dados["log"] == {"nivel": "DEBUG"}
+
+
+def test_migracao_do_formato_antigo(tuba, tmp_path):
+    _escrever(tuba, {"pasta_monitorada": str(tmp_path), "sons": {"intervalo_minimo": 2}})
+    assert tuba.ler_config()["pastas"] == [str(tmp_path)]
+    with open(tuba.CONFIG_PATH, encoding="utf-8") as f:
+        assert json.load(f) == {"pastas": [str(tmp_path)], "sons": {"intervalo_minimo": 2}}
+
+
+def test_gravacao_atomica_preserva_as_demais_secoes(tuba, tmp_path):
+    _escrever(tuba, {"pastas": [], "hub": {"modo": "hub"}, "log": {"formato": "xml"}})
+    tuba.salvar_config([{"caminho": str(tmp_path)}])
+    with open(tuba.CONFIG_PATH, encoding="utf-8") as f:
+        gravado = json.load(f)
+    assert gravado["pastas"] == [{"caminho": str(tmp_path)}]
+    # O que o usuário ainda vai corrigir também fica no arquivo
+    assert gravado["hub"] == {"modo": "hub"} and gravado["log"] == {"formato": "xml"}
+    assert not os.path.exists(tuba.CONFIG_PATH + ".tmp")
+
+
+def test_recarga_mantem_a_ultima_configuracao_valida(tuba, tmp_path):
+    _escrever(tuba, {"pastas": [str(tmp_path)]})
+    anterior = tuba.ler_config()
+    _escrever(tuba, '{"pastas": [')
+    assert tuba.configuracao.recarregar() is None
+    assert tuba.ler_config() is anterior
+    os.remove(tuba.CONFIG_PATH)
+    assert tuba.configuracao.recarregar() is None
+    assert tuba.ler_config() is anterior
+
+
+def test_json_invalido_na_primeira_leitura_e_guardado(tuba):
+    _escrever(tuba, '{"regras": [')
+    assert tuba.ler_config() == {}
+    assert not os.path.exists(tuba.CONFIG_PATH)
+    with open(tuba.CONFIG_PATH + ".invalido", encoding="utf-8") as f:
+        assert f.read() == '{"regras": ['
+
+
+def test_config_sem_pastas_nao_remove_as_monitoradas(tuba, tmp_path, monkeypatch):
+    removidas = []
+    monkeypatch.setattr(tuba, "remover_pasta", lambda caminho, salvar=True: removidas.append(caminho))
+    pasta = {"caminho": str(tmp_path), "recursivo": False, "rotulo": "p", "backend": "nativo"}
+    tuba.pastas[:] = [pasta]
+    tuba.aplicar_config({"pastas": [pasta]}, {"pastas": []})
+    assert removidas == []
+    assert tuba.pastas == [pasta]
+
+
+def test_bool_nao_vale_como_numero():
+    erros = []
+    assert tuba_monitor._validar_config({"porta": True}, {"porta": int}, "", erros) == {}
+    assert erros == ["porta: esperado inteiro"]
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+
+def _instante(texto):
+    return time.mktime(time.strptime(texto, "%Y-%m-%d %H:%M"))
+
+
+@pytest.fixture
+def relogio(tuba, monkeypatch):
+    """Substitui time.time() por um relógio ajustado pelo teste."""
+    agora = [_instante("2026-03-10 23:58")]
+    monkeypatch.setattr(tuba.time, "time", lambda: agora[0])
+    return agora
+
+
+def test_hoje_zera_na_virada_da_meia_noite(tuba, relogio):
+    contador = tuba.ContadorPedidos()
+    contador.registrar("loja")
+    contador.registrar("site")
+    relogio[0] = _instante("2026-03-10 23:59")
+    contador.registrar("loja")
+    assert contador.hoje() == 3
+    assert contador.hoje("loja") == 2
+
+    relogio[0] = _instante("2026-03-11 00:01")
+    assert contador.hoje() == 0
+    assert contador.hoje("loja") == 0
+    # As janelas móveis atravessam a meia-noite
+    assert contador.ultima_hora() == 3
+    assert contador.ultimas_24h("loja") == 2
+    contador.registrar("loja")
+    assert contador.hoje() == 1
+
+
+def test_janelas_moveis_esquecem_o_que_saiu_delas(tuba, relogio):
+    contador = tuba.ContadorPedidos()
+    contador.registrar()
+    relogio[0] += 3600
+    assert contador.ultima_hora() == 0
+    assert contador.ultimas_24h() == 1
+    relogio[0] += 23 * 3600
+    assert contador.ultimas_24h() == 0
+    # Trinta e um dias depois a posição do dia foi reaproveitada e zerada
+    relogio[0] = _instante("2026-03-10 23:58") + 31 * 86400
+    assert contador.hoje() == 0
+
+
+def test_evento_antigo_demais_nao_entra_no_anel(tuba):
+    anel = tuba._Anel(3, 10)
+    anel.adicionar(100)
+    anel.adicionar(85)
+    assert anel.soma(100) == 2
+    # Três posições de 10 s: 70-79 já saiu da janela que termina em 100-109
+    anel.adicionar(75)
+    assert anel.soma(100) == 2
+
+
+def test_contagens_sao_restauradas_do_disco(tuba, relogio):
+    contador = tuba.ContadorPedidos()
+    for rotulo in ("loja", "loja", "site"):
+        contador.registrar(rotulo)
+    contador.salvar()
+    assert not contador.alterado
+
+    restaurado = tuba.ContadorPedidos()
+    restaurado.carregar()
+    assert restaurado.hoje() == 3
+    assert restaurado.hoje("loja") == 2
+    assert restaurado.ultima_hora("site") == 1
+    # Restaurado depois da meia-noite, o dia anterior não conta como hoje
+    relogio[0] = _instante("2026-03-11 08:00")
+    restaurado = tuba.ContadorPedidos()
+    restaurado.carregar()
+    assert restaurado.hoje() == 0
+    assert restaurado.ultimas_24h() == 3
+
+
+def test_arquivo_corrompido_comeca_do_zero(tuba, relogio):
+    with open(tuba.CONTADORES_PATH, "w", encoding="utf-8") as f:
+        f.write("{não é json")
+    contador = tuba.ContadorPedidos()
+    contador.carregar()
+    assert contador.hoje() == 0
@@ -0,0 +1,92 @@
+import http.client
+import json
+
+import pytest
+
+import tuba_monitor
+
+
+@pytest.fixture
+def controle(tuba, monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(tuba, "pausar_monitor", lambda: chamadas.append("pausar") or True)
+
+    def iniciar(opcoes):
+        with open(tuba.CONFIG_PATH, "w", encoding="utf-8") as f:
+            json.dump({"controle": opcoes}, f)
+        tuba.configuracao.recarregar()
+        tuba.iniciar_controle()
+        return tuba.servidor_controle.server_address[1], chamadas
+
+    yield iniciar
+    tuba.encerrar_controle()
+
+
+def _livre():
+    servidor = tuba_monitor._criar_servidor_controle(0)
+    porta = servidor.server_address[1]
+    servidor.server_close()
+    return porta
+
+
+def _chamar(porta, metodo, caminho, token=None, corpo=b"{}", **extras):
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=5)
+    cabecalhos = {"Content-Type": "application/json", **extras}
+    if token is not None:
+        cabecalhos["X-Tuba-Token"] = token
+    conexao.request(metodo, caminho, body=corpo if metodo != "GET" else None, headers=cabecalhos)
+    resposta = conexao.getresponse()
+    corpo = json.loads(resposta.read())
+    conexao.close()
+    return resposta.status, corpo
+
+
+def test_token_gerado_e_exigido_nas_rotas_que_alteram(tuba, controle):
+    porta, chamadas = controle({"porta": _livre()})
+    with open(tuba.CONFIG_PATH, encoding="utf-8") as f:
+        token = json.load(f)["controle"]["token"]
+    assert len(token) >= 32
+    assert _chamar(porta, "POST", "/pausar")[0] == 401
+    assert _chamar(porta, "POST", "/pausar", token="errado")[0] == 401
+    assert chamadas == []
+    assert _chamar(porta, "POST", "/pausar", token=token)[0] == 200
+    assert chamadas == ["pausar"]
+
+
+def test_consultas_nao_exigem_token(controle):
+    porta, _ = controle({"porta": _livre(), "token": "segredo"})
+    status, corpo = _chamar(porta, "GET", "/contadores")
+    assert status == 200 and "hoje" in corpo
+
+
+def test_token_configurado_e_mantido(tuba, controle):
+    porta, chamadas = controle({"porta": _livre(), "token": "segredo"})
+    with open(tuba.CONFIG_PATH, encoding="utf-8") as f:
+        assert json.load(f)["controle"]["token"] == "segredo"
+    assert _chamar(porta, "POST", "/pausar", token="segredo")[0] == 200
+
+
+def test_adicionar_pasta_valida_os_campos(tuba, controle, tmp_path, monkeypatch):
+    adicionadas = []
+    monkeypatch.setattr(tuba, "adicionar_pasta", lambda entrada: adicionadas.append(entrada) or True)
+    porta, _ = controle({"porta": _livre(), "token": "segredo"})
+    pasta = str(tmp_path)
+
+    status, _ = _chamar(porta, "POST", f"/pastas?caminho={pasta}&recursivo=false", token="segredo")
+    assert status == 200
+    assert adicionadas == [{"caminho": pasta, "recursivo": False}]
+
+    corpo = json.dumps({"caminho": pasta, "recursivo": "sim"}).encode("utf-8")
+    status, resposta = _chamar(porta, "POST", "/pastas", token="segredo", corpo=corpo)
+    assert status == 400 and "recursivo" in resposta["erro"]
+    corpo = json.dumps({"caminho": pasta, "backend": "ftp"}).encode("utf-8")
+    assert _chamar(porta, "POST", "/pastas", token="segredo", corpo=corpo)[0] == 400
+    assert len(adicionadas) == 1
+
+
+def test_content_length_invalido(controle):
+    porta, chamadas = controle({"porta": _livre(), "token": "segredo"})
+    for valor in ("abc", "-5"):
+        status, _ = _chamar(porta, "POST", "/pausar", token="segredo", corpo=None, **{"Content-Length": valor})
+        assert status == 400
+    assert chamadas == []
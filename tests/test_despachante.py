@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def despachante_cheio(tuba):
+    """
+    Despachante com fila de 2 e um worker preso no primeiro evento: depois de
+    a.pdf, b.pdf e c.pdf a fila está cheia e o próximo evento aciona a política.
+    """
+    criados = []
+
+    def criar(politica):
+        liberar = threading.Event()
+        notificados = []
+
+        def notificar(evento):
+            liberar.wait(5)
+            notificados.append(evento)
+
+        despachante = tuba.DespachanteNotificacoes(notificar, max_eventos=2, politica=politica, workers=1)
+        despachante.iniciar()
+        criados.append((despachante, liberar))
+        despachante.enfileirar(tuba.EventoArquivo("C:/pedidos/a.pdf", "loja"))
+        for _ in range(500):
+            if not despachante.pendentes():
+                break
+            time.sleep(0.01)
+        for nome in ("b.pdf", "c.pdf"):
+            assert despachante.enfileirar(tuba.EventoArquivo(f"C:/pedidos/{nome}", "loja"))
+        return despachante, liberar, notificados
+
+    yield criar
+    for despachante, liberar in criados:
+        liberar.set()
+        despachante.parar()
+
+
+def _entregar(despachante, liberar):
+    liberar.set()
+    despachante.parar(timeout=5)
+
+
+def test_descartar_antigos(tuba, despachante_cheio):
+    despachante, liberar, notificados = despachante_cheio("descartar_antigos")
+    assert despachante.enfileirar(tuba.EventoArquivo("C:/pedidos/d.pdf", "loja"))
+    _entregar(despachante, liberar)
+    assert [e.nome for e in notificados] == ["a.pdf", "c.pdf", "d.pdf"]
+    assert despachante.descartados == 1
+
+
+def test_descartar_novos(tuba, despachante_cheio):
+    despachante, liberar, notificados = despachante_cheio("descartar_novos")
+    assert not despachante.enfileirar(tuba.EventoArquivo("C:/pedidos/d.pdf", "loja"))
+    _entregar(despachante, liberar)
+    assert [e.nome for e in notificados] == ["a.pdf", "b.pdf", "c.pdf"]
+    assert despachante.descartados == 1
+
+
+def test_mesclar_agrega_ao_ultimo_pendente(tuba, despachante_cheio):
+    despachante, liberar, notificados = despachante_cheio("mesclar")
+    for nome in ("d.pdf", "e.pdf"):
+        assert despachante.enfileirar(tuba.EventoArquivo(f"C:/pedidos/{nome}", "loja"))
+    _entregar(despachante, liberar)
+    assert [e.nome for e in notificados] == ["a.pdf", "b.pdf", "c.pdf"]
+    ultimo = notificados[-1]
+    assert ultimo.quantidade == 3
+    assert ultimo.mesclados == ["d.pdf", "e.pdf"]
+    assert despachante.descartados == 0
+
+
+def test_politica_desconhecida_usa_a_padrao(tuba):
+    despachante = tuba.DespachanteNotificacoes(lambda evento: None, politica="jogar_fora")
+    assert despachante.politica == tuba.FILA_POLITICA
@@ -0,0 +1,255 @@
+import http.server
+import json
+import socket
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import tuba_monitor
+
+
+class DestinoFalso:
+    """Falha nas `falhas` primeiras entregas e registra o horário de cada tentativa."""
+
+    def __init__(self, falhas=0):
+        self.falhas = falhas
+        self.tentativas = []
+        self.entregues = []
+        self.entregou = threading.Event()
+
+    def enviar(self, corpo, pedidos):
+        self.tentativas.append(time.monotonic())
+        if len(self.tentativas) <= self.falhas:
+            raise ConnectionError("destino fora do ar")
+        self.entregues.extend(p["nome"] for p in pedidos)
+        self.entregou.set()
+
+    def fechar(self):
+        pass
+
+
+class EsperaRegistrada(threading.Event):
+    """Event cujo wait() só registra a espera pedida (sem dormir)."""
+
+    def __init__(self):
+        super().__init__()
+        self.esperas = []
+
+    def wait(self, timeout=None):
+        self.esperas.append(timeout)
+        return self.is_set()
+
+
+def _pedidos(*nomes):
+    return [{"ts": time.time(), "caminho": f"C:/pedidos/{n}", "nome": n, "rotulo": "loja"} for n in nomes]
+
+
+@pytest.fixture
+def sem_jitter(monkeypatch):
+    monkeypatch.setattr(tuba_monitor.random, "uniform", lambda a, b: 1.0)
+
+
+def test_espera_exponencial_limitada_por_espera_max(tuba, sem_jitter, monkeypatch):
+    monkeypatch.setattr(tuba, "SAIDA_ESPERA_INICIAL", 2.0)
+    caixa = tuba.CaixaSaida()
+    try:
+        destino = DestinoFalso(falhas=6)
+        saida = tuba.SaidaDestino("falso", destino, caixa.caminho, espera_max=20)
+        saida.encerrar = EsperaRegistrada()
+        caixa.saidas["falso"] = saida  # sem iniciar a thread: o teste chama _enviar_lote
+        caixa.enfileirar(_pedidos("a.pdf"))
+        conexao = sqlite3.connect(caixa.caminho)
+        for _ in range(7):
+            saida._enviar_lote(conexao)
+        conexao.close()
+    finally:
+        caixa.conexao.close()
+    assert saida.encerrar.esperas == [2.0, 4.0, 8.0, 16.0, 20, 20]
+    assert destino.entregues == ["a.pdf"]
+    assert saida.falhas == 0
+
+
+def test_nova_tentativa_ate_entregar(tuba, monkeypatch):
+    monkeypatch.setattr(tuba, "SAIDA_ESPERA_INICIAL", 0.05)
+    caixa = tuba.CaixaSaida()
+    destino = DestinoFalso(falhas=2)
+    caixa.adicionar_destino("falso", destino, {"espera_lote": 0})
+    try:
+        caixa.enfileirar(_pedidos("a.pdf", "b.pdf"))
+        assert destino.entregou.wait(5)
+    finally:
+        caixa.parar()
+    assert len(destino.tentativas) == 3
+    # Segunda espera maior que a primeira (jitter de 0,5x a 1,5x)
+    primeira, segunda = (b - a for a, b in zip(destino.tentativas, destino.tentativas[1:]))
+    assert 0.02 <= primeira and 0.05 <= segunda
+    assert destino.entregues == ["a.pdf", "b.pdf"]
+    with sqlite3.connect(tuba.SAIDA_PATH) as conexao:
+        assert conexao.execute("SELECT COUNT(*) FROM saida").fetchone()[0] == 0
+
+
+def test_caixa_de_saida_sobrevive_a_reinicio(tuba, monkeypatch):
+    monkeypatch.setattr(tuba, "SAIDA_ESPERA_INICIAL", 60.0)
+    caixa = tuba.CaixaSaida()
+    fora_do_ar = DestinoFalso(falhas=100)
+    caixa.adicionar_destino("falso", fora_do_ar, {"espera_lote": 0})
+    caixa.enfileirar(_pedidos("a.pdf", "b.pdf", "c.pdf"))
+    for _ in range(100):
+        if fora_do_ar.tentativas:
+            break
+        time.sleep(0.01)
+    caixa.parar()
+    assert fora_do_ar.entregues == []
+
+    # Próxima execução: o que não foi entregue sai primeiro, na ordem original
+    caixa = tuba.CaixaSaida()
+    destino = DestinoFalso()
+    caixa.adicionar_destino("falso", destino, {"espera_lote": 0})
+    try:
+        assert destino.entregou.wait(5)
+    finally:
+        caixa.parar()
+    assert destino.entregues == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+@pytest.fixture
+def servidor_http():
+    recebidos = []
+    status = [200]
+
+    class Receptor(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers["Content-Length"]))
+            recebidos.append((self.client_address[1], self.path, self.headers["Content-Type"], json.loads(corpo)))
+            self.send_response(status[0])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Receptor)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}/pedidos?loja=1", recebidos, status
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_webhook_envia_json_e_reaproveita_a_conexao(servidor_http):
+    url, recebidos, _ = servidor_http
+    destino = tuba_monitor.DestinoWebhook(url, {"X-Loja": "1"})
+    try:
+        for nome in ("a.pdf", "b.pdf"):
+            pedidos = _pedidos(nome)
+            destino.enviar({"pedidos": pedidos}, pedidos)
+    finally:
+        destino.fechar()
+    assert [r[3]["pedidos"][0]["nome"] for r in recebidos] == ["a.pdf", "b.pdf"]
+    assert recebidos[0][1] == "/pedidos?loja=1"
+    assert recebidos[0][2].startswith("application/json")
+    # Mesma porta de origem: a conexão keep-alive foi reaproveitada
+    assert recebidos[0][0] == recebidos[1][0]
+
+
+def test_webhook_com_erro_http_falha_a_entrega(servidor_http):
+    url, _, status = servidor_http
+    status[0] = 503
+    destino = tuba_monitor.DestinoWebhook(url)
+    pedidos = _pedidos("a.pdf")
+    try:
+        with pytest.raises(RuntimeError, match="503"):
+            destino.enviar({"pedidos": pedidos}, pedidos)
+    finally:
+        destino.fechar()
+
+
+class ServidorSmtp:
+    """Responde o mínimo do SMTP para o smtplib e guarda as mensagens e os comandos."""
+
+    def __init__(self):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.porta = self.sock.getsockname()[1]
+        self.mensagens = []
+        self.comandos = []
+        self.conexoes = 0
+        threading.Thread(target=self._aceitar, daemon=True).start()
+
+    def _aceitar(self):
+        while True:
+            try:
+                conexao, _ = self.sock.accept()
+            except OSError:
+                return
+            self.conexoes += 1
+            threading.Thread(target=self._atender, args=(conexao,), daemon=True).start()
+
+    def _atender(self, conexao):
+        arquivo = conexao.makefile("rb")
+        conexao.sendall(b"220 teste ESMTP\r\n")
+        with conexao:
+            for linha in arquivo:
+                comando = linha.decode().strip().split(" ")[0].upper()
+                self.comandos.append(comando)
+                if comando == "DATA":
+                    conexao.sendall(b"354 fim com .\r\n")
+                    dados = []
+                    for linha_dados in arquivo:
+                        if linha_dados == b".\r\n":
+                            break
+                        dados.append(linha_dados)
+                    self.mensagens.append(b"".join(dados).decode())
+                    conexao.sendall(b"250 ok\r\n")
+                elif comando == "QUIT":
+                    conexao.sendall(b"221 tchau\r\n")
+                    return
+                else:
+                    conexao.sendall(b"250 ok\r\n")
+
+    def fechar(self):
+        self.sock.close()
+
+
+def test_smtp_um_email_por_lote_na_mesma_sessao():
+    servidor = ServidorSmtp()
+    destino = tuba_monitor.DestinoSmtp("127.0.0.1", servidor.porta, de="tuba@loja", para="pedidos@loja", tls=False,
+                                       timeout=5)
+    try:
+        um = _pedidos("a.pdf")
+        destino.enviar({"pedidos": um}, um)
+        lote = _pedidos("b.pdf", "c.pdf")
+        destino.enviar({"pedidos": lote}, lote)
+    finally:
+        destino.fechar()
+        servidor.fechar()
+    assert len(servidor.mensagens) == 2
+    assert f"Subject: [{tuba_monitor.APP_NAME}] Novo pedido: a.pdf" in servidor.mensagens[0]
+    assert f"Subject: [{tuba_monitor.APP_NAME}] 2 novos pedidos" in servidor.mensagens[1]
+    assert "To: pedidos@loja" in servidor.mensagens[1]
+    assert "C:/pedidos/c.pdf" in servidor.mensagens[1]
+    # A sessão foi reaproveitada (NOOP antes do segundo envio)
+    assert servidor.conexoes == 1
+    assert "NOOP" in servidor.comandos
+
+
+def test_linha_corrompida_sai_da_caixa_sem_parar_o_destino(tuba):
+    caixa = tuba.CaixaSaida()
+    destino = DestinoFalso()
+    saida = tuba.SaidaDestino("falso", destino, caixa.caminho)
+    caixa.saidas["falso"] = saida  # sem iniciar a thread: o teste chama _enviar_lote
+    try:
+        caixa.enfileirar(_pedidos("a.pdf"))
+        with caixa.conexao:
+            caixa.conexao.execute("INSERT INTO saida (destino, dados) VALUES ('falso', '{\"nome\": ')")
+        caixa.enfileirar(_pedidos("b.pdf"))
+        conexao = sqlite3.connect(caixa.caminho)
+        saida._enviar_lote(conexao)
+        conexao.close()
+    finally:
+        caixa.conexao.close()
+    assert destino.entregues == ["a.pdf", "b.pdf"]
+    with sqlite3.connect(tuba.SAIDA_PATH) as conexao:
+        assert conexao.execute("SELECT COUNT(*) FROM saida").fetchone()[0] == 0
@@ -0,0 +1,74 @@
+import argparse
+import json
+import time
+
+import pytest
+
+DIA = "2026-03-10"
+
+
+def _instante(hora, minuto=0):
+    return time.mktime(time.strptime(f"{DIA} {hora}:{minuto}", "%Y-%m-%d %H:%M"))
+
+
+@pytest.fixture
+def diario(tuba):
+    """Diário com cinco pedidos de DIA (8h, 9h30, 11h59, 12h e 18h) e um de ontem."""
+    diario = tuba.DiarioEventos(lote_max=100, espera_lote=0)
+    diario.iniciar()
+    chegadas = [
+        ("ontem.pdf", "loja", _instante(10) - 86400),
+        ("a.pdf", "loja", _instante(8)),
+        ("b.pdf", "site", _instante(9, 30)),
+        ("c.pdf", "loja", _instante(11, 59)),
+        ("d.pdf", "site", _instante(12)),
+        ("e.pdf", "loja", _instante(18)),
+    ]
+    for nome, rotulo, quando in chegadas:
+        evento = tuba.EventoArquivo(f"C:/pedidos/{nome}", rotulo)
+        evento.detectado_em = quando
+        diario.registrar(evento, "notificado")
+    diario.parar()
+    return diario
+
+
+def _nomes(linhas):
+    return [linha["nome"] for linha in linhas]
+
+
+def test_pedidos_do_dia(tuba, diario):
+    assert _nomes(tuba.pedidos_do_dia(DIA)) == ["a.pdf", "b.pdf", "c.pdf", "d.pdf", "e.pdf"]
+    assert _nomes(tuba.pedidos_do_dia(DIA, "site")) == ["b.pdf", "d.pdf"]
+    assert tuba.pedidos_do_dia("2026-03-11") == []
+
+
+def test_pedidos_entre_inclui_o_inicio_e_exclui_o_fim(tuba, diario):
+    assert _nomes(tuba.pedidos_entre(8, 12, DIA)) == ["a.pdf", "b.pdf", "c.pdf"]
+    assert _nomes(tuba.pedidos_entre(12, 24, DIA)) == ["d.pdf", "e.pdf"]
+    assert _nomes(tuba.pedidos_entre(0, 24, DIA, "loja")) == ["a.pdf", "c.pdf", "e.pdf"]
+
+
+def test_ultimos_pedidos_do_mais_recente_para_o_mais_antigo(tuba, diario):
+    assert _nomes(tuba.ultimos_pedidos(3)) == ["e.pdf", "d.pdf", "c.pdf"]
+    assert _nomes(tuba.ultimos_pedidos(10, "loja")) == ["e.pdf", "c.pdf", "a.pdf", "ontem.pdf"]
+
+
+def test_diario_inexistente_nao_tem_pedidos(tuba):
+    assert tuba.pedidos_do_dia(DIA) == []
+    assert tuba.ultimos_pedidos() == []
+
+
+def _consultar(tuba, capsys, consulta, *valores, canal=None):
+    args = argparse.Namespace(consulta=consulta, valores=list(valores), dia=DIA, canal=canal, json=True)
+    tuba.executar_consulta_pedidos(args)
+    return _nomes(json.loads(capsys.readouterr().out))
+
+
+def test_linha_de_comando(tuba, diario, capsys):
+    assert _consultar(tuba, capsys, "hoje", canal="site") == ["b.pdf", "d.pdf"]
+    assert _consultar(tuba, capsys, "entre", "9", "12") == ["b.pdf", "c.pdf"]
+    assert _consultar(tuba, capsys, "ultimos", "2") == ["e.pdf", "d.pdf"]
+    with pytest.raises(SystemExit):
+        tuba.executar_consulta_pedidos(
+            argparse.Namespace(consulta="entre", valores=["8"], dia=DIA, canal=None, json=True)
+        )
@@ -0,0 +1,67 @@
+import time
+
+import tuba_monitor
+
+
+def _detector(tmp_path, **opcoes):
+    return tuba_monitor.DetectorDuplicados(caminho=str(tmp_path / "duplicados.tsv"), retencao_dias=1, **opcoes)
+
+
+def test_expirar_tira_so_os_vencidos_do_comeco(tmp_path):
+    detector = _detector(tmp_path)
+    agora = time.time()
+    dia = 24 * 3600
+    with detector.lock:
+        for i, idade in enumerate((3 * dia, 2 * dia, dia + 1, 60, 1)):
+            detector._inserir(f"/p/{i}.pdf", 10, None, agora - idade)
+        detector._expirar(agora)
+    assert list(detector.entradas) == ["/p/3.pdf", "/p/4.pdf"]
+    assert detector.por_tamanho[10] == {"/p/3.pdf", "/p/4.pdf"}
+
+
+class InstanteIntocavel(float):
+    """Instante que falha se _expirar chegar a compará-lo."""
+
+    def __ge__(self, outro):
+        raise AssertionError("_expirar passou da primeira entrada ainda válida")
+
+    __lt__ = __le__ = __gt__ = __ge__
+
+
+def test_expirar_para_na_primeira_entrada_valida(tmp_path):
+    detector = _detector(tmp_path)
+    agora = time.time()
+    with detector.lock:
+        detector._inserir("/p/vencido.pdf", 1, None, agora - 2 * 24 * 3600)
+        detector._inserir("/p/valido.pdf", 2, None, agora)
+        for i in range(1000):
+            detector._inserir(f"/p/{i}.pdf", 3, None, InstanteIntocavel(agora))
+        detector._expirar(agora)
+    assert len(detector.entradas) == 1001
+    assert "/p/vencido.pdf" not in detector.entradas
+
+
+def test_carregar_reordena_por_instante(tmp_path):
+    agora = time.time()
+    (tmp_path / "duplicados.tsv").write_text(
+        f"/p/novo.pdf\t10\t\t{agora - 10}\n/p/velho.pdf\t10\t\t{agora - 100}\n", encoding="utf-8"
+    )
+    detector = _detector(tmp_path)
+    detector.carregar()
+    assert list(detector.entradas) == ["/p/velho.pdf", "/p/novo.pdf"]
+
+
+def test_recuperados_entram_em_ordem_com_os_do_fluxo_normal(tmp_path):
+    detector = _detector(tmp_path)
+    detector._procurar("/p/vivo1.pdf", 1)
+    # Arquivo que chegou com o TUBA fechado (mtime de horas atrás)
+    detector.conhecer("/p/recuperado.pdf", 2)
+    detector._procurar("/p/vivo2.pdf", 3)
+    detector.conhecer("/p/recuperado2.pdf", 4)
+
+    assert list(detector.entradas) == ["/p/vivo1.pdf", "/p/recuperado.pdf", "/p/vivo2.pdf", "/p/recuperado2.pdf"]
+    instantes = [entrada[2] for entrada in detector.entradas.values()]
+    assert instantes == sorted(instantes)
+    with detector.lock:
+        detector._expirar(instantes[-1] + detector.retencao + 1)
+    assert not detector.entradas and not detector.por_tamanho
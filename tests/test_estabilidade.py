@@ -0,0 +1,30 @@
+import pytest
+
+import tuba_monitor
+
+
+class Kernel32Falso:
+    """CreateFileW que falha com `erro` enquanto o arquivo está "aberto por outro processo"."""
+
+    def __init__(self, erro=None):
+        self.erro = erro
+        self.chamadas = []
+        self.fechados = []
+
+    def criar(self, caminho, acesso, compartilhamento, seguranca, disposicao, atributos, modelo):
+        self.chamadas.append((caminho, acesso, compartilhamento))
+        return -1 if self.erro else 1234
+
+    def funcoes(self):
+        return self.criar, self.fechados.append, lambda: self.erro
+
+
+@pytest.mark.parametrize("erro, esperado", [(None, True), (32, False), (33, False), (5, True)])
+def test_sonda_exclusiva_do_windows(monkeypatch, erro, esperado):
+    kernel32 = Kernel32Falso(erro)
+    monkeypatch.setattr(tuba_monitor, "_kernel32", kernel32.funcoes())
+    assert tuba_monitor._abrir_sem_compartilhar(r"C:\pedidos\a.pdf") is esperado
+    # Sempre sem compartilhamento (dwShareMode 0)
+    assert kernel32.chamadas == [(r"C:\pedidos\a.pdf", tuba_monitor._GENERIC_READ, 0)]
+    assert kernel32.fechados == ([] if erro else [1234])
+
@@ -0,0 +1,48 @@
+import time
+
+import tuba_monitor
+
+
+def _trava(caminho, estacao, expira):
+    trava = tuba_monitor.TravaHub(str(caminho), "127.0.0.1", 9465, expira=expira)
+    trava.estacao = estacao
+    return trava
+
+
+def test_hub_forcado_mantem_a_trava_contra_estacao_automatica(tmp_path):
+    caminho = tmp_path / tuba_monitor.HUB_TRAVA_NOME
+    hub = _trava(caminho, "hub", 0.05)
+    automatica = _trava(caminho, "automatica", 0.05)
+    assert hub.adquirir(forcar=True)
+    for _ in range(6):
+        time.sleep(0.08)
+        # Batimento do hub forçado (mesmo caminho do _loop do coordenador)
+        assert hub.adquirir(forcar=True)
+        assert not automatica.abandonada()
+        assert not automatica.adquirir()
+    assert hub.ler()["sessao"] == hub.sessao
+    assert hub.ler()["batimento"] >= 7
+
+
+def test_trava_sem_batimento_fica_abandonada(tmp_path):
+    caminho = tmp_path / tuba_monitor.HUB_TRAVA_NOME
+    hub = _trava(caminho, "hub", 0.05)
+    automatica = _trava(caminho, "automatica", 0.05)
+    assert hub.adquirir(forcar=True)
+    assert not automatica.abandonada()
+    time.sleep(0.1)
+    assert automatica.adquirir()
+    assert automatica.ler()["sessao"] == automatica.sessao
+
+
+def test_coordenador_usa_as_pastas_atuais(tuba, tmp_path):
+    antiga = {"caminho": str(tmp_path / "antiga"), "recursivo": False, "rotulo": "antiga", "backend": "nativo"}
+    nova = dict(antiga, caminho=str(tmp_path / "nova"), rotulo="nova")
+    tuba.pastas[:] = [antiga]
+    coordenador = tuba.CoordenadorHub([antiga], {"modo": "cliente"})
+    assert coordenador.trava.caminho == str(tmp_path / "antiga" / tuba.HUB_TRAVA_NOME)
+
+    tuba.pastas[:] = [nova, antiga]
+    assert coordenador.pastas_lista == [nova, antiga]
+    coordenador._acompanhar_pasta_principal()
+    assert coordenador.trava.caminho == str(tmp_path / "nova" / tuba.HUB_TRAVA_NOME)
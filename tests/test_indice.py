@@ -0,0 +1,110 @@
+import os
+import time
+
+
+class RastreadorFalso:
+    def __init__(self, pendentes):
+        self.pendentes = set(pendentes)
+
+    def pendente(self, caminho):
+        return caminho in self.pendentes
+
+
+def _indice(tuba):
+    indice = tuba.IndiceArquivos()
+    indice.carregar()
+    return indice
+
+
+def test_primeira_indexacao_deixa_de_fora_o_que_ainda_esta_sendo_escrito(tuba, tmp_path, monkeypatch):
+    pasta = tmp_path / "pedidos"
+    pasta.mkdir()
+    (pasta / "antigo.pdf").write_bytes(b"a")
+    (pasta / "escrevendo.pdf").write_bytes(b"b")
+    (pasta / "recente.pdf").write_bytes(b"c")
+    futuro = time.time() + 60
+    os.utime(pasta / "recente.pdf", (futuro, futuro))
+    monkeypatch.setattr(tuba, "rastreador", RastreadorFalso({str(pasta / "escrevendo.pdf")}))
+    indice = _indice(tuba)
+
+    assert indice.diferenca(str(pasta)) == []
+
+    # O fluxo normal ainda consegue registrar (e notificar) os dois
+    assert not indice.registrar(str(pasta / "antigo.pdf"))
+    assert indice.registrar(str(pasta / "escrevendo.pdf"))
+    assert indice.registrar(str(pasta / "recente.pdf"))
+    indice.fechar()
+
+
+def _linhas(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_diferenca_aponta_os_novos_e_esquece_os_removidos(tuba, tmp_path):
+    pasta = tmp_path / "pedidos"
+    pasta.mkdir()
+    (pasta / "a.pdf").write_bytes(b"a")
+    (pasta / "b.pdf").write_bytes(b"b")
+    indice = _indice(tuba)
+    assert indice.diferenca(str(pasta)) == []
+
+    (pasta / "c.pdf").write_bytes(b"c")
+    (pasta / "b.pdf").unlink()
+    novos = indice.diferenca(str(pasta))
+    assert [caminho for caminho, st, entry in novos] == [str(pasta / "c.pdf")]
+    assert str(pasta / "b.pdf") not in indice.arquivos
+    # Quem chamou registra; na próxima comparação ele já é conhecido
+    caminho, st, entry = novos[0]
+    assert indice.registrar(caminho, st, entry)
+    assert indice.diferenca(str(pasta)) == []
+    indice.fechar()
+
+
+def test_diferenca_ignora_subpastas_sem_recursivo(tuba, tmp_path):
+    pasta = tmp_path / "pedidos"
+    (pasta / "sub").mkdir(parents=True)
+    indice = _indice(tuba)
+    indice.diferenca(str(pasta))
+    (pasta / "sub" / "a.pdf").write_bytes(b"a")
+    assert indice.diferenca(str(pasta)) == []
+    assert [c for c, st, entry in indice.diferenca(str(pasta), recursivo=True)] == [str(pasta / "sub" / "a.pdf")]
+    indice.fechar()
+
+
+def test_diario_e_reaplicado_ao_carregar(tuba, tmp_path):
+    pasta = tmp_path / "pedidos"
+    pasta.mkdir()
+    indice = _indice(tuba)
+    indice.diferenca(str(pasta))
+    for nome in ("a.pdf", "b.pdf", "c.pdf"):
+        (pasta / nome).write_bytes(nome.encode())
+        indice.registrar(str(pasta / nome))
+    indice.remover(str(pasta / "a.pdf"))
+    indice.mover(str(pasta / "b.pdf"), str(pasta / "b2.pdf"))
+    # Sem fechar(): o que foi registrado está só no diário, como após uma queda
+    assert len(_linhas(tuba.INDICE_DIARIO_PATH)) == 6
+
+    recarregado = _indice(tuba)
+    assert sorted(recarregado.arquivos) == [str(pasta / "b2.pdf"), str(pasta / "c.pdf")]
+    assert recarregado.pastas == {str(pasta)}
+    # carregar() consolida: o diário fica vazio e a base tem tudo
+    assert _linhas(tuba.INDICE_DIARIO_PATH) == []
+    assert len(_linhas(tuba.INDICE_PATH)) == 3
+    indice.diario.close()
+    recarregado.fechar()
+
+
+def test_diario_e_consolidado_quando_cresce(tuba, tmp_path, monkeypatch):
+    monkeypatch.setattr(tuba, "INDICE_COMPACTAR_MIN", 5)
+    pasta = tmp_path / "pedidos"
+    pasta.mkdir()
+    indice = _indice(tuba)
+    indice.diferenca(str(pasta))
+    for i in range(6):
+        (pasta / f"{i}.pdf").write_bytes(b"x")
+        indice.registrar(str(pasta / f"{i}.pdf"))
+    assert indice.linhas_diario == 0
+    assert _linhas(tuba.INDICE_DIARIO_PATH) == []
+    assert len(_linhas(tuba.INDICE_PATH)) == 7
+    indice.fechar()
@@ -0,0 +1,33 @@
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def raiz_restaurada():
+    """configurar_logging() troca os handlers da raiz; devolve os do pytest no fim."""
+    raiz = logging.getLogger()
+    handlers, nivel = list(raiz.handlers), raiz.level
+    yield
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    for handler in handlers:
+        raiz.addHandler(handler)
+    raiz.setLevel(nivel)
+
+
+def test_encerramento_registrado_uma_vez(tuba, tmp_path, monkeypatch, raiz_restaurada):
+    registrados = []
+    monkeypatch.setattr(tuba, "LOG_PATH", str(tmp_path / "tuba_monitor.log"))
+    monkeypatch.setattr(tuba, "log_encerramento_registrado", False)
+    monkeypatch.setattr(tuba.atexit, "register", registrados.append)
+    try:
+        tuba.configurar_logging()
+        primeiro = tuba.log_listener
+        tuba.configurar_logging()
+        assert tuba.log_listener is not primeiro
+        # A thread da configuração anterior foi parada
+        assert primeiro._thread is None
+    finally:
+        tuba.encerrar_logging()
+    assert registrados == [tuba.encerrar_logging]
@@ -0,0 +1,164 @@
+import threading
+import time
+from concurrent import futures
+
+import pytest
+
+import tuba_monitor
+
+
+@pytest.fixture
+def extrator_travado(monkeypatch):
+    """Substitui o extrator de PDF por um que fica preso até o fim do teste."""
+    liberar = threading.Event()
+    chamadas = []
+
+    def travado(caminho, opcoes):
+        chamadas.append(caminho)
+        liberar.wait(10)
+        return {"cliente": "ACME"}
+
+    monkeypatch.setitem(tuba_monitor.EXTRATORES, "pdf", ((".pdf",), travado))
+    yield chamadas
+    liberar.set()
+
+
+def _pedidos(pasta, quantidade):
+    caminhos = []
+    for i in range(quantidade):
+        caminho = pasta / f"pedido_{i}.pdf"
+        caminho.write_bytes(b"%PDF-1.4")
+        caminhos.append(str(caminho))
+    return caminhos
+
+
+def test_extrator_lento_nao_atrasa_os_eventos_seguintes(tmp_path, extrator_travado):
+    extrator = tuba_monitor.ExtratorMetadados(workers=2, tempo_limite=0.5)
+    try:
+        resultados = [extrator.extrair(caminho) for caminho in _pedidos(tmp_path, 8)]
+    finally:
+        extrator.pool.shutdown(wait=False)
+    # Só o primeiro evento espera o tempo limite; os demais pulam o extrator
+    # ocupado em vez de esperar por ele
+    assert len(extrator_travado) == 1
+    assert "pdf" in extrator.ocupados
+    assert not any("cliente" in r for r in resultados)
+    # O extrator do nome roda fora do pool e sempre entrega o número do pedido
+    assert [r.get("pedido") for r in resultados] == [str(i) for i in range(8)]
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 100.0
+
+    def __call__(self):
+        return self.agora
+
+
+class PoolSimulado:
+    """
+    Pool que não roda nada: cada futuro "termina" `duracoes[funcao]` segundos
+    depois de submetido, e result() só avança o relógio falso.
+    """
+
+    def __init__(self, relogio, duracoes):
+        self.relogio = relogio
+        self.duracoes = duracoes
+        self.esperas = []
+
+    def submit(self, funcao, caminho, opcoes):
+        return FuturoSimulado(self, self.relogio.agora + self.duracoes[funcao], funcao(caminho, opcoes))
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class FuturoSimulado:
+    def __init__(self, pool, termina_em, resultado):
+        self.pool = pool
+        self.termina_em = termina_em
+        self.resultado = resultado
+
+    def result(self, timeout=None):
+        self.pool.esperas.append(timeout)
+        relogio = self.pool.relogio
+        if self.termina_em > relogio.agora + timeout:
+            relogio.agora += timeout
+            raise futures.TimeoutError()
+        relogio.agora = max(relogio.agora, self.termina_em)
+        return self.resultado
+
+    def cancel(self):
+        return True
+
+
+def test_tempo_limite_e_um_prazo_unico_por_evento(tmp_path, monkeypatch):
+    def preso(caminho, opcoes):
+        return {"cliente": "ACME"}
+
+    def lento(caminho, opcoes):
+        return {"total": "10,00"}
+
+    monkeypatch.setitem(tuba_monitor.EXTRATORES, "pdf", ((".pdf",), preso))
+    monkeypatch.setitem(tuba_monitor.EXTRATORES, "lento", ((".pdf",), lento))
+    relogio = Relogio()
+    extrator = tuba_monitor.ExtratorMetadados(workers=2, tempo_limite=0.5, relogio=relogio)
+    extrator.pool = PoolSimulado(relogio, {preso: 60.0, lento: 0.4})
+    campos = extrator.extrair(_pedidos(tmp_path, 1)[0])
+
+    # O lento rodou junto com o preso e terminou dentro do mesmo prazo: depois
+    # de esgotar o preso, não há mais nada a esperar (antes: 0,5 s + 0,5 s)
+    assert extrator.pool.esperas == [0.5, 0.0]
+    assert campos == {"pedido": "0", "total": "10,00"}
+
+
+def test_extrator_volta_a_ser_usado_quando_termina(tmp_path, monkeypatch):
+    liberar = threading.Event()
+
+    def travado_uma_vez(caminho, opcoes):
+        liberar.wait(10)
+        return {"cliente": "ACME"}
+
+    monkeypatch.setitem(tuba_monitor.EXTRATORES, "pdf", ((".pdf",), travado_uma_vez))
+    extrator = tuba_monitor.ExtratorMetadados(workers=2, tempo_limite=0.2)
+    try:
+        primeiro, segundo = _pedidos(tmp_path, 2)
+        assert "cliente" not in extrator.extrair(primeiro)
+        liberar.set()
+        for _ in range(50):
+            if "pdf" not in extrator.ocupados:
+                break
+            time.sleep(0.01)
+        assert extrator.extrair(segundo)["cliente"] == "ACME"
+    finally:
+        extrator.pool.shutdown(wait=False)
+
+
+def test_rajada_e_processada_em_paralelo(tmp_path, monkeypatch):
+    # Cada extração só termina quando as três estão rodando ao mesmo tempo;
+    # em série, a primeira quebraria a barreira e sairia sem o cliente
+    barreira = threading.Barrier(3, timeout=5)
+
+    def junto(caminho, opcoes):
+        barreira.wait()
+        return {"cliente": "ACME"}
+
+    monkeypatch.setitem(tuba_monitor.EXTRATORES, "pdf", ((".pdf",), junto))
+    extrator = tuba_monitor.ExtratorMetadados(workers=3, tempo_limite=10)
+    prontos = []
+    todos = threading.Event()
+
+    def continuar(evento):
+        prontos.append(evento)
+        if len(prontos) == 3:
+            todos.set()
+
+    extrator.iniciar()
+    try:
+        for caminho in _pedidos(tmp_path, 3):
+            extrator.processar(tuba_monitor.EventoArquivo(caminho, "loja"), continuar)
+        assert todos.wait(10)
+    finally:
+        extrator.parar()
+    assert all(evento.metadados["cliente"] == "ACME" for evento in prontos)
+    assert sorted(evento.metadados["pedido"] for evento in prontos) == ["0", "1", "2"]
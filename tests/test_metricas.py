@@ -0,0 +1,93 @@
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+DEFINICOES = (
+    ("t_eventos_total", "counter", "Eventos", None),
+    ("t_espera_segundos", "histogram", "Espera", (0.5, 1.0)),
+)
+
+
+def _metricas(tuba):
+    return tuba.Metricas(DEFINICOES)
+
+
+def test_contador_com_rotulos(tuba):
+    metricas = _metricas(tuba)
+    metricas.incrementar("t_eventos_total", tipo="criado", pasta="loja")
+    metricas.incrementar("t_eventos_total", 2, pasta="loja", tipo="criado")
+    metricas.incrementar("t_eventos_total")
+
+    linhas = metricas.exportar_prometheus().splitlines()
+    assert linhas[:4] == [
+        "# HELP t_eventos_total Eventos",
+        "# TYPE t_eventos_total counter",
+        't_eventos_total{pasta="loja",tipo="criado"} 3',
+        "t_eventos_total 1",
+    ]
+
+
+def test_histograma_acumula_as_faixas(tuba):
+    metricas = _metricas(tuba)
+    for valor in (0.2, 0.5, 0.7, 3.0):
+        metricas.observar("t_espera_segundos", valor, pasta="loja")
+
+    texto = metricas.exportar_prometheus()
+    assert texto.endswith("\n")
+    assert texto.splitlines()[2:] == [
+        "# HELP t_espera_segundos Espera",
+        "# TYPE t_espera_segundos histogram",
+        't_espera_segundos_bucket{pasta="loja",le="0.5"} 2',
+        't_espera_segundos_bucket{pasta="loja",le="1.0"} 3',
+        't_espera_segundos_bucket{pasta="loja",le="+Inf"} 4',
+        't_espera_segundos_sum{pasta="loja"} 4.4',
+        't_espera_segundos_count{pasta="loja"} 4',
+    ]
+
+
+def test_rotulos_sao_escapados(tuba):
+    metricas = _metricas(tuba)
+    metricas.incrementar("t_eventos_total", pasta='C:\\pedidos\\"loja"\nnova')
+    assert 't_eventos_total{pasta="C:\\\\pedidos\\\\\\"loja\\"\\nnova"} 1' in metricas.exportar_prometheus()
+
+
+def test_medidores_sao_lidos_na_exportacao(tuba):
+    metricas = _metricas(tuba)
+    fila = [1, 2, 3]
+    metricas.medidor("t_fila", "Eventos na fila", lambda: len(fila))
+    metricas.medidor("t_quebrado", "Medidor com erro", lambda: 1 / 0)
+    fila.append(4)
+
+    linhas = metricas.exportar_prometheus().splitlines()
+    assert linhas[-3:] == ["# HELP t_fila Eventos na fila", "# TYPE t_fila gauge", "t_fila 4"]
+    assert not any("t_quebrado" in linha for linha in linhas)
+
+
+def test_todas_as_metricas_do_app_sao_declaradas(tuba):
+    texto = tuba.Metricas().exportar_prometheus()
+    for nome, tipo, ajuda, limites in tuba.METRICAS_DEFINICOES:
+        assert f"# TYPE {nome} {tipo}\n" in texto
+
+
+@pytest.fixture
+def servidor(tuba, monkeypatch):
+    metricas = _metricas(tuba)
+    monkeypatch.setattr(tuba, "metricas", metricas)
+    servidor = tuba._criar_servidor_metricas(0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield metricas, f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_endpoint_metrics(servidor):
+    metricas, url = servidor
+    metricas.incrementar("t_eventos_total", pasta="loja")
+    with urllib.request.urlopen(f"{url}/metrics?x=1", timeout=5) as resposta:
+        assert resposta.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+        assert 't_eventos_total{pasta="loja"} 1' in resposta.read().decode("utf-8")
+    with pytest.raises(urllib.error.HTTPError) as erro:
+        urllib.request.urlopen(f"{url}/outra", timeout=5)
+    assert erro.value.code == 404
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+
+class ObserverFalso:
+    """Observer vivo que só registra o que foi agendado e desagendado."""
+
+    def __init__(self):
+        self.agendados = {}
+        self.desagendados = []
+
+    def is_alive(self):
+        return True
+
+    def schedule(self, handler, caminho, recursive=False):
+        watch = (caminho, recursive)
+        self.agendados[watch] = handler
+        return watch
+
+    def unschedule(self, watch):
+        self.desagendados.append(watch)
+        del self.agendados[watch]
+
+
+@pytest.fixture
+def monitor(tuba, tmp_path, monkeypatch):
+    """Monitor "rodando" com as pastas loja e site agendadas no ObserverFalso."""
+    observador = ObserverFalso()
+    monkeypatch.setattr(tuba, "observer", observador)
+    monkeypatch.setattr(tuba, "watches", {})
+    monkeypatch.setattr(tuba, "indice", None)
+    monkeypatch.setattr(tuba, "pasta", None)
+    for nome in ("loja", "site", "balcao"):
+        (tmp_path / nome).mkdir()
+    for nome in ("loja", "site"):
+        assert tuba.adicionar_pasta({"caminho": str(tmp_path / nome), "rotulo": nome}, salvar=False)
+    observador.inicial = dict(tuba.watches)
+    return observador
+
+
+def test_adicionar_nao_mexe_nas_outras_pastas(tuba, tmp_path, monitor):
+    balcao = str(tmp_path / "balcao")
+    assert tuba.adicionar_pasta({"caminho": balcao, "rotulo": "balcao", "recursivo": True})
+
+    assert monitor.desagendados == []
+    assert {c: tuba.watches[c] for c in monitor.inicial} == monitor.inicial
+    assert tuba.watches[balcao] == (monitor, (balcao, True))
+    assert monitor.agendados[(balcao, True)].rotulo == "balcao"
+    assert [p["rotulo"] for p in tuba.pastas] == ["loja", "site", "balcao"]
+    with open(tuba.CONFIG_PATH, encoding="utf-8") as f:
+        assert [p["rotulo"] for p in json.load(f)["pastas"]] == ["loja", "site", "balcao"]
+
+
+def test_adicionar_de_novo_nao_agenda_duas_vezes(tuba, tmp_path, monitor):
+    assert tuba.adicionar_pasta({"caminho": str(tmp_path / "loja"), "rotulo": "loja"}, salvar=False)
+    assert len(monitor.agendados) == 2
+    assert [p["rotulo"] for p in tuba.pastas] == ["site", "loja"]
+
+
+def test_adicionar_pasta_inexistente_falha(tuba, tmp_path, monitor):
+    assert not tuba.adicionar_pasta({"caminho": str(tmp_path / "nao_existe")}, salvar=False)
+    assert tuba.watches == monitor.inicial
+
+
+def test_remover_so_desagenda_a_pasta_removida(tuba, tmp_path, monitor):
+    loja = str(tmp_path / "loja")
+    site = str(tmp_path / "site")
+    assert tuba.remover_pasta(loja)
+
+    assert monitor.desagendados == [(loja, False)]
+    assert tuba.watches == {site: monitor.inicial[site]}
+    assert [p["caminho"] for p in tuba.pastas] == [site]
+    assert tuba.pasta == site
+    assert not tuba.remover_pasta(loja)
+    assert monitor.desagendados == [(loja, False)]
@@ -0,0 +1,60 @@
+import tuba_monitor
+
+
+def _motor(*regras, **opcoes):
+    return tuba_monitor.MotorRegras(list(regras), **opcoes)
+
+
+def test_vale_a_primeira_regra_que_casar():
+    urgente = {"nome": "urgente", "incluir": ["*urgente*"], "acao": {"prioridade": 10}}
+    pdf = {"nome": "pdf", "extensoes": ["pdf"], "acao": {"silencioso": True}}
+
+    motor = _motor(urgente, pdf)
+    assert motor.avaliar("pedido_URGENTE.pdf").nome == "urgente"
+    assert motor.avaliar("pedido.pdf").nome == "pdf"
+    assert motor.avaliar("pedido.txt") is tuba_monitor.ACAO_PADRAO
+
+    # Mesma lista em outra ordem: a regra de extensão passa na frente
+    assert _motor(pdf, urgente).avaliar("pedido_urgente.pdf").nome == "pdf"
+
+
+def test_extensao_escolhe_as_candidatas_sem_perder_a_ordem():
+    a = {"nome": "a", "incluir": ["a*"]}
+    so_pdf = {"nome": "so_pdf", "extensoes": [".PDF", "xml"]}
+    resto = {"nome": "resto", "incluir": ["*"]}
+    motor = _motor(a, so_pdf, resto)
+
+    assert [r.nome for r in motor.por_extensao[".pdf"]] == ["a", "so_pdf", "resto"]
+    assert [r.nome for r in motor.genericas] == ["a", "resto"]
+    assert motor.avaliar("abc.pdf").nome == "a"
+    assert motor.avaliar("x.PDF").nome == "so_pdf"
+    assert motor.avaliar("x.xml").nome == "so_pdf"
+    # Extensão que nenhuma regra cita: só as genéricas são avaliadas
+    assert motor.avaliar("x.txt").nome == "resto"
+
+
+def test_regra_de_extensao_nao_vale_para_outras():
+    motor = _motor({"nome": "pdf", "extensoes": ["pdf"], "acao": {"ignorar": True}})
+    assert motor.avaliar("pedido.xml") is tuba_monitor.ACAO_PADRAO
+    assert motor.avaliar("pedido.pdf").ignorar
+
+
+def test_excluir_e_regex():
+    motor = _motor({"nome": "pedidos", "regex": r"^pedido_\d+", "excluir": ["*_rascunho*"]})
+    assert motor.avaliar("pedido_12.pdf").nome == "pedidos"
+    assert motor.avaliar("pedido_12_rascunho.pdf") is tuba_monitor.ACAO_PADRAO
+    assert motor.avaliar("orcamento_12.pdf") is tuba_monitor.ACAO_PADRAO
+
+
+def test_tamanho_minimo_espera_o_tamanho():
+    motor = _motor({"nome": "grande", "tamanho_minimo": 1000})
+    assert motor.avaliar("a.pdf") is None
+    assert motor.avaliar("a.pdf", 999) is tuba_monitor.ACAO_PADRAO
+    assert motor.avaliar("a.pdf", 1000).nome == "grande"
+
+
+def test_nomes_ignorados_sem_diferenciar_maiusculas():
+    motor = _motor({"nome": "tudo", "incluir": ["*"]}, ignorar_nomes=["Thumbs.db", "lixo.tmp"])
+    assert motor.avaliar("THUMBS.DB") is tuba_monitor.ACAO_IGNORAR
+    assert motor.avaliar("Lixo.TMP") is tuba_monitor.ACAO_IGNORAR
+    assert motor.avaliar("pedido.pdf").nome == "tudo"
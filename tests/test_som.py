@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+import tuba_monitor
+
+
+class Relogio:
+    """Relógio que só anda quando o teste manda (e acorda o reprodutor)."""
+
+    def __init__(self):
+        self.agora = 0.0
+        self.reprodutor = None
+
+    def __call__(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+        with self.reprodutor.cond:
+            self.reprodutor.cond.notify_all()
+
+
+class CacheFalso:
+    def obter(self, caminho):
+        return caminho
+
+
+class BackendFalso:
+    """Registra (instante, som) de cada reprodução; com `segurar`, o som toca até ser interrompido."""
+
+    def __init__(self, relogio, segurar=False):
+        self.relogio = relogio
+        self.segurar = segurar
+        self.tocados = []
+        self.interrupcoes = 0
+        self.fim = threading.Event()
+        self.mudou = threading.Condition()
+
+    def tocar(self, dados):
+        with self.mudou:
+            self.tocados.append((self.relogio(), dados))
+            self.mudou.notify_all()
+        if self.segurar:
+            self.fim.wait(5)
+            self.fim.clear()
+
+    def interromper(self):
+        self.interrupcoes += 1
+        self.fim.set()
+
+    def esperar(self, quantidade, timeout=2):
+        with self.mudou:
+            return self.mudou.wait_for(lambda: len(self.tocados) >= quantidade, timeout)
+
+
+@pytest.fixture
+def som():
+    criados = []
+
+    def criar(intervalo_minimo=10, segurar=False):
+        relogio = Relogio()
+        backend = BackendFalso(relogio, segurar)
+        reprodutor = tuba_monitor.ReprodutorSom(backend, intervalo_minimo, cache=CacheFalso(), relogio=relogio)
+        relogio.reprodutor = reprodutor
+        criados.append(reprodutor)
+        return reprodutor, backend, relogio
+
+    yield criar
+    for reprodutor in criados:
+        reprodutor.parar()
+
+
+def test_intervalo_minimo_entre_sons(som):
+    reprodutor, backend, relogio = som(intervalo_minimo=10)
+    assert reprodutor.tocar("a.wav")
+    assert backend.esperar(1)
+    assert reprodutor.tocar("b.wav")
+    relogio.avancar(5)
+    time.sleep(0.1)
+    assert len(backend.tocados) == 1
+    relogio.avancar(5)
+    assert backend.esperar(2)
+    assert backend.tocados == [(0.0, "a.wav"), (10.0, "b.wav")]
+
+
+def test_pendentes_ocupam_uma_vaga(som):
+    reprodutor, backend, relogio = som(intervalo_minimo=10)
+    reprodutor.tocar("a.wav")
+    assert backend.esperar(1)
+    # Durante o intervalo: o mais recente substitui, o de menor prioridade é descartado
+    assert reprodutor.tocar("b.wav")
+    assert reprodutor.tocar("c.wav")
+    assert reprodutor.tocar("alto.wav", prioridade=5)
+    assert not reprodutor.tocar("baixo.wav", prioridade=1)
+    relogio.avancar(10)
+    assert backend.esperar(2)
+    relogio.avancar(20)
+    time.sleep(0.1)
+    assert [som for _, som in backend.tocados] == ["a.wav", "alto.wav"]
+
+
+def test_prioridade_maior_interrompe_o_som_atual(som):
+    reprodutor, backend, relogio = som(intervalo_minimo=10, segurar=True)
+    reprodutor.tocar("normal.wav")
+    assert backend.esperar(1)
+    # Mesma prioridade: espera o som atual e o intervalo
+    reprodutor.tocar("outro.wav")
+    time.sleep(0.1)
+    assert backend.interrupcoes == 0 and len(backend.tocados) == 1
+    # Prioridade maior: interrompe e toca na hora, sem esperar o intervalo
+    assert reprodutor.tocar("urgente.wav", prioridade=10)
+    assert backend.esperar(2)
+    assert backend.interrupcoes == 1
+    assert backend.tocados == [(0.0, "normal.wav"), (0.0, "urgente.wav")]
@@ -0,0 +1,98 @@
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+class ObserverQueMorre:
+    """Observer que sobe, mas cujo emissor morre antes da verificação seguinte."""
+
+    vivo = False
+
+    def __init__(self):
+        self.emitters = []
+
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return ObserverQueMorre.vivo
+
+    def stop(self):
+        pass
+
+    def join(self, timeout=None):
+        pass
+
+
+def _supervisor(tuba, monkeypatch, relogio):
+    monkeypatch.setattr(tuba, "Observer", ObserverQueMorre)
+    monkeypatch.setattr(tuba, "observer", None)
+    monkeypatch.setattr(tuba, "observador_varredura", None)
+    monkeypatch.setattr(tuba, "indice", None)
+    monkeypatch.setattr(ObserverQueMorre, "vivo", False)
+    return tuba.SupervisorMonitor(intervalo=10, batimento=0, espera_max=300, estavel=120, relogio=relogio)
+
+
+def test_observer_que_continua_morrendo_espera_cada_vez_mais(tuba, monkeypatch):
+    relogio = Relogio()
+    supervisor = _supervisor(tuba, monkeypatch, relogio)
+    instantes = []
+    for _ in range(100):
+        antes = supervisor.reinicios
+        supervisor._verificar()
+        if supervisor.reinicios != antes:
+            instantes.append(relogio.agora - 1000.0)
+        relogio.agora += supervisor.intervalo
+
+    # Sem espera, seriam 100 reinícios (um por verificação)
+    assert instantes == [0, 20, 60, 140, 300, 600, 900]
+
+
+def test_espera_volta_a_zero_depois_de_ficar_de_pe(tuba, monkeypatch):
+    relogio = Relogio()
+    supervisor = _supervisor(tuba, monkeypatch, relogio)
+    supervisor._verificar()
+    relogio.agora += 20
+    supervisor._verificar()
+    assert supervisor.reinicios == 2
+
+    ObserverQueMorre.vivo = True
+    relogio.agora += 60
+    supervisor._verificar()
+    assert supervisor.falhas == 2
+    relogio.agora += 60
+    supervisor._verificar()
+    assert supervisor.falhas == 0
+
+    # A próxima morte é tratada na hora
+    ObserverQueMorre.vivo = False
+    relogio.agora += 1
+    supervisor._verificar()
+    assert supervisor.reinicios == 3
+
+
+class Etapa:
+    def __init__(self, paradas):
+        self.paradas = paradas
+
+    def parar(self):
+        self.paradas.append(self)
+
+    fechar = parar
+
+
+def test_parar_monitor_encerra_o_pipeline_com_o_observer_ja_morto(tuba, monkeypatch):
+    paradas = []
+    etapas = {nome: Etapa(paradas) for nome in ("rastreador", "despachante", "agrupador", "indice")}
+    for nome, etapa in etapas.items():
+        monkeypatch.setattr(tuba, nome, etapa)
+    monkeypatch.setattr(ObserverQueMorre, "vivo", False)
+    monkeypatch.setattr(tuba, "observer", ObserverQueMorre())
+    monkeypatch.setattr(tuba, "supervisor", None)
+
+    assert tuba.parar_monitor() is False
+    assert len(paradas) == 4
+    assert all(getattr(tuba, nome) is None for nome in etapas)
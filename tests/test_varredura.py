@@ -0,0 +1,64 @@
+import os
+
+import tuba_monitor
+
+
+class HandlerRegistrado:
+    def __init__(self):
+        self.eventos = []
+
+    def dispatch(self, evento):
+        self.eventos.append((evento.event_type, evento.src_path, getattr(evento, "dest_path", "")))
+
+
+def _varredura(pasta):
+    observador = tuba_monitor.ObservadorVarredura()
+    handler = HandlerRegistrado()
+    pasta_varrida = observador.schedule(handler, str(pasta))
+    observador._varrer(pasta_varrida)  # primeira listagem: só registra
+    return observador, pasta_varrida, handler
+
+
+def test_renomeacao_vira_evento_de_movimento(tmp_path):
+    (tmp_path / "pedido.pdf").write_bytes(b"%PDF pedido")
+    observador, pasta_varrida, handler = _varredura(tmp_path)
+    os.rename(tmp_path / "pedido.pdf", tmp_path / "pedido_ok.pdf")
+    assert observador._varrer(pasta_varrida)
+    assert handler.eventos == [("moved", str(tmp_path / "pedido.pdf"), str(tmp_path / "pedido_ok.pdf"))]
+
+
+def test_arquivo_novo_e_removido_continuam_separados(tmp_path):
+    (tmp_path / "antigo.pdf").write_bytes(b"antigo")
+    observador, pasta_varrida, handler = _varredura(tmp_path)
+    os.remove(tmp_path / "antigo.pdf")
+    (tmp_path / "novo.pdf").write_bytes(b"um pedido diferente")
+    assert observador._varrer(pasta_varrida)
+    assert sorted(handler.eventos) == [
+        ("created", str(tmp_path / "novo.pdf"), ""),
+        ("deleted", str(tmp_path / "antigo.pdf"), ""),
+    ]
+
+
+def test_renomear_pedido_ja_notificado_nao_notifica_de_novo(tmp_path, monkeypatch):
+    class RastreadorRegistrado:
+        def __init__(self):
+            self.acompanhados = []
+            self.movidos = []
+
+        def acompanhar(self, caminho, rotulo=None):
+            self.acompanhados.append(caminho)
+
+        def movido(self, origem, destino, rotulo=None):
+            self.movidos.append((origem, destino))
+
+    rastreador = RastreadorRegistrado()
+    monkeypatch.setattr(tuba_monitor, "rastreador", rastreador)
+    monkeypatch.setattr(tuba_monitor, "indice", None)
+    (tmp_path / "pedido.pdf").write_bytes(b"%PDF pedido")
+    observador = tuba_monitor.ObservadorVarredura()
+    pasta_varrida = observador.schedule(tuba_monitor.Handler("loja"), str(tmp_path))
+    observador._varrer(pasta_varrida)
+    os.rename(tmp_path / "pedido.pdf", tmp_path / "pedido_ok.pdf")
+    observador._varrer(pasta_varrida)
+    assert rastreador.acompanhados == []
+    assert rastreador.movidos == [(str(tmp_path / "pedido.pdf"), str(tmp_path / "pedido_ok.pdf"))]
@@ -3,17 +3,28 @@ import sys
 import time
 import threading
 import json
-import tkinter as tk
-from tkinter import filedialog
+import argparse
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-from win10toast import ToastNotifier
-import pystray
-from pystray import MenuItem as item, Menu
-from PIL import Image
-import winsound
+from watchdog.events import (
+    FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent, FileDeletedEvent, FileMovedEvent,
+)
 import subprocess
 import logging
+import logging.handlers
+import queue
+import atexit
+import bisect
+import sqlite3
+import csv
+import zlib
+from array import array
+from collections import OrderedDict, deque
+import heapq
+import random
+import hashlib
+import re
+import fnmatch
+import struct
 
 # ---------------------------------------------------
 # Metadados da Aplicação
@@ -39,223 +50,5102 @@ def resource_path(relative_path):
         base_path = os.path.dirname(__file__)
     return os.path.join(base_path, relative_path)
 
-# Caminhos principais (agora resolvidos via resource_path)
-APP_DIR = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(__file__)
-CONFIG_PATH = os.path.join(APP_DIR, "config.json")
-LOG_PATH = os.path.join(APP_DIR, "tuba_monitor.log")
+# Caminhos principais (agora resolvidos via resource_path)
+APP_DIR = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(__file__)
+CONFIG_PATH = os.path.join(APP_DIR, "config.json")
+LOG_PATH = os.path.join(APP_DIR, "tuba_monitor.log")
+INDICE_PATH = os.path.join(APP_DIR, "tuba_indice.tsv")
+INDICE_DIARIO_PATH = os.path.join(APP_DIR, "tuba_indice.diario.tsv")
+DIARIO_PATH = os.path.join(APP_DIR, "tuba_pedidos.db")
+CONTADORES_PATH = os.path.join(APP_DIR, "tuba_contadores.json")
+METRICAS_PATH = os.path.join(APP_DIR, "tuba_metricas.json")
+DUPLICADOS_PATH = os.path.join(APP_DIR, "tuba_duplicados.tsv")
+SAIDA_PATH = os.path.join(APP_DIR, "tuba_saida.db")
+HUB_ESTADO_PATH = os.path.join(APP_DIR, "tuba_hub.json")
+
+ICON_PATH = resource_path("icone.ico")
+
+# Sons resolvidos via resource_path (garante que funcionem no exe gerado)
+START_SOUND = resource_path("start.wav")
+ALERT_SOUND = resource_path("alert.wav")
+PAUSE_SOUND = resource_path("pause.wav")
+
+# ---------------------------------------------------
+# Logging
+# ---------------------------------------------------
+# Campos estruturados vão em extra={"campos": {...}}; no formato texto viram
+# "chave=valor" ao fim da linha e no formato JSON, chaves do objeto.
+log_listener = None
+log_encerramento_registrado = False  # atexit de encerrar_logging já registrado
+
+class FormatadorTexto(logging.Formatter):
+    """Formato original do log, com os campos estruturados ao final."""
+
+    def format(self, record):
+        texto = super().format(record)
+        campos = getattr(record, "campos", None)
+        if campos:
+            texto += " | " + " ".join(f"{chave}={valor}" for chave, valor in campos.items())
+        return texto
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por registro (JSON Lines)."""
+
+    def format(self, record):
+        dados = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "nivel": record.levelname,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        campos = getattr(record, "campos", None)
+        if campos:
+            dados.update(campos)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            dados["exc"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+def configurar_logging():
+    """
+    Configura o logging (arquivo com rotação + console). Chamado na inicialização.
+
+    Quem loga só coloca o registro em uma fila (QueueHandler); a escrita em
+    disco e no console é feita por uma thread de fundo (QueueListener), fora
+    do caminho de detecção. Opções na seção "log" do config.json.
+    """
+    global log_listener, log_encerramento_registrado
+    opcoes = ler_config().get("log") or {}
+    retencao = int(opcoes.get("retencao", LOG_RETENCAO))
+    if opcoes.get("rotacao", LOG_ROTACAO) == "diaria":
+        arquivo = logging.handlers.TimedRotatingFileHandler(
+            LOG_PATH, when="midnight", backupCount=retencao, encoding="utf-8"
+        )
+    else:
+        arquivo = logging.handlers.RotatingFileHandler(
+            LOG_PATH,
+            maxBytes=int(float(opcoes.get("tamanho_max_mb", LOG_TAMANHO_MAX_MB)) * 1024 * 1024),
+            backupCount=retencao,
+            encoding="utf-8",
+        )
+    if opcoes.get("formato", LOG_FORMATO) == "json":
+        arquivo.setFormatter(FormatadorJson())
+    else:
+        arquivo.setFormatter(FormatadorTexto('%(asctime)s - %(levelname)s - %(message)s'))
+    console = logging.StreamHandler()
+    console.setFormatter(FormatadorTexto('%(asctime)s - %(levelname)s - %(message)s'))
+
+    # Chamado de novo: a thread e os arquivos da configuração anterior saem antes
+    encerrar_logging()
+    fila = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(logging.handlers.QueueHandler(fila))
+    raiz.setLevel(getattr(logging, str(opcoes.get("nivel", "INFO")).upper(), logging.INFO))
+
+    log_listener = logging.handlers.QueueListener(fila, arquivo, console, respect_handler_level=True)
+    log_listener.start()
+    if not log_encerramento_registrado:
+        atexit.register(encerrar_logging)
+        log_encerramento_registrado = True
+    # Avisos da leitura do config.json feita antes de o log existir
+    configuracao.relatar_pendentes()
+
+def encerrar_logging():
+    """Esvazia a fila de logs e para a thread de escrita."""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        for handler in log_listener.handlers:
+            handler.close()
+        log_listener = None
+
+# Recarga do config.json editado (segundos de espera após a última mudança)
+CONFIG_ESPERA_RECARGA = 0.5
+
+# Log (seção "log" do config.json)
+LOG_FORMATO = "texto"       # "texto" ou "json" (JSON Lines)
+LOG_ROTACAO = "tamanho"     # "tamanho" ou "diaria"
+LOG_TAMANHO_MAX_MB = 5
+LOG_RETENCAO = 10           # arquivos antigos mantidos
+
+# Variáveis globais
+observer = None
+observador_varredura = None  # backend de varredura, compartilhado pelas pastas com "backend": "varredura"
+pasta = None          # pasta principal (primeira de "pastas"), usada por abrir_pasta
+pastas = []           # entradas {"caminho", "recursivo", "rotulo"} do config.json
+watches = {}          # caminho -> (observador, watch) agendado no backend da pasta
+monitor_lock = threading.Lock()
+monitor_ativo = False
+monitor_pausado = False  # pausa só silencia; o observer continua rodando
+saude_monitor = "ok"     # estado exposto pelo supervisor (bandeja e log)
+ultimo_evento = {}       # caminho da pasta -> monotonic do último evento do watchdog
+supervisor = None
+exportador_metricas = None
+duplicados = None  # DetectorDuplicados, se ativado no config.json
+extrator_metadados = None
+caixa_saida = None
+coordenador_hub = None  # CoordenadorHub, com a seção "hub" do config.json
+servidor_hub = None     # ServidorHub, enquanto esta estação é o hub
+servidor_controle = None
+seletor_lock = threading.Lock()  # um diálogo de seleção de pasta por vez
+despachante = None
+agrupador = None
+rastreador = None
+motor_regras = None
+indice = None
+diario = None
+contador = None
+atualizador_resumo = None
+
+# Limites padrão da fila de notificações (podem ser sobrescritos em config.json,
+# seção "notificacoes")
+FILA_MAX_EVENTOS = 500
+FILA_POLITICA = "descartar_antigos"  # "descartar_antigos", "descartar_novos" ou "mesclar"
+FILA_WORKERS = 1
+# Janela (s) em que arquivos detectados são agrupados em um único toast
+JANELA_AGRUPAMENTO = 1.5
+# Quantidade máxima de nomes exibidos no toast de resumo
+NOMES_RESUMO = 3
+
+# Detecção de escrita concluída (seção "estabilidade" do config.json)
+INTERVALO_ESTABILIDADE = 0.5     # segundos entre verificações de um pendente
+CHECAGENS_ESTAVEIS = 2           # verificações seguidas sem mudança de tamanho/mtime
+TEMPO_MAXIMO_ESTABILIDADE = 600  # após isso notifica mesmo sem estabilizar
+PREFIXOS_TEMPORARIOS = ("~$", ".~", "~")
+SUFIXOS_TEMPORARIOS = (".tmp", ".temp", ".part", ".partial", ".crdownload", ".download", ".filepart")
+
+# Arquivos de sistema sempre ignorados (ampliável com "ignorar_nomes" no config.json)
+NOMES_IGNORADOS = ("Thumbs.db", "desktop.ini", ".DS_Store", ".tuba_hub.lock")  # a última é HUB_TRAVA_NOME
+
+# Linhas mínimas no diário do índice antes de consolidá-lo no arquivo base
+INDICE_COMPACTAR_MIN = 5000
+
+# Backend de varredura (seção "varredura" do config.json)
+BACKENDS = ("nativo", "varredura")
+VARREDURA_INTERVALO_MIN = 1.0   # intervalo logo após alguma mudança
+VARREDURA_INTERVALO_MAX = 15.0  # teto do intervalo com a pasta ociosa
+
+# Diário de pedidos: gravação em lotes
+DIARIO_LOTE_MAX = 500
+DIARIO_ESPERA_LOTE = 0.5  # segundos agrupando linhas antes de gravar
+
+# Pedidos duplicados (seção "duplicados" do config.json; desativado por padrão)
+DUPLICADOS_MODO = "avisar"        # "avisar" (toast próprio) ou "suprimir"
+DUPLICADOS_RETENCAO_DIAS = 30
+DUPLICADOS_MAX_ENTRADAS = 50000
+DUPLICADOS_WORKERS = 2
+DUPLICADOS_TAMANHO_MINIMO = 1     # arquivos vazios nunca são comparados
+
+# Metadados do pedido (seção "metadados" do config.json)
+METADADOS_WORKERS = 2
+METADADOS_TEMPO_LIMITE = 2.0     # segundos por extrator
+METADADOS_CACHE = 256            # resultados em cache, por (caminho, tamanho, mtime)
+METADADOS_BYTES_MAX = 256 * 1024 # quanto do início do arquivo cada extrator lê
+METADADOS_NOME_REGEX = r"(?i)pedido[\s_-]*(?:n[º°o.]*)?[\s_-]*(?P<pedido>\d+)"
+
+# Destinos externos (seção "destinos" do config.json)
+SAIDA_LOTE_MAX = 100        # pedidos por envio
+SAIDA_ESPERA_LOTE = 1.0     # segundos juntando uma rajada antes de enviar
+SAIDA_ESPERA_INICIAL = 2.0  # primeira espera após uma falha (dobra a cada falha)
+SAIDA_ESPERA_MAX = 300.0
+
+# Supervisão do monitor (seção "supervisao" do config.json)
+SUPERVISAO_INTERVALO = 10.0   # segundos entre verificações
+SUPERVISAO_BATIMENTO = 60.0   # segundos entre assinaturas das pastas (0 desativa)
+SUPERVISAO_ESPERA_MAX = 300.0 # teto da espera exponencial entre reinícios
+SUPERVISAO_ESTAVEL = 120.0    # segundos de pé após um reinício para zerar a espera
+
+# Tooltip da bandeja e contadores
+RESUMO_INTERVALO_MINIMO = 2.0       # segundos entre duas atualizações do tooltip
+CONTADORES_INTERVALO_SALVAR = 60.0  # segundos entre gravações de tuba_contadores.json
+
+# Sons (seção "sons" do config.json)
+SOM_INTERVALO_MINIMO = 0.4  # silêncio mínimo (s) entre o fim de um som e o início do próximo
+
+# Métricas (seção "metricas" do config.json)
+METRICAS_PORTA = 9464                   # /metrics em 127.0.0.1 (0 desativa)
+METRICAS_INTERVALO_INSTANTANEO = 60.0   # segundos entre gravações de tuba_metricas.json (0 desativa)
+
+# Hub e estações (seção "hub" do config.json; sem ela, cada estação observa sozinha)
+HUB_PORTA = 9465
+HUB_TRAVA_NOME = ".tuba_hub.lock"  # criada na pasta principal, compartilhada pelas estações
+HUB_BATIMENTO = 5.0       # segundos entre renovações da trava e batimentos às estações
+HUB_TRAVA_EXPIRA = 20.0   # trava sem renovação há mais tempo que isso é assumida por uma estação
+HUB_HISTORICO = 1000      # notificações guardadas para as estações que reconectam
+HUB_ESPERA_MAX = 60.0     # teto da espera entre tentativas de conexão com o hub
+HUB_QUADRO_MAX = 16 * 1024 * 1024
+
+# API de controle local (seção "controle" do config.json)
+CONTROLE_PORTA = 9466         # http://127.0.0.1:<porta> (0 desativa)
+CONTROLE_REENVIO_MAX = 500    # pedidos por chamada a /reenviar
+
+# ---------------------------------------------------
+# Métricas
+# ---------------------------------------------------
+# Registro em memória, exportado em /metrics (formato texto do Prometheus,
+# só em 127.0.0.1) e em um instantâneo JSON periódico. Registrar é um
+# incremento sob um lock curto, sem alocação no caminho de um evento.
+LIMITES_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+LIMITES_CHAMADA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRICAS_DEFINICOES = (
+    # nome, tipo, ajuda, limites (histogramas)
+    ("tuba_eventos_watchdog_total", "counter", "Eventos recebidos do watchdog, por tipo", None),
+    ("tuba_arquivos_detectados_total", "counter", "Arquivos novos detectados, por pasta e origem", None),
+    ("tuba_notificacoes_total", "counter", "Notificações de pedidos, por resultado", None),
+    ("tuba_notificacoes_descartadas_total", "counter", "Eventos descartados pela fila cheia ou no encerramento", None),
+    ("tuba_sons_total", "counter", "Sons reproduzidos, por resultado", None),
+    ("tuba_duplicados_total", "counter", "Arquivos com o mesmo conteúdo de um pedido anterior", None),
+    ("tuba_destinos_entregues_total", "counter", "Pedidos entregues aos destinos externos", None),
+    ("tuba_destinos_falhas_total", "counter", "Envios com falha aos destinos externos", None),
+    ("tuba_destinos_descartados_total", "counter", "Linhas ilegíveis descartadas da caixa de saída", None),
+    ("tuba_hub_publicadas_total", "counter", "Notificações publicadas pelo hub às estações", None),
+    ("tuba_hub_reconexoes_total", "counter", "Falhas de conexão desta estação com o hub", None),
+    ("tuba_reinicios_observer_total", "counter", "Reinícios do observer feitos pelo supervisor", None),
+    ("tuba_espera_escrita_segundos", "histogram", "Do evento de criação até o arquivo ficar estável", LIMITES_LATENCIA),
+    ("tuba_latencia_notificacao_segundos", "histogram", "Da detecção do arquivo até o toast exibido", LIMITES_LATENCIA),
+    ("tuba_notificador_duracao_segundos", "histogram", "Duração da chamada ao backend de notificação", LIMITES_CHAMADA),
+)
+
+class Metricas:
+    """Contadores, histogramas e medidores (calculados na leitura) com rótulos."""
+
+    def __init__(self, definicoes=METRICAS_DEFINICOES):
+        self.lock = threading.Lock()
+        self.definicoes = {nome: (tipo, ajuda, limites) for nome, tipo, ajuda, limites in definicoes}
+        self.valores = {nome: {} for nome in self.definicoes}
+        self.medidores = {}
+        self.iniciado_em = time.time()
+
+    def incrementar(self, nome, quantidade=1, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        serie = self.valores[nome]
+        with self.lock:
+            serie[chave] = serie.get(chave, 0) + quantidade
+
+    def observar(self, nome, valor, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        limites = self.definicoes[nome][2]
+        posicao = bisect.bisect_left(limites, valor)
+        serie = self.valores[nome]
+        with self.lock:
+            dados = serie.get(chave)
+            if dados is None:
+                # [contagem por faixa (a última é +Inf), soma, total]
+                dados = serie[chave] = [[0] * (len(limites) + 1), 0.0, 0]
+            dados[0][posicao] += 1
+            dados[1] += valor
+            dados[2] += 1
+
+    def medidor(self, nome, ajuda, funcao):
+        """Registra um valor calculado só na exportação (ex.: profundidade da fila)."""
+        self.medidores[nome] = (ajuda, funcao)
+
+    def _copiar(self):
+        with self.lock:
+            return {
+                nome: {chave: ([list(v[0]), v[1], v[2]] if isinstance(v, list) else v) for chave, v in serie.items()}
+                for nome, serie in self.valores.items()
+            }
+
+    def _ler_medidores(self):
+        lidos = {}
+        for nome, (ajuda, funcao) in self.medidores.items():
+            try:
+                lidos[nome] = float(funcao())
+            except Exception as e:
+                logging.debug(f"Erro ao ler medidor {nome}: {e}")
+        return lidos
+
+    @staticmethod
+    def _rotulos(chave, extra=None):
+        pares = list(chave) + ([extra] if extra else [])
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{k}="{_escapar_rotulo(v)}"' for k, v in pares) + "}"
+
+    def exportar_prometheus(self):
+        """Returns: str: Todas as métricas no formato texto do Prometheus."""
+        valores = self._copiar()
+        linhas = []
+        for nome, (tipo, ajuda, limites) in self.definicoes.items():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for chave, valor in valores[nome].items():
+                if tipo != "histogram":
+                    linhas.append(f"{nome}{self._rotulos(chave)} {valor}")
+                    continue
+                faixas, soma, total = valor
+                acumulado = 0
+                for limite, quantidade in zip(list(limites) + ["+Inf"], faixas):
+                    acumulado += quantidade
+                    linhas.append(f"{nome}_bucket{self._rotulos(chave, ('le', limite))} {acumulado}")
+                linhas.append(f"{nome}_sum{self._rotulos(chave)} {soma}")
+                linhas.append(f"{nome}_count{self._rotulos(chave)} {total}")
+        for nome, valor in self._ler_medidores().items():
+            linhas.append(f"# HELP {nome} {self.medidores[nome][0]}")
+            linhas.append(f"# TYPE {nome} gauge")
+            linhas.append(f"{nome} {valor:g}")
+        return "\n".join(linhas) + "\n"
+
+    def instantaneo(self):
+        """Returns: dict: Métricas em estrutura serializável em JSON."""
+        valores = self._copiar()
+        saida = {"gerado_em": time.time(), "iniciado_em": self.iniciado_em, "metricas": {}}
+        for nome, (tipo, ajuda, limites) in self.definicoes.items():
+            series = []
+            for chave, valor in valores[nome].items():
+                item = {"rotulos": dict(chave)}
+                if tipo == "histogram":
+                    item.update(faixas=dict(zip([str(l) for l in limites] + ["+Inf"], valor[0])), soma=valor[1],
+                                total=valor[2])
+                else:
+                    item["valor"] = valor
+                series.append(item)
+            saida["metricas"][nome] = series
+        saida["medidores"] = self._ler_medidores()
+        return saida
+
+def _escapar_rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metricas = Metricas()
+
+def _criar_servidor_metricas(porta):
+    """Servidor HTTP do /metrics; http.server só é importado se a porta estiver ativa."""
+    import http.server
+
+    class MetricasHTTP(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            corpo = metricas.exportar_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            logging.debug(f"/metrics: {formato % args}")
+
+    # Só na interface local: as métricas trazem nomes de pastas
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", porta), MetricasHTTP)
+    servidor.daemon_threads = True
+    return servidor
+
+class ExportadorMetricas:
+    """Servidor /metrics local e gravação periódica de METRICAS_PATH."""
+
+    def __init__(self, porta=METRICAS_PORTA, intervalo_instantaneo=METRICAS_INTERVALO_INSTANTANEO):
+        self.porta = int(porta or 0)
+        self.intervalo_instantaneo = float(intervalo_instantaneo or 0)
+        self.servidor = None
+        self.encerrar = threading.Event()
+        self.thread = None
+
+    def iniciar(self):
+        if self.porta:
+            try:
+                self.servidor = _criar_servidor_metricas(self.porta)
+                threading.Thread(target=self.servidor.serve_forever, name="tuba-metricas-http", daemon=True).start()
+                logging.info(f"Métricas em http://127.0.0.1:{self.porta}/metrics")
+            except OSError as e:
+                logging.warning(f"Endpoint de métricas não iniciado na porta {self.porta}: {e}")
+                self.servidor = None
+        if self.intervalo_instantaneo > 0:
+            self.thread = threading.Thread(target=self._loop, name="tuba-metricas", daemon=True)
+            self.thread.start()
+
+    def salvar_instantaneo(self):
+        temporario = METRICAS_PATH + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(metricas.instantaneo(), f, ensure_ascii=False)
+            os.replace(temporario, METRICAS_PATH)
+        except OSError as e:
+            logging.error(f"Erro ao salvar métricas: {e}")
+
+    def _loop(self):
+        while not self.encerrar.wait(self.intervalo_instantaneo):
+            self.salvar_instantaneo()
+
+    def parar(self):
+        self.encerrar.set()
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+            self.servidor = None
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+            self.salvar_instantaneo()
+
+def iniciar_metricas():
+    """Registra os medidores e inicia o exportador (seção "metricas" do config.json)."""
+    global exportador_metricas
+    metricas.medidor("tuba_fila_notificacoes", "Eventos aguardando notificação",
+                     lambda: despachante.pendentes() if despachante is not None else 0)
+    metricas.medidor("tuba_arquivos_em_escrita", "Arquivos aguardando a escrita terminar",
+                     lambda: rastreador.quantidade_pendente() if rastreador is not None else 0)
+    metricas.medidor("tuba_monitor_ativo", "1 se o monitor está ativo e não pausado",
+                     lambda: int(monitor_ativo and not monitor_pausado))
+    metricas.medidor("tuba_monitor_saudavel", "1 se o supervisor não encontrou problemas",
+                     lambda: int(saude_monitor == "ok"))
+    metricas.medidor("tuba_hub_estacoes", "Estações conectadas a este hub",
+                     lambda: servidor_hub.quantidade_clientes() if servidor_hub is not None else 0)
+    opcoes = ler_config().get("metricas") or {}
+    exportador_metricas = ExportadorMetricas(
+        porta=opcoes.get("porta", METRICAS_PORTA),
+        intervalo_instantaneo=opcoes.get("intervalo_instantaneo", METRICAS_INTERVALO_INSTANTANEO),
+    )
+    exportador_metricas.iniciar()
+
+def encerrar_metricas():
+    global exportador_metricas
+    if exportador_metricas is not None:
+        exportador_metricas.parar()
+        exportador_metricas = None
+
+
+# ---------------------------------------------------
+# Funções auxiliares
+# ---------------------------------------------------
+def verificar_recursos():
+    """
+    Verifica se todos os recursos necessários existem.
+    
+    Returns:
+        bool: True se todos os recursos existem, False caso contrário.
+    """
+    recursos = [ICON_PATH, START_SOUND, ALERT_SOUND, PAUSE_SOUND]
+    faltando = [r for r in recursos if not os.path.exists(r)]
+    if faltando:
+        logging.warning(f"Recursos faltando: {faltando}")
+        return False
+    logging.info("Todos os recursos validados com sucesso")
+    return True
+
+def escolher_pasta():
+
+    if modo_headless:
+        logging.error("Seletor de pasta indisponível no modo headless; configure as pastas no config.json")
+        return None
+    root = None
+    try:
+        import tkinter as tk
+        from tkinter import filedialog
+        root = tk.Tk()
+        root.withdraw()
+        # Forçar janela para frente
+        root.attributes('-topmost', True)
+        root.update()
+        pasta = filedialog.askdirectory(title="Selecione a pasta para monitorar", parent=root)
+        logging.info(f"Pasta selecionada: {pasta if pasta else 'Nenhuma'}")
+        return pasta if pasta else None
+    except Exception as e:
+        logging.error(f"Erro ao escolher pasta: {e}")
+        return None
+    finally:
+        # Garantir que a janela seja destruída de forma segura
+        if root is not None:
+            try:
+                root.quit()
+                root.destroy()
+            except Exception as e:
+                logging.warning(f"Erro ao destruir janela tkinter: {e}")
+
+# Esquema do config.json: um tipo (ou tupla de alternativas), um conjunto de
+# valores aceitos, [tipo] para listas ou um dict para objetos. Campos com
+# valor inválido são descartados com um aviso (valem os padrões); chaves fora
+# do esquema passam sem verificação. Itens de lista com qualquer erro são
+# descartados inteiros, para que uma regra pela metade não case com tudo;
+# objetos com campos Obrigatorio (as pastas) só perdem o campo inválido e são
+# descartados apenas quando falta um obrigatório.
+class Obrigatorio:
+    def __init__(self, esquema):
+        self.esquema = esquema
+
+NUMERO = (int, float)
+ESQUEMA_PASTA = {"caminho": Obrigatorio(str), "recursivo": bool, "rotulo": str, "backend": set(BACKENDS)}
+ESQUEMA_CONFIG = {
+    "pastas": [(str, ESQUEMA_PASTA)],
+    "ignorar_nomes": [str],
+    "regras": [{
+        "nome": str, "incluir": [str], "excluir": [str], "regex": str, "extensoes": [str], "tamanho_minimo": int,
+        "acao": {"ignorar": bool, "silencioso": bool, "som": str, "duracao": int, "prioridade": int},
+    }],
+    "log": {"formato": {"texto", "json"}, "rotacao": {"tamanho", "diaria"}, "tamanho_max_mb": NUMERO,
+            "retencao": int, "nivel": str},
+    "notificacoes": {"fila_max": int, "politica": {"descartar_antigos", "descartar_novos", "mesclar"},
+                     "workers": int, "janela_agrupamento": NUMERO},
+    "estabilidade": {"intervalo": NUMERO, "checagens": int, "tempo_maximo": NUMERO},
+    "varredura": {"intervalo_min": NUMERO, "intervalo_max": NUMERO},
+    "sons": {"intervalo_minimo": NUMERO},
+    "supervisao": {"intervalo": NUMERO, "batimento": NUMERO, "espera_max": NUMERO, "estavel": NUMERO},
+    "metricas": {"porta": int, "intervalo_instantaneo": NUMERO},
+    "duplicados": {"ativo": bool, "modo": {"avisar", "suprimir"}, "retencao_dias": NUMERO, "max_entradas": int,
+                   "workers": int, "tamanho_minimo": int},
+    "metadados": {"ativo": bool, "workers": int, "tempo_limite": NUMERO, "tempos_limite": dict, "cache": int,
+                  "bytes_max": int, "nome_regex": str, "padroes": dict, "extratores": [str]},
+    "destinos": [{"tipo": {"webhook", "smtp", "arquivo", "socket"}, "nome": str, "lote_max": int,
+                  "espera_lote": NUMERO, "espera_max": NUMERO}],
+    "hub": {"modo": {"automatico", "hub", "cliente"}, "porta": int, "escutar": str, "anunciar": str, "trava": str,
+            "trava_expira": NUMERO, "endereco": str},
+    "controle": {"porta": int, "token": str},
+}
+_INVALIDO = object()
+_NOMES_TIPOS = {str: "texto", int: "inteiro", float: "número", bool: "true/false", dict: "objeto", list: "lista"}
+
+def _validar_config(valor, esquema, onde, erros):
+    """Returns: O valor sem as partes inválidas, ou _INVALIDO."""
+    if isinstance(esquema, dict):
+        if not isinstance(valor, dict):
+            erros.append(f"{onde or 'config.json'}: esperado um objeto")
+            return _INVALIDO
+        limpo = {}
+        for chave, item in valor.items():
+            if chave in esquema:
+                campo = esquema[chave]
+                campo = campo.esquema if isinstance(campo, Obrigatorio) else campo
+                item = _validar_config(item, campo, f"{onde}.{chave}" if onde else chave, erros)
+                if item is _INVALIDO:
+                    continue
+            limpo[chave] = item
+        faltando = [c for c, campo in esquema.items() if isinstance(campo, Obrigatorio) and c not in limpo]
+        if faltando:
+            erros.append(f"{onde}: falta {', '.join(faltando)}")
+            return _INVALIDO
+        return limpo
+    if isinstance(esquema, list):
+        if not isinstance(valor, list):
+            erros.append(f"{onde}: esperada uma lista")
+            return _INVALIDO
+        itens = []
+        for i, item in enumerate(valor):
+            erros_item = []
+            item = _validar_config(item, esquema[0], f"{onde}[{i}]", erros_item)
+            if item is _INVALIDO or (erros_item and not _tolerante(esquema[0])):
+                erros.append(f"{onde}[{i}] descartado ({'; '.join(erros_item)})")
+                continue
+            erros.extend(erros_item)
+            itens.append(item)
+        return itens
+    if isinstance(esquema, tuple) and any(isinstance(e, dict) for e in esquema):
+        # Alternativas com um objeto (ex.: pasta como texto ou como objeto)
+        objeto = next(e for e in esquema if isinstance(e, dict))
+        if isinstance(valor, dict):
+            return _validar_config(valor, objeto, onde, erros)
+        return _validar_config(valor, tuple(e for e in esquema if e is not objeto) + (dict,), onde, erros)
+    if isinstance(esquema, set):
+        if valor not in esquema:
+            erros.append(f"{onde}: {valor!r} não é um de {sorted(esquema)}")
+            return _INVALIDO
+        return valor
+    tipos = esquema if isinstance(esquema, tuple) else (esquema,)
+    # bool é subclasse de int, mas true/false no lugar de um número é engano
+    if not isinstance(valor, tipos) or (isinstance(valor, bool) and bool not in tipos):
+        erros.append(f"{onde}: esperado {' ou '.join(_NOMES_TIPOS.get(t, t.__name__) for t in tipos)}")
+        return _INVALIDO
+    return valor
+
+def _tolerante(esquema):
+    """True se o esquema (ou uma das alternativas) é um objeto com campos obrigatórios."""
+    alternativas = esquema if isinstance(esquema, tuple) else (esquema,)
+    return any(isinstance(e, dict) and any(isinstance(c, Obrigatorio) for c in e.values()) for e in alternativas)
+
+def migrar_config(dados):
+    """
+    Converte os formatos antigos ("pasta" e "pasta_monitorada", com uma única
+    pasta) para a lista "pastas".
+
+    Returns:
+        bool: True se algo foi migrado.
+    """
+    migrado = False
+    for antiga in ("pasta", "pasta_monitorada"):
+        if antiga not in dados:
+            continue
+        valor = dados.pop(antiga)
+        migrado = True
+        if valor and not dados.get("pastas"):
+            dados["pastas"] = [valor]
+    return migrado
+
+class Configuracao:
+    """
+    config.json em memória: lido, migrado e validado uma vez; regravado de
+    forma atômica (temporário + os.replace, nunca um arquivo pela metade) e
+    recarregado quando o arquivo é editado (observar()).
+
+    `bruto` guarda o arquivo como está, inclusive campos inválidos, para que
+    uma gravação do TUBA não apague o que o usuário ainda vai corrigir.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.caminho = None
+        self.bruto = None
+        self.dados = None
+        self.observador = None
+        self.temporizador = None
+        self.pendentes = []
+
+    def _avisar(self, nivel, mensagem):
+        # A primeira leitura acontece dentro de configurar_logging(), antes dos handlers
+        if logging.getLogger().handlers:
+            logging.log(nivel, mensagem)
+        else:
+            self.pendentes.append((nivel, mensagem))
+
+    def relatar_pendentes(self):
+        pendentes, self.pendentes = self.pendentes, []
+        for nivel, mensagem in pendentes:
+            logging.log(nivel, mensagem)
+
+    def obter(self):
+        with self.lock:
+            # Relê se CONFIG_PATH foi trocado (benchmarks e testes)
+            if self.dados is None or self.caminho != CONFIG_PATH:
+                self.recarregar()
+            return self.dados
+
+    def recarregar(self):
+        """
+        Relê o arquivo do disco. Em uma recarga, um arquivo ausente ou inválido
+        (ex.: apagado, ou salvo pela metade no editor) mantém a configuração
+        anterior. Na primeira leitura, valem os padrões; um arquivo inválido é
+        renomeado para config.json.invalido para não ser sobrescrito.
+
+        Returns:
+            dict | None: A configuração validada, ou None se a anterior foi mantida.
+        """
+        caminho = CONFIG_PATH
+        bruto = {}
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                bruto = json.load(f)
+            if not isinstance(bruto, dict):
+                raise ValueError("o conteúdo não é um objeto JSON")
+        except (OSError, ValueError) as e:
+            ausente = isinstance(e, FileNotFoundError)
+            with self.lock:
+                if self.dados is not None and self.caminho == caminho:
+                    logging.error(f"config.json {'ausente' if ausente else 'inválido'}, mantendo a configuração atual"
+                                  f"{'' if ausente else f': {e}'}")
+                    return None
+            if not ausente:
+                self._avisar(logging.ERROR, f"config.json inválido, usando os padrões: {e}")
+                # Guarda o arquivo: a próxima gravação (ex.: a pasta escolhida) cria um config.json novo
+                try:
+                    os.replace(caminho, caminho + ".invalido")
+                    self._avisar(logging.WARNING, f"Conteúdo anterior guardado em {caminho}.invalido; corrija-o "
+                                                  f"e renomeie-o de volta para recuperar as demais seções")
+                except OSError:
+                    pass
+            bruto = {}
+        migrado = migrar_config(bruto)
+        erros = []
+        dados = _validar_config(bruto, ESQUEMA_CONFIG, "", erros)
+        with self.lock:
+            # Recargas sem mudança (ex.: gravação do próprio TUBA) não repetem os avisos
+            if bruto != self.bruto or caminho != self.caminho:
+                for erro in erros:
+                    self._avisar(logging.WARNING, f"Valor inválido no config.json ignorado: {erro}")
+            self.caminho, self.bruto, self.dados = caminho, bruto, dados
+            if migrado:
+                try:
+                    self._gravar(bruto)
+                    self._avisar(logging.INFO, "config.json migrado para a lista \"pastas\"")
+                except OSError as e:
+                    self._avisar(logging.ERROR, f"Erro ao gravar o config.json migrado: {e}")
+        return dados
+
+    def atualizar(self, **secoes):
+        """Altera seções e grava o arquivo de forma atômica."""
+        with self.lock:
+            self.obter()
+            bruto = dict(self.bruto, **secoes)
+            self._gravar(bruto)
+            self.bruto = bruto
+            self.dados = _validar_config(bruto, ESQUEMA_CONFIG, "", [])
+
+    def _gravar(self, bruto):
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(bruto, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho)
+
+    def observar(self):
+        """Recarrega o config.json quando ele é editado (watchdog na pasta do arquivo)."""
+        if self.observador is not None:
+            return
+        try:
+            alvo = os.path.normcase(os.path.abspath(CONFIG_PATH))
+            self.observador = Observer()
+            self.observador.schedule(HandlerConfig(self, alvo), os.path.dirname(alvo), recursive=False)
+            self.observador.start()
+        except Exception as e:
+            logging.warning(f"Recarga automática do config.json indisponível: {e}")
+            self.observador = None
+
+    def agendar_recarga(self):
+        # Editores gravam em etapas: espera o arquivo assentar antes de reler
+        with self.lock:
+            if self.temporizador is not None:
+                self.temporizador.cancel()
+            self.temporizador = threading.Timer(CONFIG_ESPERA_RECARGA, self._recarregar_editado)
+            self.temporizador.daemon = True
+            self.temporizador.start()
+
+    def _recarregar_editado(self):
+        with self.lock:
+            anterior, bruto_anterior = self.obter(), self.bruto
+            nova = self.recarregar()
+            # Gravação do próprio TUBA (ou sem mudança real)
+            if nova is None or self.bruto == bruto_anterior:
+                return
+        logging.info("config.json alterado; aplicando a nova configuração")
+        try:
+            aplicar_config(anterior, nova)
+        except Exception as e:
+            logging.error(f"Erro ao aplicar o config.json alterado: {e}")
+
+    def parar(self):
+        with self.lock:
+            if self.temporizador is not None:
+                self.temporizador.cancel()
+                self.temporizador = None
+        if self.observador is not None:
+            self.observador.stop()
+            self.observador.join(timeout=2)
+            self.observador = None
+
+class HandlerConfig(FileSystemEventHandler):
+    """Avisa a Configuracao quando o config.json muda (inclusive por os.replace)."""
+
+    def __init__(self, configuracao, alvo):
+        super().__init__()
+        self.configuracao = configuracao
+        self.alvo = alvo
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for caminho in (event.src_path, getattr(event, "dest_path", None)):
+            if caminho and os.path.normcase(os.path.abspath(caminho)) == self.alvo:
+                self.configuracao.agendar_recarga()
+                return
+
+configuracao = Configuracao()
+
+def ler_config():
+    """
+    config.json em memória (o disco só é lido na primeira chamada e nas recargas).
+
+    Returns:
+        dict: Configuração validada, ou um dicionário vazio se ausente/inválido.
+        Não deve ser alterado: use salvar_config() ou configuracao.atualizar().
+    """
+    return configuracao.obter()
+
+def normalizar_pasta(entrada):
+    """
+    Converte uma entrada de "pastas" para o formato {"caminho", "recursivo", "rotulo", "backend"}.
+    Aceita também apenas o caminho (string).
+
+    Returns:
+        dict | None: Entrada normalizada, ou None se não houver caminho.
+    """
+    if isinstance(entrada, str):
+        entrada = {"caminho": entrada}
+    if not isinstance(entrada, dict) or not entrada.get("caminho"):
+        return None
+    caminho = os.path.normpath(entrada["caminho"])
+    backend = entrada.get("backend") or "nativo"
+    if backend not in BACKENDS:
+        logging.warning(f"Backend desconhecido '{backend}' para {caminho}, usando 'nativo'")
+        backend = "nativo"
+    return {
+        "caminho": caminho,
+        "recursivo": bool(entrada.get("recursivo", False)),
+        "rotulo": entrada.get("rotulo") or os.path.basename(caminho) or caminho,
+        "backend": backend,
+    }
+
+def pastas_da_config(dados):
+    """Extrai a lista de pastas monitoradas do config.json (já migrado por migrar_config)."""
+    entradas = dados.get("pastas")
+    resultado = []
+    vistos = set()
+    for entrada in entradas or []:
+        normalizada = normalizar_pasta(entrada)
+        if normalizada and normalizada["caminho"] not in vistos:
+            vistos.add(normalizada["caminho"])
+            resultado.append(normalizada)
+    return resultado
+
+def salvar_config(pastas_lista):
+
+    try:
+        # Preserva as demais seções do arquivo (ex.: "notificacoes")
+        configuracao.atualizar(pastas=pastas_lista)
+        logging.info(f"Configuração salva: {[p['caminho'] for p in pastas_lista]}")
+        return True
+    except Exception as e:
+        logging.error(f"Erro ao salvar configuração: {e}")
+        return False
+
+def carregar_config():
+    """
+    Carrega as pastas monitoradas. Se nenhuma pasta configurada existir,
+    pede uma ao usuário.
+
+    Returns:
+        list: Entradas de pastas (vazia se o usuário cancelar).
+    """
+    try:
+        entradas = pastas_da_config(ler_config())
+        if any(os.path.exists(e["caminho"]) for e in entradas):
+            logging.info(f"Configuração carregada: {[e['caminho'] for e in entradas]}")
+            return entradas
+        if entradas:
+            logging.warning("Pastas configuradas não existem mais")
+    except Exception as e:
+        logging.error(f"Erro ao carregar configuração: {e}")
+
+    # Se não houver config válida, pede ao usuário
+    nova = escolher_pasta()
+    if not nova:
+        return []
+    entradas = [normalizar_pasta(nova)]
+    salvar_config(entradas)
+    return entradas
+
+# ---------------------------------------------------
+# Plataforma (notificação, som, bandeja e seletor de pasta)
+# ---------------------------------------------------
+# As bibliotecas de interface (win10toast, winsound, pystray, PIL, tkinter) só
+# são importadas quando usadas pela primeira vez. Assim o módulo carrega rápido
+# e pode ser importado em máquinas sem Windows ou sem interface gráfica.
+modo_headless = False
+plataforma_lock = threading.Lock()
+_notificador = None
+_reprodutor = None
+
+class NotificadorToast:
+    """Toast nativo do Windows (win10toast)."""
+
+    def __init__(self):
+        from win10toast import ToastNotifier
+        self.toaster = ToastNotifier()
+
+    def notificar(self, titulo, mensagem, duracao):
+        self.toaster.show_toast(
+            titulo,
+            mensagem,
+            duration=duracao,
+            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+        )
+
+class NotificadorLog:
+    """Notificador do modo headless: escreve as notificações no log."""
+
+    def notificar(self, titulo, mensagem, duracao):
+        logging.info(f"[Notificação] {titulo} - {mensagem}")
+
+class SomWinsound:
+    """
+    Saída de áudio pelo winsound (Windows), tocando o WAV direto da memória.
+
+    O winsound não aceita SND_MEMORY junto com SND_ASYNC, então tocar()
+    bloqueia até o fim do som; quem chama é a thread do ReprodutorSom.
+    """
+
+    def __init__(self):
+        import winsound
+        self.winsound = winsound
+
+    def tocar(self, dados):
+        self.winsound.PlaySound(dados, self.winsound.SND_MEMORY | self.winsound.SND_NODEFAULT)
+
+    def interromper(self):
+        # PlaySound(None) para o som que estiver tocando no processo
+        self.winsound.PlaySound(None, 0)
+
+class SomNulo:
+    """Sem saída de áudio (modo headless ou sem winsound)."""
+
+    def tocar(self, dados):
+        pass
+
+    def interromper(self):
+        pass
+
+class CacheSons:
+    """Conteúdo dos WAVs em memória, lido do disco uma única vez por arquivo."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dados = {}
+
+    def obter(self, caminho):
+        """
+        Returns:
+            bytes | None: Conteúdo do WAV, ou None se não puder ser lido.
+        """
+        try:
+            return self.dados[caminho]
+        except KeyError:
+            pass
+        try:
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+        except OSError as e:
+            logging.warning(f"Som indisponível {caminho}: {e}")
+            conteudo = None
+        with self.lock:
+            self.dados[caminho] = conteudo
+        return conteudo
+
+    def precarregar(self, caminhos):
+        for caminho in caminhos:
+            if caminho:
+                self.obter(caminho)
+
+cache_sons = CacheSons()
+
+class ReprodutorSom:
+    """
+    Toca os sons em uma thread própria, um de cada vez.
+
+    - Intervalo mínimo: depois de um som terminar, o próximo só começa após
+      `intervalo_minimo` segundos. Pedidos que chegam nesse meio tempo ocupam
+      uma única vaga de pendente (o mais recente de maior prioridade fica).
+    - Prioridade: um pedido de prioridade maior que a do som tocando o
+      interrompe e começa imediatamente, sem esperar o intervalo.
+    - O backend (tocar/interromper) e o relógio são plugáveis; em testes o
+      backend pode ser um falso que só registra os instantes em que foi
+      chamado, e o relógio um que só avança quando o teste manda.
+    """
+
+    def __init__(self, backend, intervalo_minimo=SOM_INTERVALO_MINIMO, cache=None, relogio=time.monotonic):
+        self.backend = backend
+        self.relogio = relogio
+        self.intervalo_minimo = max(0.0, float(intervalo_minimo))
+        self.cache = cache or cache_sons
+        self.cond = threading.Condition()
+        self.pendente = None            # (prioridade, caminho, dados)
+        self.prioridade_tocando = None  # None quando nada está tocando
+        self.ultima_prioridade = None
+        self.ultimo_fim = float("-inf")
+        self.ativo = True
+        self.thread = None
+
+    def tocar(self, caminho, prioridade=0):
+        """
+        Pede para tocar um som; nunca bloqueia.
+
+        Returns:
+            bool: True se o pedido foi aceito, False se descartado.
+        """
+        dados = self.cache.obter(caminho)
+        if dados is None:
+            return False
+        interromper = False
+        with self.cond:
+            if not self.ativo:
+                return False
+            if self.pendente is not None and prioridade < self.pendente[0]:
+                return False
+            self.pendente = (prioridade, caminho, dados)
+            if self.prioridade_tocando is not None and prioridade > self.prioridade_tocando:
+                interromper = True
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="tuba-som", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+        if interromper:
+            try:
+                self.backend.interromper()
+            except Exception as e:
+                logging.debug(f"Erro ao interromper som: {e}")
+        return True
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.ativo:
+                        return
+                    if self.pendente is None:
+                        self.cond.wait()
+                        continue
+                    preempcao = self.ultima_prioridade is not None and self.pendente[0] > self.ultima_prioridade
+                    espera = self.ultimo_fim + self.intervalo_minimo - self.relogio()
+                    if espera > 0 and not preempcao:
+                        self.cond.wait(espera)
+                        continue
+                    break
+                prioridade, caminho, dados = self.pendente
+                self.pendente = None
+                self.prioridade_tocando = prioridade
+                self.ultima_prioridade = prioridade
+            try:
+                self.backend.tocar(dados)
+                metricas.incrementar("tuba_sons_total", resultado="tocado")
+                logging.debug(f"Som tocado: {caminho}")
+            except Exception as e:
+                metricas.incrementar("tuba_sons_total", resultado="erro")
+                logging.warning(f"Erro ao tocar som {caminho}: {e}")
+            finally:
+                with self.cond:
+                    self.prioridade_tocando = None
+                    self.ultimo_fim = self.relogio()
+
+    def parar(self, timeout=2):
+        with self.cond:
+            self.ativo = False
+            self.pendente = None
+            self.cond.notify_all()
+        try:
+            self.backend.interromper()
+        except Exception:
+            pass
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+
+def _carregar_backend(preferido, alternativo, descricao):
+    """Instancia o backend preferido, caindo no alternativo se não houver suporte."""
+    if not modo_headless:
+        try:
+            return preferido()
+        except ImportError as e:
+            logging.warning(f"Backend de {descricao} indisponível ({e}), usando alternativo")
+    return alternativo()
+
+def obter_notificador():
+    global _notificador
+    if _notificador is None:
+        with plataforma_lock:
+            if _notificador is None:
+                _notificador = _carregar_backend(NotificadorToast, NotificadorLog, "notificação")
+    return _notificador
+
+def obter_reprodutor():
+    global _reprodutor
+    if _reprodutor is None:
+        with plataforma_lock:
+            if _reprodutor is None:
+                opcoes = ler_config().get("sons") or {}
+                _reprodutor = ReprodutorSom(
+                    _carregar_backend(SomWinsound, SomNulo, "som"),
+                    intervalo_minimo=opcoes.get("intervalo_minimo", SOM_INTERVALO_MINIMO),
+                )
+    return _reprodutor
+
+def notificar(titulo, mensagem, duracao=3):
+    """
+    Exibe uma notificação pelo backend da plataforma.
+
+    Returns:
+        bool: True se a notificação foi exibida.
+    """
+    inicio = time.perf_counter()
+    try:
+        obter_notificador().notificar(titulo, mensagem, duracao)
+        return True
+    except Exception as e:
+        logging.warning(f"Erro ao exibir notificação '{titulo}': {e}")
+        return False
+    finally:
+        metricas.observar("tuba_notificador_duracao_segundos", time.perf_counter() - inicio)
+
+def tocar_som(caminho, prioridade=0):
+    try:
+        if caminho:
+            obter_reprodutor().tocar(caminho, prioridade)
+    except Exception as e:
+        logging.warning(f"Erro ao tocar som {caminho}: {e}")
+
+# ---------------------------------------------------
+# Regras de arquivos
+# ---------------------------------------------------
+class Acao:
+    """O que fazer com um arquivo que casou com uma regra."""
+
+    __slots__ = ("nome", "ignorar", "silencioso", "som", "duracao", "prioridade")
+
+    def __init__(self, nome, ignorar=False, silencioso=False, som=ALERT_SOUND, duracao=3, prioridade=0):
+        self.nome = nome
+        self.ignorar = ignorar          # descarta o arquivo sem registrar
+        self.silencioso = silencioso    # registra no log, sem toast nem som
+        self.som = som
+        self.duracao = duracao
+        self.prioridade = prioridade    # em um agrupamento, vale a ação de maior prioridade
+
+    @classmethod
+    def da_config(cls, nome, dados):
+        dados = dados or {}
+        som = dados.get("som")
+        if som and not os.path.isabs(som):
+            # Relativo ao executável/script; senão, um dos sons embutidos
+            local = os.path.join(APP_DIR, som)
+            som = local if os.path.exists(local) else resource_path(som)
+        return cls(
+            nome,
+            ignorar=bool(dados.get("ignorar", False)),
+            silencioso=bool(dados.get("silencioso", False)),
+            som=som or ALERT_SOUND,
+            duracao=int(dados.get("duracao", 3)),
+            prioridade=int(dados.get("prioridade", 0)),
+        )
+
+ACAO_PADRAO = Acao("padrao")
+ACAO_IGNORAR = Acao("ignorar", ignorar=True)
+
+def _compilar_globs(padroes):
+    """Junta uma lista de globs em uma única regex (sem diferenciar maiúsculas)."""
+    if not padroes:
+        return None
+    return re.compile("|".join(fnmatch.translate(p) for p in padroes), re.IGNORECASE)
+
+class Regra:
+    """Regra compilada: todas as condições presentes precisam casar."""
+
+    __slots__ = ("indice", "nome", "extensoes", "tamanho_minimo", "incluir", "excluir", "regex", "acao")
+
+    def __init__(self, indice, dados):
+        self.indice = indice
+        self.nome = dados.get("nome") or f"regra_{indice}"
+        self.extensoes = frozenset(
+            e.lower() if e.startswith(".") else "." + e.lower() for e in dados.get("extensoes") or ()
+        )
+        self.tamanho_minimo = int(dados.get("tamanho_minimo") or 0)
+        self.incluir = _compilar_globs(dados.get("incluir"))
+        self.excluir = _compilar_globs(dados.get("excluir"))
+        self.regex = re.compile(dados["regex"], re.IGNORECASE) if dados.get("regex") else None
+        self.acao = Acao.da_config(self.nome, dados.get("acao"))
+
+    def casa(self, nome, tamanho):
+        """
+        Returns:
+            bool | None: True/False, ou None se a decisão depende do tamanho
+            e ele ainda não é conhecido.
+        """
+        if self.excluir is not None and self.excluir.match(nome):
+            return False
+        if self.incluir is not None and not self.incluir.match(nome):
+            return False
+        if self.regex is not None and not self.regex.search(nome):
+            return False
+        if self.tamanho_minimo:
+            if tamanho is None:
+                return None
+            return tamanho >= self.tamanho_minimo
+        return True
+
+class MotorRegras:
+    """
+    Avalia as regras do config.json na ordem em que aparecem; a primeira que
+    casar define a ação. Arquivos sem regra recebem ACAO_PADRAO.
+
+    As regras são compiladas uma única vez: nomes ignorados ficam em um set e,
+    para cada extensão citada, a lista de regras candidatas já vem pronta, de
+    modo que um arquivo irrelevante custa uma consulta de hash antes de
+    qualquer regex.
+    """
+
+    def __init__(self, regras=(), ignorar_nomes=NOMES_IGNORADOS):
+        self.ignorar_nomes = frozenset(n.lower() for n in ignorar_nomes)
+        self.regras = [Regra(i, dados) for i, dados in enumerate(regras or ())]
+        # Regras sem filtro de extensão valem para qualquer arquivo
+        self.genericas = tuple(r for r in self.regras if not r.extensoes)
+        self.por_extensao = {}
+        for ext in {e for r in self.regras for e in r.extensoes}:
+            self.por_extensao[ext] = tuple(r for r in self.regras if not r.extensoes or ext in r.extensoes)
+
+    def avaliar(self, nome, tamanho=None):
+        """
+        Decide a ação para um arquivo.
+
+        Args:
+            nome: Nome do arquivo (sem diretório).
+            tamanho: Tamanho em bytes, ou None antes de o arquivo estar pronto.
+
+        Returns:
+            Acao | None: A ação, ou None se ela depende do tamanho ainda desconhecido.
+        """
+        nome_lower = nome.lower()
+        if nome_lower in self.ignorar_nomes:
+            return ACAO_IGNORAR
+        ext = os.path.splitext(nome_lower)[1]
+        for regra in self.por_extensao.get(ext, self.genericas):
+            resultado = regra.casa(nome, tamanho)
+            if resultado is None:
+                return None
+            if resultado:
+                return regra.acao
+        return ACAO_PADRAO
+
+def criar_motor_regras():
+    """Compila as regras da seção "regras" do config.json."""
+    dados = ler_config()
+    try:
+        motor = MotorRegras(
+            dados.get("regras") or (),
+            ignorar_nomes=list(NOMES_IGNORADOS) + list(dados.get("ignorar_nomes") or ()),
+        )
+        logging.info(f"{len(motor.regras)} regra(s) de arquivos carregada(s)")
+        cache_sons.precarregar(r.acao.som for r in motor.regras)
+        return motor
+    except (re.error, TypeError, ValueError, AttributeError) as e:
+        logging.error(f"Regras inválidas no config.json, usando apenas as padrão: {e}")
+        return MotorRegras()
+
+# ---------------------------------------------------
+# Fila de notificações
+# ---------------------------------------------------
+class EventoArquivo:
+    """Registro enxuto de um arquivo detectado, enfileirado pelo Handler."""
+
+    __slots__ = ("caminho", "nome", "tamanho", "rotulo", "rotulos", "acao", "origem", "detectado_em", "mesclados",
+                 "quantidade", "membros", "duplicado_de", "metadados")
+
+    def __init__(self, caminho, rotulo=None, acao=ACAO_PADRAO):
+        self.caminho = caminho
+        self.nome = os.path.basename(caminho)
+        self.tamanho = None
+        self.rotulo = rotulo
+        self.acao = acao
+        # "tempo_real", "recuperacao" (arquivo que chegou com o TUBA fechado)
+        # "pausa" (chegou com o monitor pausado), "conciliacao" (perdido por
+        # uma falha do observer e encontrado pelo supervisor) ou "reenvio"
+        # (repetido pela API de controle)
+        self.origem = "tempo_real"
+        # Canais envolvidos quando eventos de pastas diferentes são agrupados
+        self.rotulos = [rotulo] if rotulo else []
+        self.detectado_em = time.time()
+        # Nomes adicionais agregados (agrupamento ou política "mesclar"), limitados
+        # a NOMES_RESUMO para que o custo não cresça com o tamanho da rajada
+        self.mesclados = []
+        self.quantidade = 1
+        # Eventos agregados a este; só o diário os percorre (um registro por arquivo)
+        self.membros = []
+        # Caminho do arquivo com o mesmo conteúdo, se o detector de duplicados achou
+        self.duplicado_de = None
+        # {"pedido", "cliente", "total"} lidos do arquivo pelo ExtratorMetadados
+        self.metadados = None
+
+    def mesclar(self, outro):
+        """Agrega outro evento a este, mantendo apenas os primeiros nomes."""
+        self.quantidade += outro.quantidade
+        self.membros.append(outro)
+        self.membros.extend(outro.membros)
+        outro.membros = []
+        if outro.acao.prioridade > self.acao.prioridade:
+            self.acao = outro.acao
+        for rotulo in outro.rotulos:
+            if rotulo not in self.rotulos:
+                self.rotulos.append(rotulo)
+        for nome in [outro.nome] + outro.mesclados:
+            if len(self.mesclados) >= NOMES_RESUMO - 1:
+                break
+            self.mesclados.append(nome)
+
+class DespachanteNotificacoes:
+    """
+    Fila limitada entre o Handler (thread do watchdog) e os workers que exibem
+    os toasts e tocam os sons.
+
+    O Handler apenas chama enfileirar(), que nunca bloqueia; a notificação
+    (que no win10toast bloqueia pela duração do toast) acontece nos workers.
+    Quando a fila está cheia, a política decide o que fazer:
+    - "descartar_antigos": remove o evento mais antigo pendente;
+    - "descartar_novos": ignora o evento que acabou de chegar;
+    - "mesclar": agrega o novo arquivo ao último evento pendente.
+    """
+
+    POLITICAS = ("descartar_antigos", "descartar_novos", "mesclar")
+
+    def __init__(self, notificar, max_eventos=FILA_MAX_EVENTOS, politica=FILA_POLITICA, workers=FILA_WORKERS):
+        if politica not in self.POLITICAS:
+            logging.warning(f"Política de fila desconhecida '{politica}', usando '{FILA_POLITICA}'")
+            politica = FILA_POLITICA
+        self.notificar = notificar
+        self.max_eventos = max(1, int(max_eventos))
+        self.politica = politica
+        self.num_workers = max(1, int(workers))
+        self.fila = deque()
+        self.cond = threading.Condition()
+        self.ativo = False
+        self.threads = []
+        self.descartados = 0
+
+    def iniciar(self):
+        with self.cond:
+            if self.ativo:
+                return
+            self.ativo = True
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"tuba-notificador-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for t in self.threads:
+            t.start()
+        logging.info(
+            f"Despachante iniciado ({self.num_workers} worker(s), fila máx. {self.max_eventos}, "
+            f"política '{self.politica}')"
+        )
+
+    def enfileirar(self, evento):
+        """
+        Enfileira um evento sem bloquear o chamador.
+
+        Returns:
+            bool: True se o evento foi aceito (ou mesclado), False se descartado.
+        """
+        with self.cond:
+            if not self.ativo:
+                return False
+            if len(self.fila) >= self.max_eventos:
+                if self.politica == "descartar_novos":
+                    self.descartados += 1
+                    logging.warning(f"Fila cheia, evento descartado: {evento.nome}")
+                    registrar_no_diario(evento, "descartado")
+                    metricas.incrementar("tuba_notificacoes_descartadas_total", evento.quantidade)
+                    return False
+                if self.politica == "mesclar":
+                    self.fila[-1].mesclar(evento)
+                    return True
+                antigo = self.fila.popleft()
+                self.descartados += 1
+                logging.warning(f"Fila cheia, evento mais antigo descartado: {antigo.nome}")
+                registrar_no_diario(antigo, "descartado")
+                metricas.incrementar("tuba_notificacoes_descartadas_total", antigo.quantidade)
+            self.fila.append(evento)
+            self.cond.notify()
+            return True
+
+    def pendentes(self):
+        with self.cond:
+            return len(self.fila)
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while self.ativo and not self.fila:
+                    self.cond.wait()
+                if not self.fila:
+                    # Parado e sem pendências
+                    return
+                evento = self.fila.popleft()
+            try:
+                self.notificar(evento)
+            except Exception as e:
+                logging.error(f"Erro ao notificar {evento.nome}: {e}")
+
+    def parar(self, timeout=5):
+        """
+        Para os workers. Eventos já enfileirados ainda são notificados enquanto
+        houver tempo; o que restar após o timeout é descartado.
+        """
+        with self.cond:
+            if not self.ativo:
+                return
+            self.ativo = False
+            self.cond.notify_all()
+        limite = time.time() + timeout
+        for t in self.threads:
+            t.join(timeout=max(0, limite - time.time()))
+        with self.cond:
+            restantes = len(self.fila)
+            for evento in self.fila:
+                registrar_no_diario(evento, "descartado")
+                metricas.incrementar("tuba_notificacoes_descartadas_total", evento.quantidade)
+            self.fila.clear()
+        if restantes:
+            logging.warning(f"Despachante parado com {restantes} notificação(ões) descartada(s)")
+        logging.info("Despachante de notificações parado")
+
+def criar_despachante():
+    """Cria o despachante usando os limites da seção "notificacoes" do config.json."""
+    opcoes = ler_config().get("notificacoes") or {}
+    return DespachanteNotificacoes(
+        notificar_evento,
+        max_eventos=opcoes.get("fila_max", FILA_MAX_EVENTOS),
+        politica=opcoes.get("politica", FILA_POLITICA),
+        workers=opcoes.get("workers", FILA_WORKERS),
+    )
+
+class AgrupadorRajadas:
+    """
+    Agrupa os arquivos detectados dentro de uma janela de tempo em um único
+    evento, entregue ao destino (normalmente despachante.enfileirar).
+
+    A janela abre no primeiro arquivo e fecha após `janela` segundos; tudo que
+    chegar nesse intervalo vira um só toast e um só som. Com janela <= 0 os
+    eventos passam direto.
+    """
+
+    def __init__(self, destino, janela=JANELA_AGRUPAMENTO):
+        self.destino = destino
+        self.janela = max(0.0, float(janela))
+        self.cond = threading.Condition()
+        self.grupo = None
+        self.fim_janela = 0.0
+        self.ativo = False
+        self.thread = None
+
+    def iniciar(self):
+        with self.cond:
+            if self.ativo:
+                return
+            self.ativo = True
+        if self.janela > 0:
+            self.thread = threading.Thread(target=self._loop, name="tuba-agrupador", daemon=True)
+            self.thread.start()
+
+    def adicionar(self, evento):
+        """Adiciona um evento à janela atual (ou abre uma nova). Nunca bloqueia."""
+        if self.janela <= 0:
+            if self.ativo:
+                self.destino(evento)
+            return
+        with self.cond:
+            if not self.ativo:
+                return
+            if self.grupo is None:
+                self.grupo = evento
+                self.fim_janela = time.monotonic() + self.janela
+                self.cond.notify()
+            else:
+                self.grupo.mesclar(evento)
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.ativo and self.grupo is None:
+                    self.cond.wait()
+                while self.ativo and self.grupo is not None:
+                    restante = self.fim_janela - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self.cond.wait(restante)
+                grupo, self.grupo = self.grupo, None
+                ativo = self.ativo
+            if grupo is not None:
+                try:
+                    self.destino(grupo)
+                except Exception as e:
+                    logging.error(f"Erro ao entregar grupo de eventos: {e}")
+            if not ativo:
+                return
+
+    def parar(self, timeout=2):
+        """Encerra o agrupador, entregando a janela pendente (se houver)."""
+        with self.cond:
+            if not self.ativo:
+                return
+            self.ativo = False
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+def criar_agrupador(destino):
+    """Cria o agrupador usando a janela da seção "notificacoes" do config.json."""
+    opcoes = ler_config().get("notificacoes") or {}
+    return AgrupadorRajadas(destino, janela=opcoes.get("janela_agrupamento", JANELA_AGRUPAMENTO))
+
+def notificar_evento(evento):
+    """Exibe o toast e toca o som de um evento (executado nos workers)."""
+    if evento.duplicado_de is not None and evento.quantidade == 1:
+        titulo = "⚠️ Possível duplicado"
+        if evento.rotulo:
+            titulo += f" [{evento.rotulo}]"
+    elif evento.origem == "recuperacao":
+        titulo = "📥 Pedidos recebidos com o TUBA fechado"
+    elif evento.origem == "pausa":
+        titulo = "📥 Pedidos recebidos com o TUBA pausado"
+    elif evento.origem == "conciliacao":
+        titulo = "📥 Pedidos recuperados após falha no monitor"
+    elif evento.origem == "reenvio":
+        titulo = "🔁 Pedidos reenviados"
+    elif evento.quantidade > 1:
+        # Resumo da rajada: um único toast e um único som
+        titulo = "📄 Novos pedidos detectados!"
+    else:
+        titulo = f"📄 Novo arquivo detectado!"
+        if evento.rotulo:
+            titulo += f" [{evento.rotulo}]"
+
+    if evento.quantidade > 1:
+        nomes = [evento.nome] + evento.mesclados
+        canais = f" ({', '.join(evento.rotulos)})" if evento.rotulos else ""
+        mensagem = f"{evento.quantidade} novos pedidos{canais}: {', '.join(nomes)}"
+        restantes = evento.quantidade - len(nomes)
+        if restantes > 0:
+            mensagem += f", … (+{restantes})"
+    elif evento.duplicado_de is not None:
+        mensagem = f"{evento.nome}\nMesmo conteúdo de: {os.path.basename(evento.duplicado_de)}"
+    else:
+        mensagem = evento.nome
+    if evento.quantidade == 1 and evento.metadados:
+        mensagem = f"{resumo_metadados(evento.metadados)}\n{mensagem}"
+
+    # Notificação nativa do Windows
+    exibida = notificar(
+        titulo,
+        mensagem,
+        duracao=evento.acao.duracao
+    )
+
+    # Tocar som de alerta (ou o som definido pela regra)
+    tocar_som(evento.acao.som, evento.acao.prioridade)
+    # Um reenvio (API de controle) só repete o toast
+    if evento.origem != "reenvio":
+        enviar_para_destinos(evento)
+        publicar_no_hub(evento)
+        registrar_no_diario(evento, "notificado" if exibida else "erro")
+    metricas.incrementar("tuba_notificacoes_total", evento.quantidade, resultado="notificado" if exibida else "erro")
+    agora = time.time()
+    for e in [evento] + evento.membros:
+        metricas.observar("tuba_latencia_notificacao_segundos", agora - e.detectado_em, origem=e.origem)
+
+    logging.info(
+        f"Notificação exibida: {mensagem}",
+        extra={"campos": campos_evento(
+            evento,
+            quantidade=evento.quantidade,
+            latencia_ms=round((time.time() - evento.detectado_em) * 1000),
+        )},
+    )
+
+def campos_evento(evento, **extras):
+    """Campos estruturados de log de um evento."""
+    campos = {
+        "caminho": evento.caminho,
+        "tamanho": evento.tamanho,
+        "rotulo": evento.rotulo,
+        "regra": evento.acao.nome,
+        "origem": evento.origem,
+    }
+    if evento.metadados:
+        campos.update(evento.metadados)
+    campos.update(extras)
+    return campos
+
+# ---------------------------------------------------
+# Detecção de escrita concluída
+# ---------------------------------------------------
+_kernel32 = None
+
+def _funcoes_kernel32():
+    """CreateFileW/CloseHandle/GetLastError com os tipos certos (ctypes só é importado no Windows)."""
+    global _kernel32
+    if _kernel32 is None:
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.CreateFileW.argtypes = (wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, ctypes.c_void_p,
+                                         wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE)
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        _kernel32 = (kernel32.CreateFileW, kernel32.CloseHandle, ctypes.get_last_error)
+    return _kernel32
+
+_GENERIC_READ = 0x80000000
+_OPEN_EXISTING = 3
+_FILE_ATTRIBUTE_NORMAL = 0x80
+_ERRO_COMPARTILHAMENTO = (32, 33)  # ERROR_SHARING_VIOLATION, ERROR_LOCK_VIOLATION
+_HANDLE_INVALIDO = (-1, 0xFFFFFFFFFFFFFFFF, 0xFFFFFFFF)
+
+def _abrir_sem_compartilhar(caminho):
+    """
+    Abre o arquivo com dwShareMode 0: só consegue se nenhum outro processo
+    (o exportador que ainda escreve, mesmo que permita compartilhamento) tiver
+    um handle aberto.
+
+    Returns:
+        bool: False se o arquivo está em uso; True se abriu ou se a sonda não se
+        aplica (ex.: sem permissão), deixando a decisão para o tamanho/mtime.
+    """
+    try:
+        criar, fechar, ultimo_erro = _funcoes_kernel32()
+    except (ImportError, OSError, AttributeError):
+        return True
+    handle = criar(caminho, _GENERIC_READ, 0, None, _OPEN_EXISTING, _FILE_ATTRIBUTE_NORMAL, None)
+    if handle is None or handle in _HANDLE_INVALIDO:
+        return ultimo_erro() not in _ERRO_COMPARTILHAMENTO
+    fechar(handle)
+    return True
+
+class RastreadorEstabilidade:
+    """
+    Acompanha arquivos recém-criados até que terminem de ser escritos e só
+    então chama `pronto(caminho, tamanho, rotulo, detectado_em)`.
+
+    O rótulo da pasta de origem e o instante da detecção acompanham o arquivo
+    até `pronto`.
+
+    Um arquivo é considerado pronto quando tamanho e mtime ficam iguais por
+    `checagens` verificações seguidas e ele pode ser aberto para escrita (no
+    Windows isso falha enquanto outro processo ainda o mantém aberto). Todos os
+    arquivos pendentes compartilham um único heap de prazos e uma única thread,
+    então milhares de pendentes custam apenas uma entrada no heap cada.
+    """
+
+    def __init__(self, pronto, intervalo=INTERVALO_ESTABILIDADE, checagens=CHECAGENS_ESTAVEIS,
+                 tempo_maximo=TEMPO_MAXIMO_ESTABILIDADE):
+        self.pronto = pronto
+        self.intervalo = max(0.05, float(intervalo))
+        self.checagens = max(1, int(checagens))
+        self.tempo_maximo = float(tempo_maximo)
+        self.cond = threading.Condition()
+        # caminho -> [tamanho, mtime_ns, checagens_estaveis, criado_em (monotonic), rotulo, detectado_em (epoch)]
+        self.pendentes = {}
+        # (proxima_checagem, caminho)
+        self.heap = []
+        self.ativo = False
+        self.thread = None
+
+    @staticmethod
+    def temporario(caminho):
+        """Indica se o nome corresponde a um arquivo temporário (ignorado)."""
+        nome = os.path.basename(caminho).lower()
+        return nome.startswith(PREFIXOS_TEMPORARIOS) or nome.endswith(SUFIXOS_TEMPORARIOS)
+
+    def iniciar(self):
+        with self.cond:
+            if self.ativo:
+                return
+            self.ativo = True
+        self.thread = threading.Thread(target=self._loop, name="tuba-estabilidade", daemon=True)
+        self.thread.start()
+
+    def acompanhar(self, caminho, rotulo=None):
+        """Começa a acompanhar um arquivo novo (on_created ou destino de on_moved)."""
+        if self.temporario(caminho):
+            logging.debug(f"Arquivo temporário ignorado: {caminho}")
+            return
+        with self.cond:
+            if not self.ativo or caminho in self.pendentes:
+                return
+            self.pendentes[caminho] = [-1, -1, 0, time.monotonic(), rotulo, time.time()]
+            heapq.heappush(self.heap, (time.monotonic() + self.intervalo, caminho))
+            if self.heap[0][1] == caminho:
+                self.cond.notify()
+
+    def modificado(self, caminho):
+        """Reinicia a contagem de estabilidade de um arquivo pendente."""
+        with self.cond:
+            estado = self.pendentes.get(caminho)
+            if estado is not None:
+                estado[2] = 0
+
+    def movido(self, origem, destino, rotulo=None):
+        """
+        Trata renomeações: um pendente passa a ser acompanhado pelo novo nome e
+        um temporário renomeado para o nome final (padrão comum de exportação)
+        passa a ser acompanhado. Renomear um arquivo já notificado é ignorado.
+        """
+        with self.cond:
+            estado = self.pendentes.pop(origem, None)
+        if estado is not None:
+            self.acompanhar(destino, estado[4])
+            with self.cond:
+                novo = self.pendentes.get(destino)
+                if novo is not None:
+                    novo[5] = estado[5]
+        elif self.temporario(origem):
+            self.acompanhar(destino, rotulo)
+
+    def removido(self, caminho):
+        with self.cond:
+            self.pendentes.pop(caminho, None)
+
+    def pendente(self, caminho):
+        with self.cond:
+            return caminho in self.pendentes
+
+    def quantidade_pendente(self):
+        with self.cond:
+            return len(self.pendentes)
+
+    def _pode_abrir(self, caminho):
+        """
+        Sonda se nenhum outro processo ainda mantém o arquivo aberto. No Windows,
+        abre sem compartilhamento (falha enquanto houver outro handle aberto);
+        nos demais sistemas não há trava obrigatória, e a sonda só confirma que
+        o arquivo abre. Em ambos, a estabilidade de tamanho/mtime vem antes.
+        """
+        if os.name == "nt":
+            return _abrir_sem_compartilhar(caminho)
+        modo = os.O_RDWR if os.access(caminho, os.W_OK) else os.O_RDONLY
+        try:
+            fd = os.open(caminho, modo | getattr(os, "O_BINARY", 0))
+        except OSError:
+            return False
+        os.close(fd)
+        return True
+
+    def _verificar(self, caminho):
+        """
+        Verifica um pendente.
+
+        Returns:
+            tuple: ("pronto", estado), ("aguardar", None) ou ("descartar", None).
+        """
+        with self.cond:
+            estado = self.pendentes.get(caminho)
+            if estado is None:
+                return "descartar", None
+        try:
+            st = os.stat(caminho)
+        except FileNotFoundError:
+            return "descartar", None
+        except OSError as e:
+            logging.debug(f"Falha ao verificar {caminho}: {e}")
+            return "aguardar", None
+
+        with self.cond:
+            if self.pendentes.get(caminho) is not estado:
+                return "descartar", None
+            if st.st_size == estado[0] and st.st_mtime_ns == estado[1]:
+                estado[2] += 1
+            else:
+                estado[0], estado[1], estado[2] = st.st_size, st.st_mtime_ns, 0
+            estavel = estado[2] >= self.checagens
+            expirou = time.monotonic() - estado[3] > self.tempo_maximo
+
+        if estavel and self._pode_abrir(caminho):
+            return "pronto", estado
+        if expirou:
+            logging.warning(f"Arquivo não estabilizou em {self.tempo_maximo:.0f}s, notificando mesmo assim: {caminho}")
+            return "pronto", estado
+        return "aguardar", None
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.ativo and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                if not self.ativo:
+                    return
+                _, caminho = heapq.heappop(self.heap)
+
+            try:
+                resultado, estado = self._verificar(caminho)
+            except Exception as e:
+                logging.error(f"Erro ao verificar estabilidade de {caminho}: {e}")
+                resultado, estado = "aguardar", None
+
+            if resultado == "aguardar":
+                with self.cond:
+                    if caminho in self.pendentes:
+                        heapq.heappush(self.heap, (time.monotonic() + self.intervalo, caminho))
+                continue
+
+            with self.cond:
+                self.pendentes.pop(caminho, None)
+            if resultado == "pronto":
+                try:
+                    self.pronto(caminho, estado[0], estado[4], estado[5])
+                except Exception as e:
+                    logging.error(f"Erro ao entregar arquivo pronto {caminho}: {e}")
+
+    def parar(self, timeout=2):
+        with self.cond:
+            if not self.ativo:
+                return
+            self.ativo = False
+            self.pendentes.clear()
+            self.heap.clear()
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+def criar_rastreador(pronto):
+    """Cria o rastreador usando a seção "estabilidade" do config.json."""
+    opcoes = ler_config().get("estabilidade") or {}
+    return RastreadorEstabilidade(
+        pronto,
+        intervalo=opcoes.get("intervalo", INTERVALO_ESTABILIDADE),
+        checagens=opcoes.get("checagens", CHECAGENS_ESTAVEIS),
+        tempo_maximo=opcoes.get("tempo_maximo", TEMPO_MAXIMO_ESTABILIDADE),
+    )
+
+def arquivo_pronto(caminho, tamanho, rotulo=None, detectado_em=None):
+    """Recebe do rastreador um arquivo totalmente escrito e o envia para notificação."""
+    # Pausado: fica fora do índice para ser avisado pela varredura ao retomar
+    if monitor_pausado:
+        return
+    acao = motor_regras.avaliar(os.path.basename(caminho), tamanho) if motor_regras else ACAO_PADRAO
+    if acao.ignorar:
+        logging.debug(f"Arquivo ignorado pelas regras: {caminho}")
+        return
+    # Registra no índice; se já estava lá (ex.: notificado pela recuperação), não repete
+    if indice is not None and not indice.registrar(caminho):
+        return
+    evento = EventoArquivo(caminho, rotulo, acao)
+    evento.tamanho = tamanho
+    if detectado_em is not None:
+        evento.detectado_em = detectado_em
+    logging.info(
+        f"Novo arquivo detectado: {evento.nome}",
+        extra={"campos": campos_evento(evento, espera_escrita_ms=round((time.time() - evento.detectado_em) * 1000))},
+    )
+    metricas.observar("tuba_espera_escrita_segundos", time.time() - evento.detectado_em)
+    # Etapas opcionais em workers próprios: duplicados -> metadados -> encaminhar_evento
+    seguir = encaminhar_evento
+    if extrator_metadados is not None:
+        seguir = lambda e, extrator=extrator_metadados: extrator.processar(e, encaminhar_evento)
+    if duplicados is not None:
+        duplicados.verificar(evento, seguir)
+    else:
+        seguir(evento)
+
+def encaminhar_evento(evento):
+    """Conta o pedido e o envia para notificação (ou só registra, se silencioso/duplicado)."""
+    if evento.duplicado_de is not None:
+        logging.warning(
+            f"Possível duplicado: {evento.nome} tem o mesmo conteúdo de {os.path.basename(evento.duplicado_de)}",
+            extra={"campos": campos_evento(evento, duplicado_de=evento.duplicado_de)},
+        )
+        metricas.incrementar("tuba_duplicados_total", modo=duplicados.modo if duplicados else "")
+        if duplicados is not None and duplicados.modo == "suprimir":
+            registrar_no_diario(evento, "duplicado")
+            return
+    contar_pedido(evento.rotulo, evento.detectado_em)
+    metricas.incrementar("tuba_arquivos_detectados_total", rotulo=evento.rotulo or "", origem=evento.origem)
+    if evento.acao.silencioso:
+        registrar_no_diario(evento, "silencioso")
+        return
+
+    if evento.duplicado_de is not None:
+        # Toast próprio: fora do agrupador, para não sumir em um resumo de rajada
+        if despachante is not None:
+            despachante.enfileirar(evento)
+        return
+    # Apenas enfileira: o agrupador junta rajadas e a notificação
+    # roda nos workers do despachante
+    if agrupador is not None:
+        agrupador.adicionar(evento)
+
+# ---------------------------------------------------
+# Detecção de pedidos duplicados (conteúdo)
+# ---------------------------------------------------
+_FIM_DUPLICADOS = object()
+
+def hash_arquivo(caminho, bloco=1024 * 1024):
+    """
+    Hash BLAKE2b do conteúdo, lido em blocos (memória constante).
+
+    Returns:
+        str: Hash em hexadecimal.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(caminho, "rb") as f:
+        while True:
+            dados = f.read(bloco)
+            if not dados:
+                break
+            h.update(dados)
+    return h.hexdigest()
+
+class DetectorDuplicados:
+    """
+    Compara o conteúdo de cada arquivo novo com os recebidos na janela de
+    retenção.
+
+    O tamanho filtra os candidatos: só há hash quando outro arquivo do mesmo
+    tamanho já passou por aqui, e o hash de um arquivo antigo só é calculado
+    na primeira vez em que ele vira candidato. O hash roda em workers
+    próprios; ao terminar, o evento segue para `continuar` com duplicado_de
+    preenchido (ou None).
+
+    O índice (caminho -> tamanho, hash, instante) é um LRU limitado a
+    `max_entradas`, gravado em DUPLICADOS_PATH a cada `salvar_a_cada`
+    alterações e ao encerrar.
+    """
+
+    def __init__(self, caminho=None, modo=DUPLICADOS_MODO, retencao_dias=DUPLICADOS_RETENCAO_DIAS,
+                 max_entradas=DUPLICADOS_MAX_ENTRADAS, workers=DUPLICADOS_WORKERS,
+                 tamanho_minimo=DUPLICADOS_TAMANHO_MINIMO, salvar_a_cada=200):
+        self.caminho = caminho or DUPLICADOS_PATH
+        self.modo = modo if modo in ("avisar", "suprimir") else DUPLICADOS_MODO
+        self.retencao = max(0.0, float(retencao_dias)) * 86400
+        self.max_entradas = max(1, int(max_entradas))
+        self.tamanho_minimo = max(0, int(tamanho_minimo))
+        self.salvar_a_cada = salvar_a_cada
+        self.lock = threading.Lock()
+        self.entradas = OrderedDict()  # caminho -> [tamanho, hash ou None, instante]
+        self.por_tamanho = {}          # tamanho -> {caminho, ...}
+        self.alteracoes = 0
+        self.fila = queue.SimpleQueue()
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"tuba-duplicados-{i}", daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+
+    # -- índice (chamar com self.lock) --------------------------------
+    def _inserir(self, caminho, tamanho, hash_, instante):
+        self._retirar(caminho)
+        self.entradas[caminho] = [tamanho, hash_, instante]
+        self.por_tamanho.setdefault(tamanho, set()).add(caminho)
+        while len(self.entradas) > self.max_entradas:
+            self._retirar(next(iter(self.entradas)))
+        self.alteracoes += 1
+
+    def _retirar(self, caminho):
+        entrada = self.entradas.pop(caminho, None)
+        if entrada is None:
+            return
+        mesmos = self.por_tamanho.get(entrada[0])
+        if mesmos is not None:
+            mesmos.discard(caminho)
+            if not mesmos:
+                del self.por_tamanho[entrada[0]]
+
+    def _expirar(self, agora):
+        if not self.retencao:
+            return
+        limite = agora - self.retencao
+        # `entradas` está em ordem de chegada: tira do começo e para no
+        # primeiro que ainda vale, sem percorrer o índice inteiro a cada evento
+        while self.entradas:
+            caminho, entrada = next(iter(self.entradas.items()))
+            if entrada[2] >= limite:
+                break
+            self._retirar(caminho)
+
+    # -- persistência --------------------------------------------------
+    def carregar(self):
+        agora = time.time()
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                linhas = [linha.rstrip("\n").split("\t") for linha in f]
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logging.warning(f"Índice de duplicados não carregado: {e}")
+            return
+        validas = []
+        for partes in linhas:
+            if len(partes) != 4:
+                continue
+            caminho, tamanho, hash_, instante = partes
+            try:
+                tamanho, instante = int(tamanho), float(instante)
+            except ValueError:
+                continue
+            if not self.retencao or instante >= agora - self.retencao:
+                validas.append((instante, caminho, tamanho, hash_ or None))
+        # Em ordem de instante, como _expirar espera (arquivos antigos podem vir fora de ordem)
+        validas.sort(key=lambda v: v[0])
+        with self.lock:
+            for instante, caminho, tamanho, hash_ in validas:
+                self._inserir(caminho, tamanho, hash_, instante)
+            self.alteracoes = 0
+        logging.info(f"Índice de duplicados carregado: {len(self.entradas)} arquivo(s)")
+
+    def salvar(self):
+        with self.lock:
+            linhas = [f"{c}\t{e[0]}\t{e[1] or ''}\t{e[2]}\n" for c, e in self.entradas.items()]
+            self.alteracoes = 0
+        temporario = self.caminho + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.writelines(linhas)
+            os.replace(temporario, self.caminho)
+        except OSError as e:
+            logging.error(f"Erro ao salvar índice de duplicados: {e}")
+
+    # -- pipeline ------------------------------------------------------
+    def iniciar(self):
+        for t in self.threads:
+            t.start()
+
+    def conhecer(self, caminho, tamanho):
+        """
+        Registra um arquivo sem procurar duplicados (ex.: recuperados na
+        inicialização). Entra com o instante de agora, e não com o mtime, para
+        manter `entradas` em ordem de instante.
+        """
+        if tamanho is None or tamanho < self.tamanho_minimo:
+            return
+        with self.lock:
+            self._inserir(caminho, tamanho, None, time.time())
+
+    def verificar(self, evento, continuar):
+        """Enfileira o evento; `continuar(evento)` é chamado pelo worker."""
+        self.fila.put((evento, continuar))
+
+    def _procurar(self, caminho, tamanho):
+        """
+        Returns:
+            str: Caminho do arquivo com o mesmo conteúdo, ou None.
+        """
+        agora = time.time()
+        with self.lock:
+            self._expirar(agora)
+            # Só os que chegaram antes deste são candidatos a original
+            candidatos = sorted(
+                (c for c in self.por_tamanho.get(tamanho, ()) if c != caminho),
+                key=lambda c: self.entradas[c][2],
+                reverse=True,
+            )
+            self._inserir(caminho, tamanho, None, agora)
+        if not candidatos:
+            return None
+
+        meu_hash = hash_arquivo(caminho)
+        with self.lock:
+            if caminho in self.entradas:
+                self.entradas[caminho][1] = meu_hash
+        for candidato in candidatos:
+            with self.lock:
+                entrada = self.entradas.get(candidato)
+                hash_candidato = entrada[1] if entrada else None
+            if entrada is None:
+                continue
+            if hash_candidato is None:
+                try:
+                    hash_candidato = hash_arquivo(candidato)
+                except OSError:
+                    # Original já removido antes de ter hash: não há com o que comparar
+                    with self.lock:
+                        self._retirar(candidato)
+                    continue
+                with self.lock:
+                    if candidato in self.entradas:
+                        self.entradas[candidato][1] = hash_candidato
+            if hash_candidato == meu_hash:
+                with self.lock:
+                    if candidato in self.entradas:
+                        # Vai para o fim com o instante de agora, mantendo a ordem por instante
+                        self.entradas[candidato][2] = agora
+                        self.entradas.move_to_end(candidato)
+                return candidato
+        return None
+
+    def _worker(self):
+        while True:
+            item = self.fila.get()
+            if item is _FIM_DUPLICADOS:
+                return
+            evento, continuar = item
+            try:
+                if evento.tamanho is not None and evento.tamanho >= self.tamanho_minimo:
+                    evento.duplicado_de = self._procurar(evento.caminho, evento.tamanho)
+            except OSError as e:
+                logging.warning(f"Não foi possível comparar {evento.caminho}: {e}")
+            except Exception as e:
+                logging.error(f"Erro na detecção de duplicados de {evento.caminho}: {e}")
+            try:
+                continuar(evento)
+            except Exception as e:
+                logging.error(f"Erro ao encaminhar {evento.caminho}: {e}")
+            if self.alteracoes >= self.salvar_a_cada:
+                self.salvar()
+
+    def parar(self, timeout=10):
+        """Termina as comparações já enfileiradas e grava o índice."""
+        for _ in self.threads:
+            self.fila.put(_FIM_DUPLICADOS)
+        for t in self.threads:
+            t.join(timeout=timeout)
+        self.salvar()
+
+def criar_detector_duplicados():
+    """
+    Cria o detector a partir da seção "duplicados" do config.json.
+
+    Returns:
+        DetectorDuplicados: Detector já carregado, ou None se desativado.
+    """
+    opcoes = ler_config().get("duplicados") or {}
+    if not opcoes.get("ativo", False):
+        return None
+    detector = DetectorDuplicados(
+        modo=opcoes.get("modo", DUPLICADOS_MODO),
+        retencao_dias=opcoes.get("retencao_dias", DUPLICADOS_RETENCAO_DIAS),
+        max_entradas=opcoes.get("max_entradas", DUPLICADOS_MAX_ENTRADAS),
+        workers=opcoes.get("workers", DUPLICADOS_WORKERS),
+        tamanho_minimo=opcoes.get("tamanho_minimo", DUPLICADOS_TAMANHO_MINIMO),
+    )
+    detector.carregar()
+    return detector
+
+# ---------------------------------------------------
+# Metadados do pedido (número, cliente, total)
+# ---------------------------------------------------
+# Cada extrator lê só o começo do arquivo e devolve um dict com qualquer
+# subconjunto de CAMPOS_PEDIDO. Extratores extras podem ser registrados com
+# registrar_extrator(); todos os que aceitam a extensão rodam, e o primeiro
+# valor encontrado para cada campo vale.
+CAMPOS_PEDIDO = ("pedido", "cliente", "total")
+
+ALIASES_CAMPOS = {
+    "pedido": ("pedido", "numero_pedido", "num_pedido", "n_pedido", "nped", "xped", "order", "order_id",
+               "ordernumber", "numero"),
+    "cliente": ("cliente", "nome_cliente", "razao_social", "razaosocial", "customer", "customer_name"),
+    "total": ("total", "valor_total", "vtotal", "vnf", "total_pedido", "amount", "valor"),
+}
+
+PADROES_TEXTO = {
+    "pedido": r"pedido\s*(?:n[º°o.]*)?\s*[:#]?\s*([A-Za-z0-9][\w/.-]*)",
+    "cliente": r"cliente\s*[:\-]\s*([^\n]+)",
+    "total": r"total(?:\s+(?:geral|do\s+pedido))?\s*[:\-]?\s*(?:R\$)?\s*([\d.]+,\d{2}|[\d,]+\.\d{2})",
+}
+
+def _normalizar_chave(nome):
+    return re.sub(r"[^a-z0-9]+", "_", nome.strip().lower()).strip("_")
+
+def _campos_por_alias(pares):
+    """Mapeia (chave, valor) para CAMPOS_PEDIDO usando ALIASES_CAMPOS."""
+    campos = {}
+    for chave, valor in pares:
+        chave = _normalizar_chave(chave)
+        valor = (valor or "").strip()
+        if not valor:
+            continue
+        for campo, aliases in ALIASES_CAMPOS.items():
+            if campo not in campos and chave in aliases:
+                campos[campo] = valor
+    return campos
+
+def _campos_por_padroes(texto, padroes):
+    campos = {}
+    for campo, padrao in padroes.items():
+        achado = padrao.search(texto)
+        if achado:
+            campos[campo] = achado.group(1).strip()[:80]
+    return campos
+
+def extrair_do_nome(caminho, opcoes):
+    """Grupos nomeados (pedido, cliente, total) da regex aplicada ao nome do arquivo."""
+    regex = opcoes.get("nome_regex")
+    if regex is None:
+        return {}
+    achado = regex.search(os.path.basename(caminho))
+    if not achado:
+        return {}
+    return {k: v for k, v in achado.groupdict().items() if k in CAMPOS_PEDIDO and v}
+
+def extrair_csv(caminho, opcoes):
+    """Cabeçalho e primeira linha de dados de um CSV (separador detectado)."""
+    with open(caminho, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        amostra = f.read(opcoes["bytes_max"])
+    linhas = amostra.splitlines()
+    if len(linhas) < 2:
+        return {}
+    try:
+        dialeto = csv.Sniffer().sniff(linhas[0], delimiters=";,\t|")
+    except csv.Error:
+        dialeto = csv.excel
+    lidas = list(csv.reader(linhas[:2], dialeto))
+    if len(lidas) < 2:
+        return {}
+    return _campos_por_alias(zip(lidas[0], lidas[1]))
+
+def extrair_xml(caminho, opcoes):
+    """Primeiros elementos de um XML, lidos de forma incremental."""
+    import xml.etree.ElementTree as ET
+    parser = ET.XMLPullParser(events=("end",))
+    with open(caminho, "rb") as f:
+        parser.feed(f.read(opcoes["bytes_max"]))
+    pares = []
+    try:
+        for _, elemento in parser.read_events():
+            if elemento.text and elemento.text.strip():
+                pares.append((elemento.tag.rsplit("}", 1)[-1], elemento.text))
+    except ET.ParseError:
+        # Leitura parcial: o que já foi lido continua valendo
+        pass
+    return _campos_por_alias(pares)
+
+def texto_primeira_pagina_pdf(dados):
+    """
+    Texto aproximado do primeiro fluxo de conteúdo de um PDF, sem bibliotecas
+    externas: descomprime os fluxos FlateDecode do trecho lido e junta as
+    strings dos operadores Tj/TJ. Suficiente para PDFs de texto gerados por
+    ERPs; PDFs escaneados não têm texto.
+    """
+    trechos = []
+    for achado in re.finditer(rb"stream\r?\n", dados):
+        inicio = achado.end()
+        fim = dados.find(b"endstream", inicio)
+        if fim < 0:
+            break
+        bruto = dados[inicio:fim]
+        try:
+            conteudo = zlib.decompressobj().decompress(bruto)
+        except zlib.error:
+            conteudo = bruto
+        if b"Tj" not in conteudo and b"TJ" not in conteudo:
+            continue
+        for bloco in re.finditer(rb"\[(.*?)\]\s*TJ|\((.*?)(?<!\\)\)\s*Tj|(T\*|Td|TD|ET)", conteudo, re.S):
+            if bloco.group(3):
+                trechos.append("\n")
+                continue
+            partes = re.findall(rb"\((.*?)(?<!\\)\)", bloco.group(1)) if bloco.group(1) is not None else [bloco.group(2)]
+            for parte in partes:
+                parte = re.sub(rb"\\([0-7]{1,3})", lambda m: bytes([int(m.group(1), 8) & 0xFF]), parte)
+                parte = re.sub(rb"\\([()\\])", rb"\1", parte)
+                trechos.append(parte.decode("latin-1"))
+        # Só a primeira página: o primeiro fluxo com texto
+        break
+    return "".join(trechos)
+
+def extrair_pdf(caminho, opcoes):
+    with open(caminho, "rb") as f:
+        dados = f.read(opcoes["bytes_max"])
+    if not dados.startswith(b"%PDF"):
+        return {}
+    return _campos_por_padroes(texto_primeira_pagina_pdf(dados), opcoes["padroes"])
+
+def extrair_texto(caminho, opcoes):
+    with open(caminho, "r", encoding="utf-8", errors="replace") as f:
+        return _campos_por_padroes(f.read(opcoes["bytes_max"]), opcoes["padroes"])
+
+# nome -> (extensões aceitas ou None para todas, função)
+EXTRATORES = {
+    "nome": (None, extrair_do_nome),
+    "csv": ((".csv",), extrair_csv),
+    "xml": ((".xml",), extrair_xml),
+    "pdf": ((".pdf",), extrair_pdf),
+    "texto": ((".txt",), extrair_texto),
+}
+# Extratores que não fazem I/O: rodam direto no coordenador, sem disputar o pool
+EXTRATORES_LOCAIS = {"nome"}
+
+def registrar_extrator(nome, extensoes, funcao):
+    """Adiciona (ou substitui) um extrator: funcao(caminho, opcoes) -> dict."""
+    EXTRATORES[nome] = (tuple(e.lower() for e in extensoes) if extensoes else None, funcao)
+
+def resumo_metadados(metadados):
+    """Linha curta para o toast, ex.: "Pedido 123 · Cliente ACME · Total R$ 10,00"."""
+    if not metadados:
+        return ""
+    partes = []
+    if metadados.get("pedido"):
+        partes.append(f"Pedido {metadados['pedido']}")
+    if metadados.get("cliente"):
+        partes.append(f"Cliente {metadados['cliente']}")
+    if metadados.get("total"):
+        partes.append(f"Total R$ {metadados['total']}")
+    return " · ".join(partes)
+
+_FIM_METADADOS = object()
+
+class ExtratorMetadados:
+    """
+    Etapa do pipeline que preenche evento.metadados antes da notificação.
+
+    Até `workers` eventos são processados ao mesmo tempo, então uma rajada
+    não soma as esperas de cada arquivo. Cada extrator roda no pool e tem o
+    seu tempo limite, contado a partir da chegada do evento: se estourar, o
+    evento segue sem aquele campo. Um tipo de extrator que estourou o tempo e
+    continua preso no arquivo (PDF enorme, rede lenta) é pulado nos próximos
+    até terminar, então um extrator travado ocupa no máximo um worker.
+    Resultados completos ficam em um LRU pequeno chaveado por (caminho,
+    tamanho, mtime).
+    """
+
+    def __init__(self, workers=METADADOS_WORKERS, tempo_limite=METADADOS_TEMPO_LIMITE,
+                 tempos_limite=None, cache_max=METADADOS_CACHE, bytes_max=METADADOS_BYTES_MAX,
+                 nome_regex=METADADOS_NOME_REGEX, padroes=None, extratores=None, relogio=time.monotonic):
+        from concurrent import futures
+        self.tempo_esgotado = futures.TimeoutError
+        self.pool = futures.ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="tuba-metadados")
+        self.tempo_limite = float(tempo_limite)
+        self.tempos_limite = dict(tempos_limite or {})
+        self.cache_max = max(0, int(cache_max))
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.ocupados = {}  # tipo de extrator -> chamada que estourou o tempo e ainda roda
+        self.extratores = extratores  # None: todos os registrados
+        self.relogio = relogio
+        padroes = {**PADROES_TEXTO, **(padroes or {})}
+        self.opcoes = {
+            "bytes_max": max(1024, int(bytes_max)),
+            "nome_regex": re.compile(nome_regex) if nome_regex else None,
+            "padroes": {c: re.compile(p, re.IGNORECASE) for c, p in padroes.items()},
+        }
+        self.fila = queue.SimpleQueue()
+        # Coordenadores: esperam os extratores com tempo limite, sem ocupar o pool
+        self.threads = [
+            threading.Thread(target=self._loop, name=f"tuba-metadados-{i}", daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+
+    def iniciar(self):
+        for t in self.threads:
+            t.start()
+
+    def processar(self, evento, continuar):
+        self.fila.put((evento, continuar))
+
+    def _chave(self, caminho):
+        try:
+            st = os.stat(caminho)
+        except OSError:
+            return None
+        return caminho, st.st_size, st.st_mtime_ns
+
+    def _guardar(self, chave, campos):
+        if chave is None or not self.cache_max:
+            return
+        with self.lock:
+            self.cache[chave] = campos
+            self.cache.move_to_end(chave)
+            while len(self.cache) > self.cache_max:
+                self.cache.popitem(last=False)
+
+    def _liberar(self, nome, futuro):
+        with self.lock:
+            if self.ocupados.get(nome) is futuro:
+                del self.ocupados[nome]
+
+    def extrair(self, caminho):
+        """
+        Returns:
+            dict: Campos encontrados (pode ser vazio).
+        """
+        chave = self._chave(caminho)
+        with self.lock:
+            if chave in self.cache:
+                self.cache.move_to_end(chave)
+                return dict(self.cache[chave])
+
+        inicio = self.relogio()
+        extensao = os.path.splitext(caminho)[1].lower()
+        campos = {}
+        completo = True
+        pendentes = []
+        for nome, (extensoes, funcao) in list(EXTRATORES.items()):
+            if self.extratores is not None and nome not in self.extratores:
+                continue
+            if extensoes is not None and extensao not in extensoes:
+                continue
+            if nome in EXTRATORES_LOCAIS:
+                try:
+                    pendentes.append((nome, None, funcao(caminho, self.opcoes)))
+                except Exception as e:
+                    logging.debug(f"Extrator '{nome}' falhou em {caminho}: {e}")
+                continue
+            with self.lock:
+                if nome in self.ocupados:
+                    completo = False
+                    logging.debug(f"Extrator '{nome}' ainda ocupado; {caminho} segue sem ele")
+                    continue
+            pendentes.append((nome, self.pool.submit(funcao, caminho, self.opcoes), None))
+
+        for nome, futuro, resultado in pendentes:
+            if futuro is not None:
+                prazo = inicio + float(self.tempos_limite.get(nome, self.tempo_limite))
+                try:
+                    resultado = futuro.result(timeout=max(0.0, prazo - self.relogio()))
+                except self.tempo_esgotado:
+                    completo = False
+                    # Ainda na fila do pool: desiste; já rodando: termina sozinho,
+                    # e até lá os próximos arquivos seguem sem este extrator
+                    if not futuro.cancel():
+                        with self.lock:
+                            self.ocupados[nome] = futuro
+                        futuro.add_done_callback(lambda f, nome=nome: self._liberar(nome, f))
+                    logging.warning(f"Extrator '{nome}' excedeu o tempo limite em {caminho}")
+                    continue
+                except Exception as e:
+                    logging.debug(f"Extrator '{nome}' falhou em {caminho}: {e}")
+                    continue
+            for campo, valor in (resultado or {}).items():
+                campos.setdefault(campo, valor)
+        # Resultado parcial (tempo limite) não vai para o cache
+        if completo:
+            self._guardar(chave, campos)
+        return campos
+
+    def _loop(self):
+        while True:
+            item = self.fila.get()
+            if item is _FIM_METADADOS:
+                return
+            evento, continuar = item
+            try:
+                evento.metadados = self.extrair(evento.caminho) or None
+            except Exception as e:
+                logging.error(f"Erro ao extrair metadados de {evento.caminho}: {e}")
+            try:
+                continuar(evento)
+            except Exception as e:
+                logging.error(f"Erro ao encaminhar {evento.caminho}: {e}")
+
+    def parar(self, timeout=10):
+        for _ in self.threads:
+            self.fila.put(_FIM_METADADOS)
+        for t in self.threads:
+            t.join(timeout=timeout)
+        self.pool.shutdown(wait=False)
+
+def criar_extrator_metadados():
+    """
+    Cria a etapa de metadados a partir da seção "metadados" do config.json.
+
+    Returns:
+        ExtratorMetadados: Etapa pronta, ou None se desativada.
+    """
+    opcoes = ler_config().get("metadados") or {}
+    if not opcoes.get("ativo", True):
+        return None
+    return ExtratorMetadados(
+        workers=opcoes.get("workers", METADADOS_WORKERS),
+        tempo_limite=opcoes.get("tempo_limite", METADADOS_TEMPO_LIMITE),
+        tempos_limite=opcoes.get("tempos_limite"),
+        cache_max=opcoes.get("cache", METADADOS_CACHE),
+        bytes_max=opcoes.get("bytes_max", METADADOS_BYTES_MAX),
+        nome_regex=opcoes.get("nome_regex", METADADOS_NOME_REGEX),
+        padroes=opcoes.get("padroes"),
+        extratores=opcoes.get("extratores"),
+    )
+
+# ---------------------------------------------------
+# Índice de arquivos (recuperação na inicialização)
+# ---------------------------------------------------
+def varrer_pasta(raiz, recursivo=False):
+    """
+    Percorre a pasta com os.scandir (sem um stat extra por arquivo no Windows).
+
+    Yields:
+        tuple: (caminho, os.DirEntry) de cada arquivo encontrado.
+    """
+    pilha = [raiz]
+    while pilha:
+        atual = pilha.pop()
+        try:
+            with os.scandir(atual) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            yield entry.path, entry
+                        elif recursivo and entry.is_dir(follow_symlinks=False):
+                            pilha.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.warning(f"Não foi possível listar {atual}: {e}")
+
+def _assinatura(st, entry=None):
+    """
+    (tamanho, mtime_ns, inode) de um arquivo. No Windows o inode fica 0, pois
+    DirEntry.inode() exigiria um stat extra por arquivo na varredura.
+    """
+    if os.name == "nt":
+        ino = 0
+    else:
+        ino = entry.inode() if entry is not None else st.st_ino
+    return (st.st_size, st.st_mtime_ns, ino)
+
+class IndiceArquivos:
+    """
+    Índice persistente (caminho -> tamanho, mtime, inode) das pastas monitoradas,
+    usado para descobrir os arquivos que chegaram com o TUBA fechado.
+
+    O índice fica em memória; cada alteração vira uma linha anexada ao diário
+    (INDICE_DIARIO_PATH), e de tempos em tempos o diário é consolidado no
+    arquivo base (INDICE_PATH) com escrita atômica. Assim, registrar um evento
+    custa uma linha de texto, e a comparação na inicialização é uma consulta de
+    dicionário por arquivo listado pelo scandir.
+    """
+
+    def __init__(self, caminho_base=None, caminho_diario=None):
+        self.caminho_base = caminho_base or INDICE_PATH
+        self.caminho_diario = caminho_diario or INDICE_DIARIO_PATH
+        self.lock = threading.Lock()
+        self.arquivos = {}
+        self.pastas = set()
+        self.linhas_diario = 0
+        self.diario = None
+
+    def carregar(self):
+        """Lê base + diário e consolida o resultado."""
+        with self.lock:
+            self.arquivos.clear()
+            self.pastas.clear()
+            for caminho in (self.caminho_base, self.caminho_diario):
+                if os.path.exists(caminho):
+                    with open(caminho, "r", encoding="utf-8") as f:
+                        for linha in f:
+                            self._aplicar(linha.rstrip("\n"))
+            self._compactar()
+        logging.info(f"Índice carregado: {len(self.arquivos)} arquivo(s) em {len(self.pastas)} pasta(s)")
+
+    def _aplicar(self, linha):
+        partes = linha.split("\t")
+        try:
+            if partes[0] == "P" and len(partes) == 2:
+                self.pastas.add(partes[1])
+            elif partes[0] == "-" and len(partes) == 2:
+                self.arquivos.pop(partes[1], None)
+            elif partes[0] == "+" and len(partes) == 5:
+                self.arquivos[partes[1]] = (int(partes[2]), int(partes[3]), int(partes[4]))
+        except ValueError:
+            pass
+
+    def _escrever(self, linha):
+        """Anexa uma linha ao diário (chamar com self.lock)."""
+        if "\n" in linha:
+            return
+        if self.diario is None:
+            self.diario = open(self.caminho_diario, "a", encoding="utf-8", buffering=1)
+        self.diario.write(linha + "\n")
+        self.linhas_diario += 1
+        if self.linhas_diario > max(INDICE_COMPACTAR_MIN, len(self.arquivos) // 2):
+            self._compactar()
+
+    def _compactar(self):
+        """Reescreve o arquivo base e zera o diário (chamar com self.lock)."""
+        temporario = self.caminho_base + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            for raiz in self.pastas:
+                f.write(f"P\t{raiz}\n")
+            for caminho, (tamanho, mtime, ino) in self.arquivos.items():
+                f.write(f"+\t{caminho}\t{tamanho}\t{mtime}\t{ino}\n")
+        os.replace(temporario, self.caminho_base)
+        if self.diario is not None:
+            self.diario.close()
+            self.diario = None
+        with open(self.caminho_diario, "w", encoding="utf-8"):
+            pass
+        self.linhas_diario = 0
+
+    def registrar(self, caminho, st=None, entry=None):
+        """
+        Registra um arquivo no índice.
+
+        Returns:
+            bool: True se o arquivo é novo (ou foi substituído), False se o
+            índice já o conhecia com a mesma assinatura ou ele não existe mais.
+        """
+        if st is None:
+            try:
+                st = os.stat(caminho)
+            except FileNotFoundError:
+                return False
+            except OSError:
+                return True
+        assinatura = _assinatura(st, entry)
+        with self.lock:
+            if self.arquivos.get(caminho) == assinatura:
+                return False
+            self.arquivos[caminho] = assinatura
+            self._escrever(f"+\t{caminho}\t{assinatura[0]}\t{assinatura[1]}\t{assinatura[2]}")
+        return True
+
+    def remover(self, caminho):
+        with self.lock:
+            if self.arquivos.pop(caminho, None) is not None:
+                self._escrever(f"-\t{caminho}")
+
+    def mover(self, origem, destino):
+        with self.lock:
+            assinatura = self.arquivos.pop(origem, None)
+            if assinatura is None:
+                return
+            self.arquivos[destino] = assinatura
+            self._escrever(f"-\t{origem}")
+            self._escrever(f"+\t{destino}\t{assinatura[0]}\t{assinatura[1]}\t{assinatura[2]}")
+
+    def diferenca(self, raiz, recursivo=False):
+        """
+        Compara o índice com o conteúdo atual da pasta.
+
+        Arquivos que sumiram saem do índice. Na primeira vez que uma pasta é
+        vista, tudo é apenas registrado (não há o que recuperar), exceto o que
+        ainda está sendo escrito: esses ficam para o fluxo normal registrar e
+        notificar quando estiverem prontos.
+
+        Returns:
+            list: (caminho, stat, entry) dos arquivos que não estavam no índice
+            ou foram substituídos (inode diferente). Eles ainda não são
+            registrados: quem chamou decide, via registrar().
+        """
+        with self.lock:
+            primeira_vez = raiz not in self.pastas
+        inicio = time.time()
+        novos = []
+        vistos = set()
+        for caminho, entry in varrer_pasta(raiz, recursivo):
+            vistos.add(caminho)
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if primeira_vez:
+                # Chegou durante a indexação: registrá-lo agora faria o
+                # registrar() do fluxo normal devolver False e o pedido sumir
+                if st.st_mtime > inicio or (rastreador is not None and rastreador.pendente(caminho)):
+                    continue
+                # Carga inicial: vai direto para a memória e é consolidada no fim
+                with self.lock:
+                    self.arquivos[caminho] = _assinatura(st, entry)
+                continue
+            conhecido = self.arquivos.get(caminho)
+            if conhecido is None:
+                novos.append((caminho, st, entry))
+            else:
+                assinatura = _assinatura(st, entry)
+                if conhecido[2] and assinatura[2] and conhecido[2] != assinatura[2]:
+                    novos.append((caminho, st, entry))
+                elif conhecido != assinatura:
+                    # Mesmo arquivo, alterado: apenas atualiza
+                    self.registrar(caminho, st, entry)
+
+        # Remove do índice o que não existe mais nesta pasta
+        prefixo = os.path.join(raiz, "")
+        with self.lock:
+            sumidos = [
+                c for c in self.arquivos
+                if c.startswith(prefixo) and c not in vistos
+                and (recursivo or os.path.dirname(c) == raiz)
+            ]
+            for caminho in sumidos:
+                del self.arquivos[caminho]
+                self._escrever(f"-\t{caminho}")
+            if primeira_vez:
+                self.pastas.add(raiz)
+                self._compactar()
+        if primeira_vez:
+            logging.info(f"Pasta indexada pela primeira vez: {raiz} ({len(vistos)} arquivo(s))")
+        return novos
+
+    def fechar(self):
+        with self.lock:
+            try:
+                self._compactar()
+            except OSError as e:
+                logging.warning(f"Erro ao consolidar índice: {e}")
+
+def recuperar_perdidos(entradas, origem="recuperacao"):
+    """
+    Notifica, em um único toast, os arquivos que chegaram às pastas enquanto o
+    TUBA não estava rodando (ou estava pausado, com origem="pausa").
+    """
+    # Pausado: a varredura ao retomar cuida disso
+    if monitor_pausado:
+        return 0
+    eventos = []
+    for entrada in entradas:
+        try:
+            novos = indice.diferenca(entrada["caminho"], entrada["recursivo"])
+        except Exception as e:
+            logging.error(f"Erro ao comparar índice de {entrada['caminho']}: {e}")
+            continue
+        novos.sort(key=lambda item: item[1].st_mtime_ns)
+        for caminho, st, entry in novos:
+            nome = os.path.basename(caminho)
+            if RastreadorEstabilidade.temporario(caminho):
+                continue
+            # Ainda sendo escrito: o fluxo normal vai notificar
+            if rastreador is not None and rastreador.pendente(caminho):
+                continue
+            acao = motor_regras.avaliar(nome, st.st_size) if motor_regras else ACAO_PADRAO
+            if acao.ignorar:
+                continue
+            # Já registrado pelo fluxo em tempo real
+            if not indice.registrar(caminho, st, entry):
+                continue
+            evento = EventoArquivo(caminho, entrada["rotulo"], acao)
+            evento.tamanho = st.st_size
+            evento.origem = origem
+            logging.info(f"Arquivo recebido fora do monitoramento: {nome}", extra={"campos": campos_evento(evento)})
+            # Conta no horário em que o arquivo chegou, não no da recuperação
+            contar_pedido(entrada["rotulo"], st.st_mtime)
+            if duplicados is not None:
+                duplicados.conhecer(caminho, st.st_size)
+            metricas.incrementar("tuba_arquivos_detectados_total", rotulo=entrada["rotulo"] or "", origem=origem)
+            if acao.silencioso:
+                registrar_no_diario(evento, "silencioso")
+                continue
+            eventos.append(evento)
+
+    if not eventos:
+        return 0
+    resumo = eventos[0]
+    for evento in eventos[1:]:
+        resumo.mesclar(evento)
+    if despachante is not None:
+        despachante.enfileirar(resumo)
+    logging.info(f"{len(eventos)} arquivo(s) recuperado(s) ({origem})")
+    return len(eventos)
+
+# ---------------------------------------------------
+# Diário de pedidos (SQLite)
+# ---------------------------------------------------
+_FIM_DIARIO = object()
+
+class DiarioEventos:
+    """
+    Diário persistente (somente inclusão) de cada arquivo detectado, em SQLite
+    no modo WAL.
+
+    registrar() só coloca a linha em uma fila; uma thread de fundo grava em
+    lotes (uma transação para até `lote_max` linhas ou `espera_lote`
+    segundos), então o pipeline de detecção nunca espera pelo disco. As
+    consultas usam conexões próprias e, graças ao WAL, não bloqueiam a escrita.
+    """
+
+    ESQUEMA = (
+        """CREATE TABLE IF NOT EXISTS eventos (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            dia TEXT NOT NULL,
+            caminho TEXT NOT NULL,
+            nome TEXT NOT NULL,
+            tamanho INTEGER,
+            rotulo TEXT,
+            regra TEXT,
+            origem TEXT,
+            resultado TEXT NOT NULL,
+            pedido TEXT,
+            cliente TEXT,
+            total TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_eventos_dia ON eventos (dia, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_eventos_rotulo ON eventos (rotulo, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_eventos_ts ON eventos (ts)",
+    )
+
+    def __init__(self, caminho=None, lote_max=DIARIO_LOTE_MAX, espera_lote=DIARIO_ESPERA_LOTE):
+        self.caminho = caminho or DIARIO_PATH
+        self.lote_max = max(1, int(lote_max))
+        self.espera_lote = max(0.0, float(espera_lote))
+        self.fila = queue.SimpleQueue()
+        self.thread = None
+
+    def iniciar(self):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._loop, name="tuba-diario", daemon=True)
+        self.thread.start()
+
+    def registrar(self, evento, resultado):
+        """Enfileira a linha de um evento (e dos eventos agrupados a ele)."""
+        for e in [evento] + evento.membros:
+            metadados = e.metadados or {}
+            self.fila.put((
+                e.detectado_em,
+                time.strftime("%Y-%m-%d", time.localtime(e.detectado_em)),
+                e.caminho,
+                e.nome,
+                e.tamanho,
+                e.rotulo,
+                e.acao.nome,
+                e.origem,
+                resultado,
+                metadados.get("pedido"),
+                metadados.get("cliente"),
+                metadados.get("total"),
+            ))
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=10)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        for comando in self.ESQUEMA:
+            conexao.execute(comando)
+        # Diários criados antes das colunas de metadados
+        colunas = {linha[1] for linha in conexao.execute("PRAGMA table_info(eventos)")}
+        for coluna in ("pedido", "cliente", "total"):
+            if coluna not in colunas:
+                conexao.execute(f"ALTER TABLE eventos ADD COLUMN {coluna} TEXT")
+        conexao.commit()
+        return conexao
+
+    def _loop(self):
+        try:
+            conexao = self._conectar()
+        except sqlite3.Error as e:
+            logging.error(f"Diário de pedidos indisponível ({self.caminho}): {e}")
+            return
+        fim = False
+        while not fim:
+            item = self.fila.get()
+            if item is _FIM_DIARIO:
+                break
+            lote = [item]
+            limite = time.monotonic() + self.espera_lote
+            while len(lote) < self.lote_max:
+                restante = limite - time.monotonic()
+                try:
+                    item = self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _FIM_DIARIO:
+                    fim = True
+                    break
+                lote.append(item)
+            try:
+                with conexao:
+                    conexao.executemany(
+                        "INSERT INTO eventos (ts, dia, caminho, nome, tamanho, rotulo, regra, origem, resultado, "
+                        "pedido, cliente, total) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        lote,
+                    )
+            except sqlite3.Error as e:
+                logging.error(f"Erro ao gravar {len(lote)} evento(s) no diário: {e}")
+        conexao.close()
+
+    def parar(self, timeout=5):
+        """Grava o que estiver na fila e encerra a thread."""
+        if self.thread is None:
+            return
+        self.fila.put(_FIM_DIARIO)
+        self.thread.join(timeout=timeout)
+        self.thread = None
+
+def consultar_diario(sql, parametros=(), caminho=None):
+    """
+    Executa uma consulta de leitura no diário.
+
+    Returns:
+        list: Linhas como dicionários (vazia se o diário ainda não existir).
+    """
+    caminho = caminho or DIARIO_PATH
+    if not os.path.exists(caminho):
+        return []
+    conexao = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, timeout=10)
+    try:
+        conexao.row_factory = sqlite3.Row
+        return [dict(linha) for linha in conexao.execute(sql, parametros)]
+    finally:
+        conexao.close()
+
+def _filtro_rotulo(rotulo):
+    return (" AND rotulo = ?", (rotulo,)) if rotulo else ("", ())
+
+def pedidos_do_dia(dia=None, rotulo=None):
+    """Pedidos de um dia ("AAAA-MM-DD"; padrão: hoje), em ordem de chegada."""
+    dia = dia or time.strftime("%Y-%m-%d")
+    filtro, extra = _filtro_rotulo(rotulo)
+    return consultar_diario(f"SELECT * FROM eventos WHERE dia = ?{filtro} ORDER BY ts", (dia,) + extra)
+
+def pedidos_entre(hora_inicio, hora_fim, dia=None, rotulo=None):
+    """Pedidos de um dia (padrão: hoje) entre hora_inicio (inclusive) e hora_fim (exclusive)."""
+    dia = dia or time.strftime("%Y-%m-%d")
+    base = time.mktime(time.strptime(dia, "%Y-%m-%d"))
+    # mktime com o dia + hora resolve corretamente dias com mudança de horário
+    inicio = time.mktime(time.strptime(f"{dia} {int(hora_inicio)}", "%Y-%m-%d %H")) if hora_inicio < 24 else base + 86400
+    fim = time.mktime(time.strptime(f"{dia} {int(hora_fim)}", "%Y-%m-%d %H")) if hora_fim < 24 else base + 86400
+    filtro, extra = _filtro_rotulo(rotulo)
+    return consultar_diario(
+        f"SELECT * FROM eventos WHERE dia = ? AND ts >= ? AND ts < ?{filtro} ORDER BY ts",
+        (dia, inicio, fim) + extra,
+    )
+
+def ultimos_pedidos(quantidade=50, rotulo=None):
+    """Os últimos `quantidade` pedidos, do mais recente para o mais antigo."""
+    if rotulo:
+        return consultar_diario(
+            "SELECT * FROM eventos WHERE rotulo = ? ORDER BY ts DESC LIMIT ?", (rotulo, int(quantidade))
+        )
+    return consultar_diario("SELECT * FROM eventos ORDER BY ts DESC LIMIT ?", (int(quantidade),))
+
+def obter_diario():
+    """Diário compartilhado, iniciado no primeiro uso."""
+    global diario
+    if diario is None:
+        diario = DiarioEventos()
+        diario.iniciar()
+    return diario
+
+def registrar_no_diario(evento, resultado):
+    if diario is not None:
+        diario.registrar(evento, resultado)
+
+def encerrar_diario():
+    global diario
+    if diario is not None:
+        diario.parar()
+        diario = None
+
+def executar_consulta_pedidos(args):
+    """Comando de linha: python tuba_monitor.py pedidos {hoje,entre,ultimos} ..."""
+    if args.consulta == "hoje":
+        linhas = pedidos_do_dia(args.dia, args.canal)
+    elif args.consulta == "entre":
+        if len(args.valores) != 2:
+            raise SystemExit("Uso: pedidos entre HORA_INICIO HORA_FIM  (ex.: pedidos entre 8 12)")
+        linhas = pedidos_entre(int(args.valores[0]), int(args.valores[1]), args.dia, args.canal)
+    else:
+        quantidade = int(args.valores[0]) if args.valores else 50
+        linhas = ultimos_pedidos(quantidade, args.canal)
+
+    if args.json:
+        print(json.dumps(linhas, ensure_ascii=False, indent=2))
+        return
+    for linha in linhas:
+        quando = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(linha["ts"]))
+        print(f"{quando}  {linha['rotulo'] or '-':<15} {linha['nome']:<40} {linha['tamanho'] or 0:>10}  {linha['resultado']:<10} {resumo_metadados(linha)}")
+    print(f"{len(linhas)} pedido(s)")
+
+# ---------------------------------------------------
+# Destinos externos (webhook, e-mail, arquivo, socket)
+# ---------------------------------------------------
+# Cada pedido notificado também é entregue aos destinos do config.json
+# (seção "destinos"). A entrega passa por uma caixa de saída em SQLite
+# (SAIDA_PATH): o pipeline só insere a linha, e cada destino tem uma thread
+# que envia em lotes, reaproveita a conexão e tenta de novo com espera
+# exponencial. O que não foi entregue é retomado na próxima execução.
+class DestinoWebhook:
+    """POST de um JSON {"pedidos": [...]} por lote, com conexão keep-alive."""
+
+    def __init__(self, url, cabecalhos=None, timeout=10):
+        from urllib.parse import urlsplit
+        partes = urlsplit(url)
+        if partes.scheme not in ("http", "https"):
+            raise ValueError(f"URL de webhook inválida: {url}")
+        self.https = partes.scheme == "https"
+        self.host = partes.hostname
+        self.porta = partes.port
+        self.caminho = (partes.path or "/") + (f"?{partes.query}" if partes.query else "")
+        self.cabecalhos = {"Content-Type": "application/json; charset=utf-8", **(cabecalhos or {})}
+        self.timeout = timeout
+        self.conexao = None
+
+    def _conectar(self):
+        import http.client
+        classe = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return classe(self.host, self.porta, timeout=self.timeout)
+
+    def enviar(self, corpo, pedidos):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        # Uma nova tentativa com conexão nova se a reaproveitada foi fechada pelo servidor
+        for tentativa in range(2):
+            if self.conexao is None:
+                self.conexao = self._conectar()
+            try:
+                self.conexao.request("POST", self.caminho, body=dados, headers=self.cabecalhos)
+                resposta = self.conexao.getresponse()
+                resposta.read()
+            except Exception as e:
+                self.fechar()
+                if tentativa == 0 and _conexao_reaproveitada_caiu(e):
+                    continue
+                raise
+            if resposta.status >= 300:
+                raise RuntimeError(f"HTTP {resposta.status} {resposta.reason}")
+            if resposta.getheader("Connection", "").lower() == "close":
+                self.fechar()
+            return
+
+    def fechar(self):
+        if self.conexao is not None:
+            try:
+                self.conexao.close()
+            finally:
+                self.conexao = None
+
+def _conexao_reaproveitada_caiu(erro):
+    import http.client
+    return isinstance(erro, (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                             BrokenPipeError, ConnectionResetError))
+
+class DestinoSmtp:
+    """Um e-mail por lote, reaproveitando a sessão SMTP (NOOP antes de reutilizar)."""
+
+    def __init__(self, host, porta=587, de=None, para=None, usuario=None, senha=None, tls=True, timeout=15):
+        if not para:
+            raise ValueError("Destino SMTP sem destinatários ('para')")
+        self.host = host
+        self.porta = int(porta)
+        self.de = de or usuario or f"tuba@{host}"
+        self.para = [para] if isinstance(para, str) else list(para)
+        self.usuario = usuario
+        self.senha = senha
+        self.tls = tls
+        self.timeout = timeout
+        self.sessao = None
+
+    def _sessao(self):
+        import smtplib
+        if self.sessao is not None:
+            try:
+                if self.sessao.noop()[0] == 250:
+                    return self.sessao
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.fechar()
+        sessao = smtplib.SMTP(self.host, self.porta, timeout=self.timeout)
+        if self.tls:
+            sessao.starttls()
+        if self.usuario:
+            sessao.login(self.usuario, self.senha or "")
+        self.sessao = sessao
+        return sessao
+
+    def enviar(self, corpo, pedidos):
+        from email.message import EmailMessage
+        mensagem = EmailMessage()
+        mensagem["From"] = self.de
+        mensagem["To"] = ", ".join(self.para)
+        if len(pedidos) == 1:
+            mensagem["Subject"] = f"[{APP_NAME}] Novo pedido: {pedidos[0]['nome']}"
+        else:
+            mensagem["Subject"] = f"[{APP_NAME}] {len(pedidos)} novos pedidos"
+        linhas = []
+        for p in pedidos:
+            quando = time.strftime("%d/%m/%Y %H:%M:%S", time.localtime(p["ts"]))
+            extra = resumo_metadados(p)
+            linhas.append(f"{quando}  [{p.get('rotulo') or '-'}]  {p['caminho']}" + (f"\n    {extra}" if extra else ""))
+        mensagem.set_content("\n".join(linhas) + "\n")
+        try:
+            self._sessao().send_message(mensagem)
+        except Exception:
+            self.fechar()
+            raise
+
+    def fechar(self):
+        if self.sessao is not None:
+            try:
+                self.sessao.quit()
+            except Exception:
+                pass
+            self.sessao = None
+
+class DestinoArquivo:
+    """Uma linha JSON por pedido, anexada a um arquivo local."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho if os.path.isabs(caminho) else os.path.join(APP_DIR, caminho)
+
+    def enviar(self, corpo, pedidos):
+        with open(self.caminho, "a", encoding="utf-8") as f:
+            for p in pedidos:
+                f.write(json.dumps(p, ensure_ascii=False) + "\n")
+
+    def fechar(self):
+        pass
+
+class DestinoSocket:
+    """Uma linha JSON por pedido em uma conexão TCP persistente."""
+
+    def __init__(self, host, porta, timeout=10):
+        self.endereco = (host, int(porta))
+        self.timeout = timeout
+        self.sock = None
+
+    def enviar(self, corpo, pedidos):
+        import socket
+        dados = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in pedidos).encode("utf-8")
+        if self.sock is None:
+            self.sock = socket.create_connection(self.endereco, timeout=self.timeout)
+        try:
+            self.sock.sendall(dados)
+        except OSError:
+            self.fechar()
+            raise
+
+    def fechar(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            finally:
+                self.sock = None
+
+TIPOS_DESTINO = {
+    "webhook": lambda c: DestinoWebhook(c["url"], c.get("cabecalhos"), c.get("timeout", 10)),
+    "smtp": lambda c: DestinoSmtp(c["host"], c.get("porta", 587), c.get("de"), c.get("para"), c.get("usuario"),
+                                  c.get("senha"), c.get("tls", True), c.get("timeout", 15)),
+    "arquivo": lambda c: DestinoArquivo(c["caminho"]),
+    "socket": lambda c: DestinoSocket(c["host"], c["porta"], c.get("timeout", 10)),
+}
+
+class SaidaDestino:
+    """
+    Thread de entrega de um destino: lê a caixa de saída em lotes (até
+    `lote_max`, esperando `espera_lote` segundos para juntar uma rajada),
+    envia e apaga; em falha, espera base * 2^n (com jitter) até `espera_max`.
+    """
+
+    def __init__(self, nome, destino, caminho_saida, lote_max=SAIDA_LOTE_MAX, espera_lote=SAIDA_ESPERA_LOTE,
+                 espera_max=SAIDA_ESPERA_MAX):
+        self.nome = nome
+        self.destino = destino
+        self.caminho_saida = caminho_saida
+        self.lote_max = max(1, int(lote_max))
+        self.espera_lote = max(0.0, float(espera_lote))
+        self.espera_max = max(1.0, float(espera_max))
+        self.sinal = threading.Event()
+        self.encerrar = threading.Event()
+        self.falhas = 0
+        self.thread = threading.Thread(target=self._loop, name=f"tuba-destino-{nome}", daemon=True)
+
+    def iniciar(self):
+        self.sinal.set()  # entrega o que sobrou da execução anterior
+        self.thread.start()
+
+    def _loop(self):
+        conexao = sqlite3.connect(self.caminho_saida, timeout=10)
+        try:
+            while not self.encerrar.is_set():
+                self.sinal.wait()
+                if self.encerrar.is_set():
+                    break
+                # Junta a rajada antes do primeiro envio
+                self.encerrar.wait(self.espera_lote)
+                self.sinal.clear()
+                try:
+                    while not self.encerrar.is_set() and self._enviar_lote(conexao):
+                        pass
+                except sqlite3.Error as e:
+                    # O que ficou na caixa sai na próxima tentativa
+                    logging.error(f"Erro ao ler a caixa de saída de '{self.nome}': {e}")
+                    self.sinal.set()
+                    self.encerrar.wait(self.espera_max)
+        finally:
+            self.destino.fechar()
+            conexao.close()
+
+    def _enviar_lote(self, conexao):
+        """Returns: bool: True se ainda pode haver itens a enviar já."""
+        linhas = conexao.execute(
+            "SELECT id, dados FROM saida WHERE destino = ? ORDER BY id LIMIT ?", (self.nome, self.lote_max)
+        ).fetchall()
+        if not linhas:
+            return False
+        pedidos = []
+        corrompidas = []
+        for id_, dados in linhas:
+            try:
+                pedidos.append(json.loads(dados))
+            except (ValueError, TypeError) as e:
+                # Nunca seria entregue: sai da caixa (com o conteúdo no log)
+                # em vez de travar o destino nela
+                logging.error(f"Pedido ilegível na caixa de saída de '{self.nome}' descartado: {e} ({dados!r:.200})")
+                corrompidas.append(id_)
+        if corrompidas:
+            with conexao:
+                conexao.execute(f"DELETE FROM saida WHERE id IN ({','.join('?' * len(corrompidas))})", corrompidas)
+            metricas.incrementar("tuba_destinos_descartados_total", len(corrompidas), destino=self.nome)
+            linhas = [linha for linha in linhas if linha[0] not in corrompidas]
+            if not linhas:
+                return True
+        corpo = {"app": APP_NAME, "versao": APP_VERSION, "pedidos": pedidos}
+        try:
+            self.destino.enviar(corpo, pedidos)
+        except Exception as e:
+            self.falhas += 1
+            espera = min(SAIDA_ESPERA_INICIAL * (2 ** (self.falhas - 1)), self.espera_max)
+            espera *= random.uniform(0.5, 1.5)
+            logging.warning(f"Falha ao entregar {len(pedidos)} pedido(s) a '{self.nome}': {e}; "
+                            f"nova tentativa em {espera:.1f}s")
+            metricas.incrementar("tuba_destinos_falhas_total", destino=self.nome)
+            self.encerrar.wait(espera)
+            return not self.encerrar.is_set()
+        with conexao:
+            conexao.execute(f"DELETE FROM saida WHERE id IN ({','.join('?' * len(linhas))})",
+                            [i for i, _ in linhas])
+        if self.falhas:
+            logging.info(f"Destino '{self.nome}' voltou a responder")
+        self.falhas = 0
+        metricas.incrementar("tuba_destinos_entregues_total", len(pedidos), destino=self.nome)
+        logging.info(f"{len(pedidos)} pedido(s) entregue(s) a '{self.nome}'")
+        return len(linhas) == self.lote_max
+
+    def parar(self, timeout=5):
+        self.encerrar.set()
+        self.sinal.set()
+        self.thread.join(timeout=timeout)
+
+class CaixaSaida:
+    """Caixa de saída em SQLite compartilhada pelos destinos."""
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or SAIDA_PATH
+        self.lock = threading.Lock()
+        self.conexao = sqlite3.connect(self.caminho, timeout=10, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS saida (id INTEGER PRIMARY KEY, destino TEXT NOT NULL, dados TEXT NOT NULL)"
+        )
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_saida_destino ON saida (destino, id)")
+        self.conexao.commit()
+        self.saidas = {}
+
+    def adicionar_destino(self, nome, destino, opcoes):
+        saida = SaidaDestino(
+            nome, destino, self.caminho,
+            lote_max=opcoes.get("lote_max", SAIDA_LOTE_MAX),
+            espera_lote=opcoes.get("espera_lote", SAIDA_ESPERA_LOTE),
+            espera_max=opcoes.get("espera_max", SAIDA_ESPERA_MAX),
+        )
+        self.saidas[nome] = saida
+        saida.iniciar()
+
+    def enfileirar(self, pedidos):
+        """Grava os pedidos para todos os destinos e acorda as threads de entrega."""
+        if not self.saidas or not pedidos:
+            return
+        linhas = [(nome, json.dumps(p, ensure_ascii=False)) for nome in self.saidas for p in pedidos]
+        with self.lock, self.conexao:
+            self.conexao.executemany("INSERT INTO saida (destino, dados) VALUES (?, ?)", linhas)
+        for saida in self.saidas.values():
+            saida.sinal.set()
+
+    def parar(self):
+        for saida in self.saidas.values():
+            saida.parar()
+        self.conexao.close()
+
+def pedido_para_destinos(evento):
+    """Representação JSON de um arquivo notificado, enviada aos destinos."""
+    dados = {
+        "ts": evento.detectado_em,
+        "caminho": evento.caminho,
+        "nome": evento.nome,
+        "tamanho": evento.tamanho,
+        "rotulo": evento.rotulo,
+        "regra": evento.acao.nome,
+        "origem": evento.origem,
+    }
+    if evento.duplicado_de:
+        dados["duplicado_de"] = evento.duplicado_de
+    if evento.metadados:
+        dados.update(evento.metadados)
+    return dados
+
+def obter_caixa_saida():
+    """Cria a caixa de saída e os destinos configurados no primeiro uso (None se não houver destinos)."""
+    global caixa_saida
+    if caixa_saida is not None:
+        return caixa_saida
+    configurados = ler_config().get("destinos") or []
+    if not configurados:
+        return None
+    caixa = CaixaSaida()
+    for i, opcoes in enumerate(configurados):
+        tipo = opcoes.get("tipo")
+        nome = opcoes.get("nome") or f"{tipo}{i + 1}"
+        try:
+            destino = TIPOS_DESTINO[tipo](opcoes)
+        except KeyError as e:
+            logging.error(f"Destino '{nome}' ignorado: tipo ou campo ausente ({e})")
+            continue
+        except Exception as e:
+            logging.error(f"Destino '{nome}' ignorado: {e}")
+            continue
+        caixa.adicionar_destino(nome, destino, opcoes)
+        logging.info(f"Destino externo ativo: {nome} ({tipo})")
+    caixa_saida = caixa
+    return caixa
+
+def enviar_para_destinos(evento):
+    if caixa_saida is None:
+        return
+    try:
+        caixa_saida.enfileirar([pedido_para_destinos(e) for e in [evento] + evento.membros])
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao gravar na caixa de saída: {e}")
+
+def encerrar_destinos():
+    global caixa_saida
+    if caixa_saida is not None:
+        caixa_saida.parar()
+        caixa_saida = None
+
+# ---------------------------------------------------
+# Contadores por minuto / hora / dia
+# ---------------------------------------------------
+class _Anel:
+    """
+    Buffer circular de contagens com `tamanho` posições de `largura` segundos.
+
+    As posições são indexadas pelo tempo local (índice absoluto = segundos
+    locais // largura), então posições vencidas são zeradas ao avançar e a
+    virada do dia não precisa de tratamento especial.
+    """
+
+    __slots__ = ("largura", "slots", "ultimo")
+
+    def __init__(self, tamanho, largura):
+        self.largura = largura
+        self.slots = array("I", bytes(4 * tamanho))
+        self.ultimo = 0
+
+    def _avancar(self, posicao):
+        if posicao <= self.ultimo:
+            return
+        tamanho = len(self.slots)
+        if posicao - self.ultimo >= tamanho:
+            for i in range(tamanho):
+                self.slots[i] = 0
+        else:
+            for p in range(self.ultimo + 1, posicao + 1):
+                self.slots[p % tamanho] = 0
+        self.ultimo = posicao
+
+    def adicionar(self, segundos_locais, quantidade=1):
+        posicao = int(segundos_locais // self.largura)
+        self._avancar(posicao)
+        if self.ultimo - posicao < len(self.slots):
+            self.slots[posicao % len(self.slots)] += quantidade
+
+    def valor(self, segundos_locais):
+        """Contagem da posição que contém o instante informado."""
+        posicao = int(segundos_locais // self.largura)
+        self._avancar(posicao)
+        return self.slots[posicao % len(self.slots)]
+
+    def soma(self, segundos_locais):
+        """Soma das últimas len(slots) posições até o instante informado."""
+        self._avancar(int(segundos_locais // self.largura))
+        return sum(self.slots)
+
+    def para_dict(self):
+        return {"ultimo": self.ultimo, "slots": list(self.slots)}
+
+    def carregar(self, dados):
+        slots = dados.get("slots", [])
+        if len(slots) != len(self.slots):
+            return
+        self.slots = array("I", (max(0, int(v)) for v in slots))
+        self.ultimo = int(dados.get("ultimo", 0))
+
+class SerieContagem:
+    """Contagens de uma pasta (ou do total): 60 minutos, 24 horas e 31 dias."""
+
+    __slots__ = ("minutos", "horas", "dias")
+
+    def __init__(self):
+        self.minutos = _Anel(60, 60)
+        self.horas = _Anel(24, 3600)
+        self.dias = _Anel(31, 86400)
+
+    def adicionar(self, segundos_locais, quantidade=1):
+        self.minutos.adicionar(segundos_locais, quantidade)
+        self.horas.adicionar(segundos_locais, quantidade)
+        self.dias.adicionar(segundos_locais, quantidade)
+
+    def para_dict(self):
+        return {"minutos": self.minutos.para_dict(), "horas": self.horas.para_dict(), "dias": self.dias.para_dict()}
+
+    def carregar(self, dados):
+        for nome in self.__slots__:
+            if isinstance(dados.get(nome), dict):
+                getattr(self, nome).carregar(dados[nome])
+
+def _segundos_locais(instante):
+    """Converte um timestamp em segundos no fuso local (meia-noite local = múltiplo de 86400)."""
+    return instante + time.localtime(instante).tm_gmtoff
+
+class ContadorPedidos:
+    """
+    Contadores de pedidos em memória, total e por pasta (rótulo).
+
+    Cada incremento é O(1) sob um lock curto; a gravação em disco
+    (CONTADORES_PATH) é feita por quem chama salvar(), fora do caminho de
+    detecção.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or CONTADORES_PATH
+        self.lock = threading.Lock()
+        self.total = SerieContagem()
+        self.por_rotulo = {}
+        self.alterado = False
+
+    def carregar(self):
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Contadores não carregados ({self.caminho}): {e}")
+            return
+        with self.lock:
+            self.total.carregar(dados.get("total", {}))
+            for rotulo, serie in dados.get("rotulos", {}).items():
+                self.por_rotulo.setdefault(rotulo, SerieContagem()).carregar(serie)
+        logging.info(f"Contadores restaurados: {self.hoje()} pedido(s) hoje")
+
+    def salvar(self):
+        with self.lock:
+            if not self.alterado:
+                return
+            dados = {
+                "total": self.total.para_dict(),
+                "rotulos": {r: s.para_dict() for r, s in self.por_rotulo.items()},
+            }
+            self.alterado = False
+        temporario = self.caminho + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(dados, f)
+            os.replace(temporario, self.caminho)
+        except OSError as e:
+            logging.error(f"Erro ao salvar contadores: {e}")
+
+    def registrar(self, rotulo=None, instante=None, quantidade=1):
+        segundos = _segundos_locais(instante if instante is not None else time.time())
+        with self.lock:
+            self.total.adicionar(segundos, quantidade)
+            if rotulo:
+                serie = self.por_rotulo.get(rotulo)
+                if serie is None:
+                    serie = self.por_rotulo[rotulo] = SerieContagem()
+                serie.adicionar(segundos, quantidade)
+            self.alterado = True
+
+    def _serie(self, rotulo):
+        return self.total if rotulo is None else self.por_rotulo.get(rotulo)
+
+    def hoje(self, rotulo=None):
+        with self.lock:
+            serie = self._serie(rotulo)
+            return serie.dias.valor(_segundos_locais(time.time())) if serie else 0
+
+    def ultima_hora(self, rotulo=None):
+        with self.lock:
+            serie = self._serie(rotulo)
+            return serie.minutos.soma(_segundos_locais(time.time())) if serie else 0
+
+    def ultimas_24h(self, rotulo=None):
+        with self.lock:
+            serie = self._serie(rotulo)
+            return serie.horas.soma(_segundos_locais(time.time())) if serie else 0
+
+def obter_contador():
+    """Contador compartilhado, restaurado do disco no primeiro uso."""
+    global contador
+    if contador is None:
+        contador = ContadorPedidos()
+        contador.carregar()
+    return contador
+
+def contar_pedido(rotulo=None, instante=None):
+    obter_contador().registrar(rotulo, instante)
+    atualizar_resumo()
+
+# ---------------------------------------------------
+# Backend de varredura (compartilhamentos de rede)
+# ---------------------------------------------------
+class _PastaVarrida:
+    """Estado de uma pasta acompanhada pelo ObservadorVarredura."""
+
+    __slots__ = ("handler", "caminho", "recursivo", "estado", "intervalo", "proxima")
+
+    def __init__(self, handler, caminho, recursivo):
+        self.handler = handler
+        self.caminho = caminho
+        self.recursivo = recursivo
+        self.estado = None      # caminho -> (tamanho, mtime_ns, inode); None até a primeira varredura
+        self.intervalo = VARREDURA_INTERVALO_MIN
+        self.proxima = 0.0
+
+class ObservadorVarredura(threading.Thread):
+    """
+    Alternativa ao Observer nativo para pastas em que as notificações do SO não
+    são confiáveis (SMB). Cada pasta é listada com os.scandir e comparada com a
+    listagem anterior; as diferenças viram eventos do watchdog entregues ao
+    mesmo Handler usado pelo backend nativo.
+
+    O intervalo é adaptativo: volta ao mínimo sempre que algo muda e dobra a
+    cada varredura sem mudanças, até o máximo. Uma única thread atende todas
+    as pastas; schedule/unschedule/stop seguem a interface do Observer.
+    """
+
+    def __init__(self, intervalo_min=VARREDURA_INTERVALO_MIN, intervalo_max=VARREDURA_INTERVALO_MAX):
+        super().__init__(name="tuba-varredura", daemon=True)
+        self.intervalo_min = max(0.1, float(intervalo_min))
+        self.intervalo_max = max(self.intervalo_min, float(intervalo_max))
+        self.cond = threading.Condition()
+        self.pastas = {}
+        self.parado = False
+
+    def schedule(self, handler, caminho, recursive=False):
+        pasta_varrida = _PastaVarrida(handler, caminho, recursive)
+        pasta_varrida.intervalo = self.intervalo_min
+        with self.cond:
+            self.pastas[id(pasta_varrida)] = pasta_varrida
+            self.cond.notify()
+        return pasta_varrida
+
+    def unschedule(self, pasta_varrida):
+        with self.cond:
+            self.pastas.pop(id(pasta_varrida), None)
+
+    def stop(self):
+        with self.cond:
+            self.parado = True
+            self.cond.notify_all()
+
+    def _varrer(self, pasta_varrida):
+        """Lista a pasta e despacha os eventos de criação/alteração/renomeação/remoção."""
+        # Compartilhamento desconectado: mantém a listagem anterior em vez de
+        # tratar todos os arquivos como removidos
+        if not os.path.isdir(pasta_varrida.caminho):
+            return False
+        anterior = pasta_varrida.estado
+        atual = {}
+        for caminho, entry in varrer_pasta(pasta_varrida.caminho, pasta_varrida.recursivo):
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            # inode é 0 no DirEntry do Windows; ainda assim tamanho + mtime_ns bastam
+            atual[caminho] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        pasta_varrida.estado = atual
+        if anterior is None:
+            # Primeira listagem: só registra (a recuperação cuida do que já existia)
+            return False
+
+        eventos = []
+        novos = []
+        for caminho, assinatura in atual.items():
+            antiga = anterior.get(caminho)
+            if antiga is None:
+                novos.append(caminho)
+            elif antiga != assinatura:
+                eventos.append(FileModifiedEvent(caminho))
+        removidos = []
+        if len(anterior) + len(novos) != len(atual):
+            removidos = [c for c in anterior if c not in atual]
+        # Renomeação: um arquivo some e outro com a mesma assinatura aparece. Vira
+        # um evento de movimento, como no backend nativo, em vez de um pedido novo
+        por_assinatura = {}
+        for caminho in removidos:
+            por_assinatura.setdefault(anterior[caminho], []).append(caminho)
+        movidos = set()
+        for caminho in novos:
+            origens = por_assinatura.get(atual[caminho])
+            if origens:
+                origem = origens.pop(0)
+                movidos.add(origem)
+                eventos.append(FileMovedEvent(origem, caminho))
+            else:
+                eventos.append(FileCreatedEvent(caminho))
+        eventos.extend(FileDeletedEvent(c) for c in removidos if c not in movidos)
+        for evento in eventos:
+            try:
+                pasta_varrida.handler.dispatch(evento)
+            except Exception as e:
+                logging.error(f"Erro ao despachar evento de varredura {evento.src_path}: {e}")
+        return bool(eventos)
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.parado:
+                    agora = time.monotonic()
+                    devidas = [p for p in self.pastas.values() if p.proxima <= agora]
+                    if devidas:
+                        break
+                    proxima = min((p.proxima for p in self.pastas.values()), default=None)
+                    self.cond.wait(None if proxima is None else proxima - agora)
+                if self.parado:
+                    return
+            for pasta_varrida in devidas:
+                try:
+                    houve_mudanca = self._varrer(pasta_varrida)
+                except Exception as e:
+                    logging.error(f"Erro na varredura de {pasta_varrida.caminho}: {e}")
+                    houve_mudanca = False
+                if houve_mudanca:
+                    pasta_varrida.intervalo = self.intervalo_min
+                else:
+                    pasta_varrida.intervalo = min(pasta_varrida.intervalo * 2, self.intervalo_max)
+                pasta_varrida.proxima = time.monotonic() + pasta_varrida.intervalo
+
+def criar_observador_varredura():
+    """Cria o observador de varredura usando a seção "varredura" do config.json."""
+    opcoes = ler_config().get("varredura") or {}
+    return ObservadorVarredura(
+        intervalo_min=opcoes.get("intervalo_min", VARREDURA_INTERVALO_MIN),
+        intervalo_max=opcoes.get("intervalo_max", VARREDURA_INTERVALO_MAX),
+    )
+
+# ---------------------------------------------------
+# Monitoramento
+# ---------------------------------------------------
+class Handler(FileSystemEventHandler):
+    """Handler de uma pasta monitorada; cada pasta tem o seu, com o rótulo do canal."""
+
+    def __init__(self, rotulo=None, raiz=None):
+        super().__init__()
+        self.rotulo = rotulo
+        self.raiz = raiz
+
+    def on_any_event(self, event):
+        # Batimento para o supervisor: a pasta está entregando eventos
+        ultimo_evento[self.raiz] = time.monotonic()
+        metricas.incrementar("tuba_eventos_watchdog_total", tipo=event.event_type)
+
+    def on_created(self, event):
+        
+        try:
+            if not event.is_directory and rastreador is not None and not monitor_pausado:
+                # Descarta cedo o que as regras já ignoram só pelo nome
+                if motor_regras is not None:
+                    acao = motor_regras.avaliar(os.path.basename(event.src_path))
+                    if acao is not None and acao.ignorar:
+                        return
+                # O arquivo só é notificado quando terminar de ser escrito
+                rastreador.acompanhar(event.src_path, self.rotulo)
+        except Exception as e:
+            logging.error(f"Erro ao processar arquivo criado: {e}")
+
+    def on_modified(self, event):
+        if not event.is_directory and rastreador is not None:
+            rastreador.modificado(event.src_path)
+
+    def on_moved(self, event):
+        try:
+            if not event.is_directory:
+                if indice is not None:
+                    indice.mover(event.src_path, event.dest_path)
+                if rastreador is not None:
+                    rastreador.movido(event.src_path, event.dest_path, self.rotulo)
+        except Exception as e:
+            logging.error(f"Erro ao processar arquivo movido: {e}")
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            if indice is not None:
+                indice.remover(event.src_path)
+            if rastreador is not None:
+                rastreador.removido(event.src_path)
+
+def validar_pasta(pasta_path):
+    """
+    Verifica se a pasta existe e pode ser lida, avisando o usuário se não.
+
+    Returns:
+        bool: True se a pasta pode ser monitorada.
+    """
+    # Validar se a pasta existe
+    if not pasta_path or not os.path.exists(pasta_path):
+        logging.error(f"Pasta inválida ou não existe: {pasta_path}")
+        notificar(
+            "⚠️ Erro",
+            "Pasta não encontrada. Selecione uma pasta válida.",
+            duracao=3
+        )
+        return False
+    
+    # Verificar permissões de leitura
+    if not os.access(pasta_path, os.R_OK):
+        logging.error(f"Sem permissão de leitura na pasta: {pasta_path}")
+        notificar(
+            "⚠️ Erro de Permissão",
+            "Sem permissão para acessar a pasta.",
+            duracao=3
+        )
+        return False
+    return True
+
+def _agendar_pasta(entrada):
+    """Agenda uma pasta no backend escolhido para ela (chamar com monitor_lock)."""
+    global observador_varredura
+    if entrada["backend"] == "varredura":
+        if observador_varredura is None:
+            observador_varredura = criar_observador_varredura()
+            observador_varredura.start()
+        observador = observador_varredura
+    else:
+        observador = observer
+    watch = observador.schedule(Handler(entrada["rotulo"], entrada["caminho"]), entrada["caminho"], recursive=entrada["recursivo"])
+    watches[entrada["caminho"]] = (observador, watch)
+
+def iniciar_monitor(pastas_lista):
+
+    global observer, monitor_ativo, despachante, agrupador, rastreador, motor_regras, indice, supervisor, duplicados
+    global extrator_metadados
+
+    validas = [e for e in pastas_lista if validar_pasta(e["caminho"])]
+    if not validas:
+        return False
+    
+    try:
+        obter_diario()
+        obter_caixa_saida()
+        with monitor_lock:
+            motor_regras = criar_motor_regras()
+            indice = IndiceArquivos()
+            indice.carregar()
+            despachante = criar_despachante()
+            despachante.iniciar()
+            agrupador = criar_agrupador(despachante.enfileirar)
+            agrupador.iniciar()
+            extrator_metadados = criar_extrator_metadados()
+            if extrator_metadados is not None:
+                extrator_metadados.iniciar()
+            duplicados = criar_detector_duplicados()
+            if duplicados is not None:
+                duplicados.iniciar()
+            rastreador = criar_rastreador(arquivo_pronto)
+            rastreador.iniciar()
+            # Um único Observer para todas as pastas
+            observer = Observer()
+            for entrada in validas:
+                _agendar_pasta(entrada)
+            observer.start()
+            monitor_ativo = True
+            supervisor = criar_supervisor()
+            supervisor.iniciar()
+        atualizar_resumo()
+            
+        logging.info(f"Monitor iniciado para: {[e['caminho'] for e in validas]}")
+        notificar(
+            "🚀 TUBA Iniciado",
+            f"Monitorando: {', '.join(e['rotulo'] for e in validas)}",
+            duracao=4
+        )
+        tocar_som(START_SOUND)
+
+        # Com o observer já rodando, compara as pastas com o índice para
+        # avisar o que chegou enquanto o TUBA estava fechado
+        threading.Thread(target=recuperar_perdidos, args=(validas,), name="tuba-recuperacao", daemon=True).start()
+        return True
+    except Exception as e:
+        logging.error(f"Erro ao iniciar monitor: {e}")
+        notificar(
+            "⚠️ Erro",
+            f"Não foi possível iniciar o monitor: {str(e)[:50]}",
+            duracao=4
+        )
+        return False
+
+def parar_monitor():
+
+    global observador_varredura, monitor_ativo, despachante, agrupador, rastreador, indice, supervisor
+    global duplicados, extrator_metadados
+    global saude_monitor
+    
+    try:
+        # Fora do lock: o supervisor também o usa
+        if supervisor is not None:
+            supervisor.parar()
+            supervisor = None
+        saude_monitor = "ok"
+        with monitor_lock:
+            estava_ativo = observer is not None and observer.is_alive()
+            if estava_ativo:
+                observer.stop()
+                observer.join(timeout=5)  # Aguardar até 5 segundos
+            # O resto do pipeline é encerrado mesmo com o observer já morto
+            # (ex.: antes de o supervisor reiniciá-lo), para que as filas sejam
+            # esvaziadas e o índice consolidado
+            if observador_varredura is not None:
+                observador_varredura.stop()
+                observador_varredura.join(timeout=5)
+                observador_varredura = None
+            watches.clear()
+            if rastreador is not None:
+                rastreador.parar()
+                rastreador = None
+            if duplicados is not None:
+                duplicados.parar()
+                duplicados = None
+            if extrator_metadados is not None:
+                extrator_metadados.parar()
+                extrator_metadados = None
+            if agrupador is not None:
+                agrupador.parar()
+                agrupador = None
+            if despachante is not None:
+                despachante.parar()
+                despachante = None
+            if indice is not None:
+                indice.fechar()
+                indice = None
+            monitor_ativo = False
+            atualizar_resumo()
+            if not estava_ativo:
+                logging.warning("Monitor não estava ativo")
+                return False
+            logging.info("Monitor parado com sucesso")
+            tocar_som(PAUSE_SOUND)
+            return True
+    except Exception as e:
+        logging.error(f"Erro ao parar monitor: {e}")
+        monitor_ativo = False
+        return False
+
+def adicionar_pasta(entrada, salvar=True):
+    """
+    Adiciona uma pasta ao monitoramento sem reiniciar as demais.
+
+    Returns:
+        bool: True se a pasta foi adicionada (ou já estava sendo monitorada).
+    """
+    global pasta
+    entrada = normalizar_pasta(entrada)
+    if entrada is None or not validar_pasta(entrada["caminho"]):
+        return False
+    try:
+        with monitor_lock:
+            agendada = observer is not None and observer.is_alive() and entrada["caminho"] not in watches
+            if agendada:
+                _agendar_pasta(entrada)
+            pastas[:] = [p for p in pastas if p["caminho"] != entrada["caminho"]] + [entrada]
+            pasta = pastas[0]["caminho"]
+        if salvar:
+            salvar_config(pastas)
+        if agendada and indice is not None:
+            threading.Thread(target=recuperar_perdidos, args=([entrada],), name="tuba-recuperacao", daemon=True).start()
+        logging.info(f"Pasta adicionada: {entrada['caminho']} [{entrada['rotulo']}]")
+        return True
+    except Exception as e:
+        logging.error(f"Erro ao adicionar pasta {entrada['caminho']}: {e}")
+        return False
+
+def remover_pasta(caminho, salvar=True):
+    """
+    Remove uma pasta do monitoramento sem reiniciar as demais.
+
+    Returns:
+        bool: True se a pasta estava configurada.
+    """
+    global pasta
+    caminho = os.path.normpath(caminho)
+    try:
+        with monitor_lock:
+            agendado = watches.pop(caminho, None)
+            if agendado is not None:
+                observador, watch = agendado
+                observador.unschedule(watch)
+            existia = any(p["caminho"] == caminho for p in pastas)
+            pastas[:] = [p for p in pastas if p["caminho"] != caminho]
+            pasta = pastas[0]["caminho"] if pastas else None
+        if existia and salvar:
+            salvar_config(pastas)
+        logging.info(f"Pasta removida: {caminho}")
+        return existia
+    except Exception as e:
+        logging.error(f"Erro ao remover pasta {caminho}: {e}")
+        return False
+
+def trocar_pasta_principal(nova, salvar=True):
+    """
+    Substitui a pasta principal mantendo as demais, sem parar o observer.
+
+    A nova pasta é agendada (com a varredura de recuperação) antes de a antiga
+    ser desagendada, então nenhum arquivo fica sem dono durante a troca.
+
+    Returns:
+        bool: True se a pasta foi trocada.
+    """
+    global pasta
+    entrada = normalizar_pasta(nova)
+    if entrada is None:
+        return False
+    antiga = pastas[0]["caminho"] if pastas else None
+    if not adicionar_pasta(entrada, salvar=False):
+        return False
+    if antiga and antiga != entrada["caminho"]:
+        remover_pasta(antiga, salvar=False)
+    with monitor_lock:
+        pastas[:] = [entrada] + [p for p in pastas if p["caminho"] != entrada["caminho"]]
+        pasta = entrada["caminho"]
+        rodando = observer is not None and observer.is_alive()
+    if salvar:
+        salvar_config(pastas)
+    if not rodando and coordenador_hub is None:
+        # O monitor não chegou a iniciar (ex.: pasta anterior inválida)
+        iniciar_monitor(list(pastas))
+    logging.info(f"Pasta principal trocada: {antiga} -> {pasta}")
+    return True
+
+def pausar_monitor():
+    """Silencia as notificações sem parar o observer."""
+    global monitor_pausado
+    if monitor_pausado:
+        return False
+    monitor_pausado = True
+    atualizar_resumo()
+    logging.info("Monitor pausado")
+    tocar_som(PAUSE_SOUND)
+    return True
+
+def retomar_monitor():
+    """Retoma as notificações e avisa, em um resumo, o que chegou durante a pausa."""
+    global monitor_pausado
+    if not monitor_pausado:
+        return False
+    monitor_pausado = False
+    atualizar_resumo()
+    logging.info("Monitor retomado")
+    tocar_som(START_SOUND)
+    if coordenador_hub is not None and coordenador_hub.cliente is not None:
+        coordenador_hub.cliente.retomar()
+    if indice is not None:
+        agendadas = [p for p in pastas if p["caminho"] in watches]
+        threading.Thread(
+            target=recuperar_perdidos, args=(agendadas, "pausa"), name="tuba-recuperacao", daemon=True
+        ).start()
+    return True
+
+def aplicar_config(anterior, nova):
+    """
+    Aplica um config.json editado com o TUBA aberto: pastas adicionadas ou
+    removidas e regras passam a valer na hora; as demais seções, no próximo início.
+    """
+    global motor_regras, pasta
+    antigas = {e["caminho"]: e for e in pastas_da_config(anterior)}
+    novas = {e["caminho"]: e for e in pastas_da_config(nova)}
+    if not novas and antigas:
+        # Sem nenhuma pasta válida o TUBA não faria nada: mantém as atuais
+        logging.warning("config.json sem pastas válidas; mantendo as pastas monitoradas atuais")
+        novas = antigas
+    if antigas != novas or list(antigas) != list(novas):
+        for caminho in antigas:
+            if caminho not in novas:
+                remover_pasta(caminho, salvar=False)
+        for caminho, entrada in novas.items():
+            if antigas.get(caminho) != entrada:
+                if caminho in antigas:
+                    # Recursivo/rótulo/backend mudaram: reagenda a pasta
+                    remover_pasta(caminho, salvar=False)
+                adicionar_pasta(entrada, salvar=False)
+        with monitor_lock:
+            # Mesma ordem do arquivo (a primeira é a principal)
+            ordem = list(novas)
+            pastas.sort(key=lambda p: ordem.index(p["caminho"]) if p["caminho"] in ordem else len(ordem))
+            pasta = pastas[0]["caminho"] if pastas else None
+        atualizar_resumo()
+    if any(anterior.get(s) != nova.get(s) for s in ("regras", "ignorar_nomes")):
+        motor = criar_motor_regras()
+        with monitor_lock:
+            motor_regras = motor
+    outras = sorted(
+        s for s in set(anterior) | set(nova)
+        if s not in ("pastas", "regras", "ignorar_nomes") and anterior.get(s) != nova.get(s)
+    )
+    if outras:
+        logging.info(f"Seções alteradas no config.json valem a partir do próximo início: {', '.join(outras)}")
+
+# ---------------------------------------------------
+# Supervisão do monitor
+# ---------------------------------------------------
+def _assinatura_pasta(raiz, recursivo):
+    """
+    Assinatura barata do conteúdo da pasta (quantidade, soma dos tamanhos e
+    mtime mais recente), usada como batimento pelo supervisor.
+    """
+    quantidade = total = ultimo = 0
+    for caminho, entry in varrer_pasta(raiz, recursivo):
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        quantidade += 1
+        total += st.st_size
+        ultimo = max(ultimo, st.st_mtime_ns)
+    return quantidade, total, ultimo
+
+class SupervisorMonitor:
+    """
+    Vigia o monitor em uma thread própria:
+
+    - observers e emissores vivos: se algum morreu, recria o observer com
+      espera exponencial entre tentativas e roda uma varredura de conciliação;
+    - pastas acessíveis: uma pasta que some (compartilhamento desconectado,
+      pasta renomeada) é desagendada e volta, com conciliação, quando reaparece;
+    - batimento: a assinatura da pasta mudou sem nenhum evento do watchdog no
+      período (ex.: estouro do buffer do SO) -> conciliação.
+
+    A conciliação é a mesma varredura da inicialização (recuperar_perdidos):
+    o índice garante que nada é avisado duas vezes.
+
+    Um observer que morre logo depois de reiniciado conta como nova falha: a
+    espera entre reinícios só volta a zero depois de `estavel` segundos de pé.
+    """
+
+    def __init__(self, intervalo=SUPERVISAO_INTERVALO, batimento=SUPERVISAO_BATIMENTO,
+                 espera_max=SUPERVISAO_ESPERA_MAX, estavel=SUPERVISAO_ESTAVEL, relogio=time.monotonic):
+        self.intervalo = max(0.5, float(intervalo))
+        self.batimento = max(0.0, float(batimento))
+        self.espera_max = max(self.intervalo, float(espera_max))
+        self.estavel = max(0.0, float(estavel))
+        self.relogio = relogio
+        self.encerrar = threading.Event()
+        self.thread = None
+        self.inacessiveis = set()
+        self.assinaturas = {}       # caminho -> (assinatura, monotonic da leitura)
+        self.proximo_batimento = 0.0
+        self.falhas = 0
+        self.proxima_tentativa = 0.0
+        self.reiniciado_em = 0.0
+        self.reinicios = 0
+
+    def iniciar(self):
+        self.proximo_batimento = self.relogio() + self.batimento
+        self.thread = threading.Thread(target=self._loop, name="tuba-supervisor", daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        self.encerrar.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+            self.thread = None
+
+    def _loop(self):
+        while not self.encerrar.wait(self.intervalo):
+            try:
+                self._verificar()
+            except Exception as e:
+                logging.error(f"Erro na supervisão do monitor: {e}", exc_info=True)
+
+    def _verificar(self):
+        recuperar = self._verificar_pastas()
+        if not self._observadores_vivos():
+            if self.relogio() >= self.proxima_tentativa:
+                if self._reiniciar():
+                    recuperar = [p for p in pastas if p["caminho"] not in self.inacessiveis]
+        elif self.falhas and self.relogio() - self.reiniciado_em >= self.estavel:
+            self.falhas = 0
+            self.proxima_tentativa = 0.0
+        if self.batimento and self.relogio() >= self.proximo_batimento:
+            self.proximo_batimento = self.relogio() + self.batimento
+            recuperar += [p for p in self._verificar_batimento() if p not in recuperar]
+        if recuperar and not monitor_pausado and indice is not None:
+            logging.info(f"Conciliando pastas: {[p['caminho'] for p in recuperar]}")
+            recuperar_perdidos(recuperar, "conciliacao")
+        self._atualizar_saude()
+
+    def _verificar_pastas(self):
+        """Desagenda pastas inacessíveis e reagenda as que voltaram."""
+        voltaram = []
+        for entrada in list(pastas):
+            caminho = entrada["caminho"]
+            acessivel = os.path.isdir(caminho) and os.access(caminho, os.R_OK)
+            if not acessivel and caminho not in self.inacessiveis:
+                logging.warning(f"Pasta inacessível, monitoramento suspenso: {caminho}")
+                self.inacessiveis.add(caminho)
+                with monitor_lock:
+                    agendado = watches.pop(caminho, None)
+                    if agendado is not None:
+                        try:
+                            agendado[0].unschedule(agendado[1])
+                        except Exception as e:
+                            logging.debug(f"Erro ao desagendar {caminho}: {e}")
+            elif acessivel and caminho in self.inacessiveis:
+                with monitor_lock:
+                    if observer is None or not observer.is_alive():
+                        continue
+                    try:
+                        if caminho not in watches:
+                            _agendar_pasta(entrada)
+                    except Exception as e:
+                        logging.warning(f"Pasta {caminho} voltou mas não pôde ser agendada: {e}")
+                        continue
+                self.inacessiveis.discard(caminho)
+                self.assinaturas.pop(caminho, None)
+                logging.info(f"Pasta acessível novamente: {caminho}")
+                voltaram.append(entrada)
+        # Pastas removidas da configuração deixam de ser acompanhadas
+        configuradas = {p["caminho"] for p in pastas}
+        self.inacessiveis &= configuradas
+        return voltaram
+
+    def _observadores_vivos(self):
+        with monitor_lock:
+            if observer is None or not observer.is_alive():
+                return False
+            if not all(emissor.is_alive() for emissor in list(observer.emitters)):
+                return False
+            if observador_varredura is not None and not observador_varredura.is_alive():
+                return False
+            return True
+
+    def _reiniciar(self):
+        """Recria os observers e reagenda as pastas acessíveis."""
+        global observer, observador_varredura, monitor_ativo
+        self.reinicios += 1
+        metricas.incrementar("tuba_reinicios_observer_total")
+        logging.warning(f"Observer parado ou com emissor morto; reiniciando (tentativa {self.falhas + 1})")
+        antigo = None
+        try:
+            with monitor_lock:
+                antigo = observer
+                monitor_ativo = False
+                for observador, watch in watches.values():
+                    if observador is observador_varredura:
+                        observador.unschedule(watch)
+                watches.clear()
+                if observador_varredura is not None and not observador_varredura.is_alive():
+                    observador_varredura = None
+                observer = Observer()
+                for entrada in pastas:
+                    if entrada["caminho"] not in self.inacessiveis:
+                        _agendar_pasta(entrada)
+                observer.start()
+                monitor_ativo = True
+        except Exception as e:
+            espera = self._adiar()
+            logging.error(f"Falha ao reiniciar o observer: {e}; nova tentativa em {espera:.0f}s")
+            return False
+        finally:
+            if antigo is not None:
+                try:
+                    antigo.stop()
+                    antigo.join(timeout=2)
+                except Exception:
+                    pass
+            atualizar_resumo()
+        # Só zera a espera depois de `estavel` segundos de pé (ver _verificar)
+        self._adiar()
+        self.reiniciado_em = self.relogio()
+        logging.info("Observer reiniciado")
+        return True
+
+    def _adiar(self):
+        """
+        Conta mais uma falha e marca a próxima tentativa de reinício.
+
+        Returns:
+            float: Segundos até a próxima tentativa.
+        """
+        self.falhas += 1
+        espera = min(self.intervalo * (2 ** self.falhas), self.espera_max)
+        self.proxima_tentativa = self.relogio() + espera
+        return espera
+
+    def _verificar_batimento(self):
+        """Pastas cuja assinatura mudou sem nenhum evento recebido no período."""
+        suspeitas = []
+        for entrada in list(pastas):
+            caminho = entrada["caminho"]
+            # O backend de varredura já compara listagens; não perde eventos
+            if caminho in self.inacessiveis or caminho not in watches or entrada["backend"] == "varredura":
+                continue
+            try:
+                assinatura = _assinatura_pasta(caminho, entrada["recursivo"])
+            except OSError:
+                continue
+            anterior = self.assinaturas.get(caminho)
+            agora = self.relogio()
+            self.assinaturas[caminho] = (assinatura, agora)
+            if anterior is None or anterior[0] == assinatura:
+                continue
+            if ultimo_evento.get(caminho, 0.0) < anterior[1]:
+                logging.warning(f"Pasta mudou sem eventos do watchdog (possível estouro do buffer): {caminho}")
+                suspeitas.append(entrada)
+        return suspeitas
+
+    def _atualizar_saude(self):
+        global saude_monitor
+        if not monitor_ativo:
+            nova = "reiniciando"
+        elif self.inacessiveis:
+            nova = f"{len(self.inacessiveis)} pasta(s) inacessível(is)"
+        else:
+            nova = "ok"
+        if nova != saude_monitor:
+            if nova == "ok":
+                logging.info("Saúde do monitor: ok")
+            else:
+                logging.warning(f"Saúde do monitor: {nova}")
+            saude_monitor = nova
+            atualizar_resumo()
+
+def criar_supervisor():
+    """Cria o supervisor usando a seção "supervisao" do config.json."""
+    opcoes = ler_config().get("supervisao") or {}
+    return SupervisorMonitor(
+        intervalo=opcoes.get("intervalo", SUPERVISAO_INTERVALO),
+        batimento=opcoes.get("batimento", SUPERVISAO_BATIMENTO),
+        espera_max=opcoes.get("espera_max", SUPERVISAO_ESPERA_MAX),
+        estavel=opcoes.get("estavel", SUPERVISAO_ESTAVEL),
+    )
+
+# ---------------------------------------------------
+# Hub: uma estação observa, as outras só notificam
+# ---------------------------------------------------
+# Com a seção "hub" no config.json, as estações que monitoram a mesma pasta
+# de rede elegem um hub por meio de uma trava (HUB_TRAVA_NOME) na própria
+# pasta. Só o hub roda o observer; cada notificação que ele exibe é publicada
+# por TCP às demais, que a exibem com as próprias regras e sons. As mensagens
+# levam um número de sequência: uma estação que reconecta recebe o que
+# perdeu do histórico do hub. Se o hub parar de renovar a trava, a primeira
+# estação que a tomar vira o novo hub.
+_QUADRO = struct.Struct(">BQI")  # tipo, sequência, tamanho do corpo JSON
+QUADRO_OLA = 1          # estação -> hub: {"estacao", "sessao"}; seq = último recebido
+QUADRO_BOAS_VINDAS = 2  # hub -> estação: {"sessao", "reenvio"}; seq = atual do hub
+QUADRO_EVENTO = 3       # hub -> estação: {"pedidos": [...]}
+QUADRO_BATIMENTO = 4
+
+def montar_quadro(tipo, seq=0, corpo=None):
+    dados = b"" if corpo is None else json.dumps(corpo, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _QUADRO.pack(tipo, seq, len(dados)) + dados
+
+def _receber_exato(sock, tamanho):
+    partes = []
+    while tamanho:
+        parte = sock.recv(min(tamanho, 65536))
+        if not parte:
+            raise ConnectionError("conexão encerrada pelo outro lado")
+        partes.append(parte)
+        tamanho -= len(parte)
+    return b"".join(partes)
+
+def receber_quadro(sock):
+    """Returns: tuple: (tipo, seq, corpo) do próximo quadro; corpo é None nos quadros vazios."""
+    tipo, seq, tamanho = _QUADRO.unpack(_receber_exato(sock, _QUADRO.size))
+    if tamanho > HUB_QUADRO_MAX:
+        raise ValueError(f"quadro de {tamanho} bytes excede o limite")
+    corpo = json.loads(_receber_exato(sock, tamanho).decode("utf-8")) if tamanho else None
+    return tipo, seq, corpo
+
+class TravaHub:
+    """
+    Eleição do hub por um arquivo JSON na pasta compartilhada.
+
+    O hub regrava a trava a cada batimento (temporário + os.replace). As
+    outras estações não comparam relógios: a trava é abandonada quando o par
+    (sessão, batimento) não muda por `expira` segundos do relógio local.
+    """
+
+    def __init__(self, caminho, endereco, porta, expira=HUB_TRAVA_EXPIRA):
+        import socket
+        self.caminho = caminho
+        self.estacao = socket.gethostname()
+        self.endereco = endereco or self.estacao
+        self.porta = int(porta)
+        self.expira = expira
+        self.sessao = os.urandom(8).hex()
+        self.batimento = 0
+        self.visto = None      # (sessao, batimento) da última leitura
+        self.visto_em = 0.0
+
+    def ler(self):
+        """Returns: dict | None: Conteúdo da trava, None se não existe ({} se ilegível)."""
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            return {}
+
+    def _dados(self):
+        return {"estacao": self.estacao, "pid": os.getpid(), "endereco": self.endereco, "porta": self.porta,
+                "sessao": self.sessao, "batimento": self.batimento}
+
+    def _gravar(self):
+        temporario = f"{self.caminho}.{self.estacao}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self._dados(), f)
+        os.replace(temporario, self.caminho)
+
+    def abandonada(self, atual=None):
+        """True se a trava não existe ou não é renovada há mais de `expira` segundos."""
+        atual = self.ler() if atual is None else atual
+        if atual is None:
+            return True
+        marca = (atual.get("sessao"), atual.get("batimento"))
+        agora = time.monotonic()
+        if marca != self.visto:
+            self.visto, self.visto_em = marca, agora
+            return False
+        return agora - self.visto_em > self.expira
+
+    def adquirir(self, forcar=False):
+        """
+        Tenta se tornar o hub.
+
+        Returns:
+            bool: True se esta estação ficou com a trava.
+        """
+        if forcar:
+            # Sempre com um batimento novo: uma trava regravada com o mesmo
+            # (sessão, batimento) parece abandonada para as outras estações
+            self.batimento += 1
+            self._gravar()
+            return True
+        for _ in range(2):
+            try:
+                fd = os.open(self.caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                atual = self.ler()
+                # A trava deixada por um TUBA anterior desta estação pode ser tomada na hora
+                propria = bool(atual) and atual.get("estacao") == self.estacao
+                if not propria and not self.abandonada(atual):
+                    return False
+                if not self._descartar(atual):
+                    return False
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._dados(), f)
+            return True
+        return False
+
+    def _descartar(self, atual):
+        """Tira a trava abandonada do caminho; o rename é atômico, então só uma estação consegue."""
+        descarte = f"{self.caminho}.{self.estacao}.descartada.tmp"
+        try:
+            os.rename(self.caminho, descarte)
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            logging.warning(f"Não foi possível descartar a trava do hub: {e}")
+            return False
+        try:
+            with open(descarte, "r", encoding="utf-8") as f:
+                descartada = json.load(f)
+        except (OSError, ValueError):
+            descartada = {}
+        if atual and descartada.get("sessao") != atual.get("sessao"):
+            # Outra estação assumiu entre a leitura e o rename: devolve a trava dela
+            try:
+                os.rename(descarte, self.caminho)
+            except OSError:
+                pass
+            return False
+        try:
+            os.remove(descarte)
+        except OSError:
+            pass
+        return True
+
+    def renovar(self):
+        """
+        Regrava a trava com o próximo batimento.
+
+        Returns:
+            bool: False se outra estação assumiu o hub.
+        """
+        atual = self.ler()
+        if atual and atual.get("sessao") != self.sessao:
+            return False
+        self.batimento += 1
+        self._gravar()
+        return True
+
+    def liberar(self):
+        atual = self.ler()
+        if atual and atual.get("sessao") == self.sessao:
+            try:
+                os.remove(self.caminho)
+            except OSError as e:
+                logging.warning(f"Não foi possível remover a trava do hub: {e}")
+
+    def endereco_hub(self):
+        """Returns: tuple | None: (host, porta) anunciado na trava, se houver um hub."""
+        atual = self.ler()
+        if not atual or not atual.get("endereco") or atual.get("sessao") == self.sessao:
+            return None
+        try:
+            return atual["endereco"], int(atual["porta"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+class ServidorHub:
+    """
+    Publica as notificações do hub às estações conectadas.
+
+    Cada estação tem uma fila e uma thread de envio; uma estação lenta demais
+    (fila cheia) é desconectada e, ao reconectar, retoma pelo histórico.
+    """
+
+    def __init__(self, sessao, host="", porta=HUB_PORTA, historico=HUB_HISTORICO):
+        self.sessao = sessao
+        self.endereco = (host, int(porta))
+        self.historico = deque(maxlen=max(1, int(historico)))  # (seq, quadro já montado)
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.clientes = {}  # socket -> fila de quadros
+        self.encerrar = threading.Event()
+        self.sock = None
+        self.thread = None
+
+    def iniciar(self):
+        import socket
+        self.sock = socket.create_server(self.endereco)
+        self.sock.settimeout(1.0)
+        self.thread = threading.Thread(target=self._aceitar, name="tuba-hub", daemon=True)
+        self.thread.start()
+        logging.info(f"Hub publicando notificações na porta {self.endereco[1]}")
+
+    def quantidade_clientes(self):
+        with self.lock:
+            return len(self.clientes)
+
+    def publicar(self, pedidos):
+        with self.lock:
+            self.seq += 1
+            quadro = montar_quadro(QUADRO_EVENTO, self.seq, {"pedidos": pedidos})
+            self.historico.append((self.seq, quadro))
+            for conexao, fila in list(self.clientes.items()):
+                try:
+                    fila.put_nowait(quadro)
+                except queue.Full:
+                    logging.warning("Estação lenta demais desconectada; ela retoma pelo histórico ao reconectar")
+                    self._derrubar(conexao)
+        metricas.incrementar("tuba_hub_publicadas_total")
+
+    def _derrubar(self, conexao):
+        """Tira a estação da lista e desbloqueia a thread dela (chamar com self.lock)."""
+        import socket
+        self.clientes.pop(conexao, None)
+        try:
+            conexao.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _aceitar(self):
+        import socket
+        while not self.encerrar.is_set():
+            try:
+                conexao, endereco = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                if not self.encerrar.is_set():
+                    logging.error("Hub deixou de aceitar conexões")
+                break
+            threading.Thread(target=self._atender, args=(conexao, endereco), name="tuba-hub-estacao",
+                             daemon=True).start()
+
+    def _atender(self, conexao, endereco):
+        estacao = endereco[0]
+        try:
+            conexao.settimeout(HUB_BATIMENTO * 3)
+            tipo, desde, corpo = receber_quadro(conexao)
+            if tipo != QUADRO_OLA or not isinstance(corpo, dict):
+                return
+            estacao = corpo.get("estacao") or estacao
+            fila = queue.Queue(maxsize=self.historico.maxlen)
+            with self.lock:
+                reenvio = []
+                if corpo.get("sessao") == self.sessao:
+                    reenvio = [quadro for seq, quadro in self.historico if seq > desde]
+                    primeiro = self.historico[0][0] if self.historico else self.seq + 1
+                    if desde + 1 < primeiro:
+                        logging.warning(f"{primeiro - desde - 1} notificação(ões) para {estacao} "
+                                        f"já saíram do histórico do hub")
+                boas_vindas = montar_quadro(QUADRO_BOAS_VINDAS, self.seq,
+                                            {"sessao": self.sessao, "reenvio": len(reenvio)})
+                # Registrada no mesmo lock do instantâneo: nada se perde entre o reenvio e a fila
+                self.clientes[conexao] = fila
+            conexao.sendall(boas_vindas + b"".join(reenvio))
+            logging.info(f"Estação conectada ao hub: {estacao} ({len(reenvio)} reenviada(s))")
+            while not self.encerrar.is_set():
+                try:
+                    quadro = fila.get(timeout=HUB_BATIMENTO)
+                except queue.Empty:
+                    quadro = montar_quadro(QUADRO_BATIMENTO)
+                conexao.sendall(quadro)
+        except (OSError, ValueError) as e:
+            if not self.encerrar.is_set():
+                logging.info(f"Estação desconectada do hub: {estacao} ({e})")
+        finally:
+            with self.lock:
+                self.clientes.pop(conexao, None)
+            conexao.close()
+
+    def parar(self):
+        self.encerrar.set()
+        if self.sock is not None:
+            self.sock.close()
+        with self.lock:
+            for conexao in list(self.clientes):
+                self._derrubar(conexao)
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+class ClienteHub:
+    """
+    Conexão de uma estação com o hub: recebe as notificações e as entrega ao
+    despachante local, reconectando com espera exponencial quando cai.
+    """
+
+    def __init__(self, trava, endereco_fixo=None):
+        self.trava = trava
+        self.endereco_fixo = endereco_fixo
+        self.sessao = None
+        self.seq = 0
+        self.carregar_estado()
+        self.falhas = 0
+        self.conectado_a = None
+        self.sock = None
+        self.pausados = []
+        self.encerrar = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name="tuba-hub-cliente", daemon=True)
+
+    def carregar_estado(self):
+        """Última posição recebida, para retomar do histórico do hub após reiniciar o TUBA."""
+        try:
+            with open(HUB_ESTADO_PATH, "r", encoding="utf-8") as f:
+                estado = json.load(f)
+            self.sessao, self.seq = estado.get("sessao"), int(estado.get("seq", 0))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def salvar_estado(self):
+        try:
+            with open(HUB_ESTADO_PATH, "w", encoding="utf-8") as f:
+                json.dump({"sessao": self.sessao, "seq": self.seq}, f)
+        except OSError as e:
+            logging.error(f"Erro ao salvar estado do hub: {e}")
 
-ICON_PATH = resource_path("icone.ico")
+    def iniciar(self):
+        self.thread.start()
 
-# Sons resolvidos via resource_path (garante que funcionem no exe gerado)
-START_SOUND = resource_path("start.wav")
-ALERT_SOUND = resource_path("alert.wav")
-PAUSE_SOUND = resource_path("pause.wav")
+    def _loop(self):
+        primeira = True
+        while not self.encerrar.is_set():
+            endereco = self.endereco_fixo or self.trava.endereco_hub()
+            if endereco is None:
+                self.encerrar.wait(HUB_BATIMENTO)
+                continue
+            try:
+                self._conversar(endereco, primeira)
+            except (OSError, ValueError) as e:
+                if self.encerrar.is_set():
+                    break
+                self.falhas += 1
+                espera = min(HUB_BATIMENTO * (2 ** (self.falhas - 1)), HUB_ESPERA_MAX) * random.uniform(0.5, 1.5)
+                logging.warning(f"Conexão com o hub {endereco[0]}:{endereco[1]} falhou: {e}; "
+                                f"nova tentativa em {espera:.1f}s")
+                metricas.incrementar("tuba_hub_reconexoes_total")
+                self.encerrar.wait(espera)
+            primeira = False
 
-# Configurar sistema de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_PATH, encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+    def _conversar(self, endereco, primeira):
+        import socket
+        self.sock = socket.create_connection(endereco, timeout=HUB_BATIMENTO * 3)
+        try:
+            self.sock.sendall(montar_quadro(QUADRO_OLA, self.seq,
+                                            {"estacao": self.trava.estacao, "sessao": self.sessao}))
+            tipo, seq_hub, corpo = receber_quadro(self.sock)
+            if tipo != QUADRO_BOAS_VINDAS or not isinstance(corpo, dict):
+                raise ValueError("resposta inesperada do hub")
+            if corpo.get("sessao") != self.sessao:
+                # Hub novo: a numeração recomeça e o que ele perdeu vem da recuperação dele
+                self.sessao, self.seq = corpo.get("sessao"), seq_hub
+            self.falhas = 0
+            self.conectado_a = endereco[0]
+            atualizar_resumo()
+            logging.info(f"Conectado ao hub {endereco[0]}:{endereco[1]}")
+            perdidos = []
+            for _ in range(int(corpo.get("reenvio", 0))):
+                tipo, seq, corpo = receber_quadro(self.sock)
+                if tipo == QUADRO_EVENTO and seq > self.seq:
+                    perdidos.extend(corpo.get("pedidos") or [])
+                    self.seq = seq
+            if perdidos:
+                # Um único resumo, como na recuperação do monitor local
+                self.entregar(perdidos, "recuperacao" if primeira else "conciliacao")
+            while not self.encerrar.is_set():
+                tipo, seq, corpo = receber_quadro(self.sock)
+                if tipo == QUADRO_EVENTO and seq > self.seq:
+                    self.seq = seq
+                    self.entregar(corpo.get("pedidos") or [])
+        finally:
+            self.conectado_a = None
+            self.sock.close()
+            atualizar_resumo()
+
+    def entregar(self, pedidos, origem=None):
+        # Pausado: guarda para um resumo ao retomar
+        if monitor_pausado:
+            self.pausados.extend(pedidos)
+            return
+        evento = evento_do_hub(pedidos, origem)
+        if evento is not None and despachante is not None:
+            despachante.enfileirar(evento)
 
-# Notificador
-toaster = ToastNotifier()
+    def retomar(self):
+        pausados, self.pausados = self.pausados, []
+        if pausados:
+            self.entregar(pausados, "pausa")
 
-# Variáveis globais
-observer = None
-pasta = None
-monitor_lock = threading.Lock()
-monitor_ativo = False
+    def parar(self):
+        import socket
+        self.encerrar.set()
+        sock = self.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.thread.is_alive():
+            self.thread.join(timeout=2)
+        self.salvar_estado()
 
-# ---------------------------------------------------
-# Funções auxiliares
-# ---------------------------------------------------
-def verificar_recursos():
+def evento_do_hub(pedidos, origem=None):
     """
-    Verifica se todos os recursos necessários existem.
-    
+    Refaz, nesta estação, o evento de uma notificação publicada pelo hub. As
+    regras locais decidem som, duração e o que ignorar.
+
     Returns:
-        bool: True se todos os recursos existem, False caso contrário.
+        EventoArquivo | None: Os pedidos agregados em um evento, ou None se nada deve ser avisado.
     """
-    recursos = [ICON_PATH, START_SOUND, ALERT_SOUND, PAUSE_SOUND]
-    faltando = [r for r in recursos if not os.path.exists(r)]
-    if faltando:
-        logging.warning(f"Recursos faltando: {faltando}")
-        return False
-    logging.info("Todos os recursos validados com sucesso")
-    return True
-
-def escolher_pasta():
+    eventos = []
+    for dados in pedidos:
+        caminho = dados.get("caminho")
+        if not caminho:
+            continue
+        tamanho = dados.get("tamanho")
+        acao = motor_regras.avaliar(os.path.basename(caminho), tamanho or 0) if motor_regras else ACAO_PADRAO
+        if acao is None or acao.ignorar:
+            continue
+        evento = EventoArquivo(caminho, dados.get("rotulo"), acao)
+        evento.tamanho = tamanho
+        evento.origem = origem or dados.get("origem") or "tempo_real"
+        evento.detectado_em = dados.get("ts") or evento.detectado_em
+        evento.duplicado_de = dados.get("duplicado_de")
+        evento.metadados = {c: dados[c] for c in CAMPOS_PEDIDO if dados.get(c)} or None
+        # Mantém o índice local em dia, para a recuperação não repetir estes
+        # pedidos se esta estação virar o hub
+        if indice is not None:
+            indice.registrar(caminho)
+        contar_pedido(evento.rotulo, evento.detectado_em)
+        metricas.incrementar("tuba_arquivos_detectados_total", rotulo=evento.rotulo or "", origem="hub")
+        if acao.silencioso:
+            registrar_no_diario(evento, "silencioso")
+            continue
+        eventos.append(evento)
+    if not eventos:
+        return None
+    resumo = eventos[0]
+    for evento in eventos[1:]:
+        resumo.mesclar(evento)
+    return resumo
 
-    root = None
+def publicar_no_hub(evento):
+    if servidor_hub is None:
+        return
     try:
-        root = tk.Tk()
-        root.withdraw()
-        # Forçar janela para frente
-        root.attributes('-topmost', True)
-        root.update()
-        pasta = filedialog.askdirectory(title="Selecione a pasta para monitorar", parent=root)
-        logging.info(f"Pasta selecionada: {pasta if pasta else 'Nenhuma'}")
-        return pasta if pasta else None
+        servidor_hub.publicar([pedido_para_destinos(e) for e in [evento] + evento.membros])
     except Exception as e:
-        logging.error(f"Erro ao escolher pasta: {e}")
-        return None
-    finally:
-        # Garantir que a janela seja destruída de forma segura
-        if root is not None:
+        logging.error(f"Erro ao publicar notificação no hub: {e}")
+
+class CoordenadorHub:
+    """
+    Decide o papel desta estação ("hub" ou "cliente") e troca de papel quando
+    a trava muda de dono. `modo` "automatico" disputa a trava; "hub" sempre a
+    assume e "cliente" nunca.
+    """
+
+    def __init__(self, pastas_lista, opcoes):
+        self.pastas_iniciais = pastas_lista
+        self.modo = opcoes.get("modo", "automatico")
+        self.porta = int(opcoes.get("porta", HUB_PORTA))
+        self.escutar = opcoes.get("escutar", "")
+        self.endereco_fixo = None
+        if opcoes.get("endereco"):
+            host, _, porta = str(opcoes["endereco"]).rpartition(":")
+            self.endereco_fixo = (host, int(porta)) if host else (porta, self.porta)
+        self.trava_fixa = opcoes.get("trava")
+        self.trava = TravaHub(self._caminho_trava(), opcoes.get("anunciar"), self.porta,
+                              expira=float(opcoes.get("trava_expira", HUB_TRAVA_EXPIRA)))
+        self.papel = None
+        self.cliente = None
+        self.encerrar = threading.Event()
+        self.thread = None
+
+    @property
+    def pastas_lista(self):
+        # As pastas atuais (trocar_pasta_principal, adicionar_pasta e a recarga
+        # do config.json alteram `pastas`), não as do início
+        return list(pastas) or list(self.pastas_iniciais)
+
+    def _caminho_trava(self):
+        return self.trava_fixa or os.path.join(self.pastas_lista[0]["caminho"], HUB_TRAVA_NOME)
+
+    def _acompanhar_pasta_principal(self):
+        """Leva a trava para a nova pasta principal, se ela mudou."""
+        caminho = self._caminho_trava()
+        if caminho == self.trava.caminho:
+            return
+        logging.info(f"Pasta principal mudou; trava do hub agora em {caminho}")
+        if self.papel == "hub":
             try:
-                root.quit()
-                root.destroy()
-            except Exception as e:
-                logging.warning(f"Erro ao destruir janela tkinter: {e}")
+                self.trava.liberar()
+            except OSError:
+                pass
+        self.trava.caminho = caminho
+        self.trava.visto = None
+        if self.papel == "hub" and not self.trava.adquirir(forcar=self.modo == "hub"):
+            logging.warning("Outra estação já é o hub na nova pasta; passando a cliente")
+            self._virar_cliente()
 
-def salvar_config(pasta_path):
+    def descricao(self):
+        if self.papel == "hub":
+            return f"hub ({servidor_hub.quantidade_clientes() if servidor_hub else 0} estação(ões))"
+        if self.cliente is not None and self.cliente.conectado_a:
+            return f"cliente de {self.cliente.conectado_a}"
+        return "cliente (sem hub)"
 
-    try:
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump({"pasta": pasta_path}, f)
-        logging.info(f"Configuração salva: {pasta_path}")
+    def iniciar(self):
+        """Returns: bool: True se a estação começou a monitorar (como hub ou cliente)."""
+        try:
+            hub = self.modo != "cliente" and self.trava.adquirir(forcar=self.modo == "hub")
+        except OSError as e:
+            logging.error(f"Trava do hub inacessível ({self.trava.caminho}): {e}")
+            hub = False
+        if not (hub and self._virar_hub()):
+            self._virar_cliente()
+        self.thread = threading.Thread(target=self._loop, name="tuba-hub-coordenador", daemon=True)
+        self.thread.start()
         return True
-    except Exception as e:
-        logging.error(f"Erro ao salvar configuração: {e}")
-        return False
 
-def carregar_config():
+    def _loop(self):
+        while not self.encerrar.wait(HUB_BATIMENTO):
+            try:
+                self._acompanhar_pasta_principal()
+                if self.papel == "hub":
+                    if self.modo == "hub":
+                        self.trava.adquirir(forcar=True)
+                    elif not self.trava.renovar():
+                        logging.warning("Outra estação assumiu o hub; passando a cliente")
+                        self._virar_cliente()
+                elif self.modo != "cliente" and self.trava.abandonada():
+                    logging.warning("Hub sem batimento; tentando assumir")
+                    if self.trava.adquirir() and not self._virar_hub():
+                        self._virar_cliente()
+            except OSError as e:
+                logging.error(f"Erro ao verificar a trava do hub: {e}")
 
-    try:
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                pasta_config = json.load(f).get("pasta")
-                if pasta_config and os.path.exists(pasta_config):
-                    logging.info(f"Configuração carregada: {pasta_config}")
-                    return pasta_config
-                else:
-                    logging.warning("Pasta configurada não existe mais")
-        
-        # Se não houver config válida, pede ao usuário
-        pasta = escolher_pasta()
-        if pasta:
-            salvar_config(pasta)
-        return pasta
-    except Exception as e:
-        logging.error(f"Erro ao carregar configuração: {e}")
-        pasta = escolher_pasta()
-        if pasta:
-            salvar_config(pasta)
-        return pasta
+    def _virar_hub(self):
+        global servidor_hub
+        if self.cliente is not None:
+            self._parar_cliente()
+        servidor = ServidorHub(self.trava.sessao, self.escutar, self.porta)
+        try:
+            servidor.iniciar()
+        except OSError as e:
+            logging.error(f"Não foi possível abrir a porta {self.porta} do hub: {e}")
+            self.trava.liberar()
+            return False
+        servidor_hub = servidor
+        if not iniciar_monitor(self.pastas_lista):
+            servidor_hub = None
+            servidor.parar()
+            self.trava.liberar()
+            return False
+        self.papel = "hub"
+        logging.info(f"Esta estação é o hub (trava em {self.trava.caminho})")
+        atualizar_resumo()
+        return True
 
-def tocar_som(caminho):
-    try:
-        if caminho and os.path.exists(caminho):
-            winsound.PlaySound(caminho, winsound.SND_FILENAME | winsound.SND_ASYNC)
-            logging.debug(f"Som tocado: {caminho}")
-    except Exception as e:
-        logging.warning(f"Erro ao tocar som {caminho}: {e}")
+    def _virar_cliente(self):
+        global servidor_hub, motor_regras, indice, despachante, monitor_ativo
+        if self.papel == "hub":
+            parar_monitor()
+            if servidor_hub is not None:
+                servidor_hub.parar()
+                servidor_hub = None
+        # Só a parte do pipeline que exibe as notificações: sem observer,
+        # rastreador, duplicados, metadados nem destinos (o hub já os executa)
+        obter_diario()
+        with monitor_lock:
+            motor_regras = criar_motor_regras()
+            indice = IndiceArquivos()
+            indice.carregar()
+            despachante = criar_despachante()
+            despachante.iniciar()
+            monitor_ativo = True
+        # Pasta que o índice ainda não conhece: uma listagem única, para que a
+        # recuperação avise o que chegar sem hub se esta estação assumir
+        novas = [e for e in self.pastas_lista if e["caminho"] not in indice.pastas]
+        if novas:
+            threading.Thread(target=self._indexar, args=(indice, novas), name="tuba-indice", daemon=True).start()
+        self.cliente = ClienteHub(self.trava, self.endereco_fixo)
+        self.cliente.iniciar()
+        self.papel = "cliente"
+        logging.info("Esta estação é cliente do hub")
+        atualizar_resumo()
+
+    @staticmethod
+    def _indexar(indice_cliente, entradas):
+        for entrada in entradas:
+            try:
+                indice_cliente.diferenca(entrada["caminho"], entrada["recursivo"])
+            except Exception as e:
+                logging.error(f"Erro ao indexar {entrada['caminho']}: {e}")
+
+    def _parar_cliente(self):
+        global despachante, indice, monitor_ativo
+        self.cliente.parar()
+        self.cliente = None
+        with monitor_lock:
+            if despachante is not None:
+                despachante.parar()
+                despachante = None
+            if indice is not None:
+                indice.fechar()
+                indice = None
+            monitor_ativo = False
+
+    def parar(self):
+        global servidor_hub
+        self.encerrar.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.papel == "hub":
+            parar_monitor()
+            if servidor_hub is not None:
+                servidor_hub.parar()
+                servidor_hub = None
+            try:
+                self.trava.liberar()
+            except OSError:
+                pass
+        elif self.cliente is not None:
+            self._parar_cliente()
+        self.papel = None
+
+def iniciar_tuba(pastas_lista):
+    """
+    Inicia o monitor local ou, com a seção "hub" no config.json, o
+    coordenador que decide se esta estação observa ou só recebe.
+
+    Returns:
+        bool: True se o monitoramento começou.
+    """
+    global coordenador_hub
+    opcoes = ler_config().get("hub")
+    if not opcoes or not pastas_lista:
+        return iniciar_monitor(pastas_lista)
+    coordenador = CoordenadorHub(pastas_lista, opcoes)
+    coordenador_hub = coordenador
+    return coordenador.iniciar()
+
+def encerrar_hub():
+    global coordenador_hub
+    if coordenador_hub is not None:
+        coordenador_hub.parar()
+        coordenador_hub = None
 
 # ---------------------------------------------------
-# Monitoramento
+# API de controle local
 # ---------------------------------------------------
-class Handler(FileSystemEventHandler):
+# Um servidor HTTP em 127.0.0.1 (seção "controle" do config.json) para scripts
+# de suporte consultarem e controlarem o TUBA sem a bandeja. Cada requisição
+# roda na própria thread e só lê estado ou agenda trabalho; nenhuma espera a
+# fila de notificações, então as respostas não dependem de uma rajada.
+def estado_monitor():
+    """Returns: dict: Situação do monitor, das pastas e das filas."""
+    return {
+        "app": APP_NAME,
+        "versao": APP_VERSION,
+        "ativo": monitor_ativo,
+        "pausado": monitor_pausado,
+        "saude": saude_monitor,
+        "hub": coordenador_hub.descricao() if coordenador_hub is not None else None,
+        "pastas": [dict(p, agendada=p["caminho"] in watches) for p in list(pastas)],
+        "fila_notificacoes": despachante.pendentes() if despachante is not None else 0,
+        "arquivos_em_escrita": rastreador.quantidade_pendente() if rastreador is not None else 0,
+        "iniciado_em": metricas.iniciado_em,
+    }
 
-    
-    def on_created(self, event):
-        
-        try:
-            if not event.is_directory:
-                nome = os.path.basename(event.src_path)
-                                       
-                logging.info(f"Novo arquivo detectado: {nome})")
-                
-                # Notificação nativa do Windows com contador
-                toaster.show_toast(
-                    f"📄 Novo arquivo detectado!",
-                    f"{nome}",
-                    duration=3,
-                    icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
-                )
-                
-                # Tocar som de alerta
-                tocar_som(ALERT_SOUND)
-        except Exception as e:
-            logging.error(f"Erro ao processar arquivo criado: {e}")
+def contadores_monitor():
+    """Returns: dict: Pedidos de hoje, da última hora e das últimas 24 h, no total e por pasta."""
+    c = obter_contador()
+    def serie(rotulo=None):
+        return {"hoje": c.hoje(rotulo), "ultima_hora": c.ultima_hora(rotulo), "ultimas_24h": c.ultimas_24h(rotulo)}
+    dados = serie()
+    dados["por_pasta"] = {rotulo: serie(rotulo) for rotulo in list(c.por_rotulo)}
+    return dados
 
-def iniciar_monitor(pasta_path):
+def reenviar_ultimos(quantidade):
+    """
+    Exibe de novo, em um único toast, os últimos pedidos notificados (lidos do
+    diário). O reenvio não volta ao diário, aos destinos nem ao hub.
 
-    global observer, monitor_ativo
-    
-    # Validar se a pasta existe
-    if not pasta_path or not os.path.exists(pasta_path):
-        logging.error(f"Pasta inválida ou não existe: {pasta_path}")
-        toaster.show_toast(
-            "⚠️ Erro",
-            "Pasta não encontrada. Selecione uma pasta válida.",
-            duration=3,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
-        )
-        return False
-    
-    # Verificar permissões de leitura
-    if not os.access(pasta_path, os.R_OK):
-        logging.error(f"Sem permissão de leitura na pasta: {pasta_path}")
-        toaster.show_toast(
-            "⚠️ Erro de Permissão",
-            "Sem permissão para acessar a pasta.",
-            duration=3,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
-        )
-        return False
-    
+    Returns:
+        int: Quantidade de pedidos reenviados.
+    """
+    linhas = consultar_diario(
+        "SELECT * FROM eventos WHERE resultado IN ('notificado', 'erro') ORDER BY ts DESC LIMIT ?",
+        (int(quantidade),),
+    )
+    if not linhas or despachante is None:
+        return 0
+    eventos = []
+    for linha in linhas:
+        evento = EventoArquivo(linha["caminho"], linha["rotulo"])
+        evento.tamanho = linha["tamanho"]
+        evento.origem = "reenvio"
+        evento.metadados = {c: linha[c] for c in CAMPOS_PEDIDO if linha.get(c)} or None
+        eventos.append(evento)
+    resumo = eventos[0]
+    for evento in eventos[1:]:
+        resumo.mesclar(evento)
+    despachante.enfileirar(resumo)
+    return len(eventos)
+
+def _controle_pausar(dados):
+    return 200, {"alterado": pausar_monitor(), "pausado": monitor_pausado}
+
+def _controle_retomar(dados):
+    return 200, {"alterado": retomar_monitor(), "pausado": monitor_pausado}
+
+def _controle_adicionar_pasta(dados):
+    if not isinstance(dados, dict) or not dados.get("caminho"):
+        return 400, {"erro": "informe o campo 'caminho'"}
+    # Na query string tudo chega como texto
+    if dados.get("recursivo") in ("true", "false"):
+        dados = dict(dados, recursivo=dados["recursivo"] == "true")
+    erros = []
+    dados = _validar_config(dados, ESQUEMA_PASTA, "pasta", erros)
+    if dados is _INVALIDO or erros:
+        return 400, {"erro": "; ".join(erros)}
+    # Validado aqui para responder sem passar pelo toast de erro de validar_pasta
+    if not os.path.isdir(dados["caminho"]) or not os.access(dados["caminho"], os.R_OK):
+        return 422, {"erro": f"pasta inválida ou inacessível: {dados['caminho']}"}
+    if not adicionar_pasta(dados):
+        return 422, {"erro": f"pasta inválida ou inacessível: {dados['caminho']}"}
+    return 200, {"pastas": list(pastas)}
+
+def _controle_remover_pasta(dados):
+    if not isinstance(dados, dict) or not dados.get("caminho"):
+        return 400, {"erro": "informe o campo 'caminho'"}
+    if not remover_pasta(dados["caminho"]):
+        return 404, {"erro": f"pasta não configurada: {dados['caminho']}"}
+    return 200, {"pastas": list(pastas)}
+
+def _controle_reenviar(dados):
+    dados = dados if isinstance(dados, dict) else {}
     try:
-        with monitor_lock:
-            observer = Observer()
-            event_handler = Handler()
-            observer.schedule(event_handler, pasta_path, recursive=False)
-            observer.start()
-            monitor_ativo = True
-            
-        logging.info(f"Monitor iniciado para: {pasta_path}")
-        toaster.show_toast(
-            "🚀 TUBA Iniciado",
-            f"Monitorando: {pasta_path}",
-            duration=4,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
-        )
-        tocar_som(START_SOUND)
-        return True
-    except Exception as e:
-        logging.error(f"Erro ao iniciar monitor: {e}")
-        toaster.show_toast(
-            "⚠️ Erro",
-            f"Não foi possível iniciar o monitor: {str(e)[:50]}",
-            duration=4,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
-        )
-        return False
+        quantidade = int(dados.get("quantidade", 1))
+    except (TypeError, ValueError):
+        return 400, {"erro": "'quantidade' deve ser um número"}
+    if not 1 <= quantidade <= CONTROLE_REENVIO_MAX:
+        return 400, {"erro": f"'quantidade' deve estar entre 1 e {CONTROLE_REENVIO_MAX}"}
+    if despachante is None:
+        return 409, {"erro": "monitor não está ativo"}
+    return 200, {"reenviados": reenviar_ultimos(quantidade)}
 
-def parar_monitor():
+ROTAS_CONTROLE = {
+    ("GET", "/status"): lambda dados: (200, estado_monitor()),
+    ("GET", "/contadores"): lambda dados: (200, contadores_monitor()),
+    ("POST", "/pausar"): _controle_pausar,
+    ("POST", "/retomar"): _controle_retomar,
+    ("POST", "/pastas"): _controle_adicionar_pasta,
+    ("DELETE", "/pastas"): _controle_remover_pasta,
+    ("POST", "/reenviar"): _controle_reenviar,
+}
 
-    global observer, monitor_ativo
-    
+def _criar_servidor_controle(porta, token=None):
+    """
+    Servidor HTTP da API de controle; http.server só é importado se a porta
+    estiver ativa. Com `token`, as rotas que alteram algo (POST/DELETE) exigem
+    o cabeçalho X-Tuba-Token; as consultas (GET) continuam abertas.
+    """
+    import hmac
+    import http.server
+    from urllib.parse import urlsplit, parse_qsl
+
+    hosts = set()
+
+    class ControleHTTP(http.server.BaseHTTPRequestHandler):
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _tratar(self):
+            partes = urlsplit(self.path)
+            # Host diferente (DNS rebinding) ou alteração sem Content-Type JSON
+            # (formulário de uma página web, que não passa por preflight) não
+            # chegam às rotas
+            if self.headers.get("Host") not in hosts:
+                return self._responder(403, {"erro": "host não permitido"})
+            if token and self.command != "GET" and not hmac.compare_digest(
+                    self.headers.get("X-Tuba-Token", "").encode("utf-8"), token.encode("utf-8")):
+                return self._responder(401, {"erro": "token inválido"})
+            rota = ROTAS_CONTROLE.get((self.command, partes.path.rstrip("/") or "/"))
+            if rota is None:
+                rotas = [f"{metodo} {caminho}" for metodo, caminho in ROTAS_CONTROLE]
+                return self._responder(404, {"erro": "rota desconhecida", "rotas": rotas})
+            dados = dict(parse_qsl(partes.query))
+            if self.command != "GET":
+                if not self.headers.get("Content-Type", "").startswith("application/json"):
+                    return self._responder(415, {"erro": "use Content-Type: application/json"})
+                try:
+                    tamanho = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    tamanho = -1
+                if tamanho < 0:
+                    return self._responder(400, {"erro": "Content-Length inválido"})
+                if tamanho:
+                    try:
+                        dados.update(json.loads(self.rfile.read(tamanho).decode("utf-8")))
+                    except (ValueError, TypeError, AttributeError):
+                        return self._responder(400, {"erro": "JSON inválido"})
+            try:
+                status, corpo = rota(dados)
+            except Exception as e:
+                logging.error(f"Erro na API de controle ({self.command} {partes.path}): {e}")
+                status, corpo = 500, {"erro": str(e)}
+            self._responder(status, corpo)
+
+        do_GET = do_POST = do_DELETE = _tratar
+
+        def log_message(self, formato, *args):
+            logging.debug(f"controle: {formato % args}")
+
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", porta), ControleHTTP)
+    servidor.daemon_threads = True
+    porta = servidor.server_address[1]
+    hosts.update({f"127.0.0.1:{porta}", f"localhost:{porta}"})
+    return servidor
+
+def iniciar_controle():
+    """
+    Inicia a API de controle local (seção "controle" do config.json). Sem
+    `token` configurado, gera um e o grava no config.json: qualquer processo
+    da máquina alcança a porta, mas só quem lê o config.json pode alterar algo.
+    """
+    global servidor_controle
+    opcoes = ler_config().get("controle") or {}
+    porta = int(opcoes.get("porta", CONTROLE_PORTA) or 0)
+    if not porta:
+        return
+    token = opcoes.get("token")
+    if not token:
+        import secrets
+        token = secrets.token_urlsafe(24)
+        try:
+            configuracao.atualizar(controle={**opcoes, "token": token})
+            logging.info("Token da API de controle gerado em config.json (controle.token)")
+        except OSError as e:
+            logging.error(f"Erro ao gravar o token da API de controle: {e}")
     try:
-        with monitor_lock:
-            if observer is not None and observer.is_alive():
-                observer.stop()
-                observer.join(timeout=5)  # Aguardar até 5 segundos
-                monitor_ativo = False
-                logging.info("Monitor parado com sucesso")
-                tocar_som(PAUSE_SOUND)
-                return True
-            else:
-                logging.warning("Monitor não estava ativo")
-                monitor_ativo = False
-                return False
-    except Exception as e:
-        logging.error(f"Erro ao parar monitor: {e}")
-        monitor_ativo = False
-        return False
+        servidor_controle = _criar_servidor_controle(porta, token)
+    except OSError as e:
+        logging.warning(f"API de controle não iniciada na porta {porta}: {e}")
+        return
+    threading.Thread(target=servidor_controle.serve_forever, name="tuba-controle", daemon=True).start()
+    logging.info(f"API de controle em http://127.0.0.1:{porta}/status")
+
+def encerrar_controle():
+    global servidor_controle
+    if servidor_controle is not None:
+        servidor_controle.shutdown()
+        servidor_controle.server_close()
+        servidor_controle = None
 
 # ---------------------------------------------------
 # Abertura da pasta monitorada (nova função solicitada)
@@ -265,39 +5155,39 @@ def abrir_pasta(icon, item):
     global pasta
     
     try:
-        # Obter caminho da pasta
-        caminho = pasta or carregar_config() or ""
+        # Obter caminho da pasta principal
+        if not pasta:
+            pastas[:] = carregar_config()
+            pasta = pastas[0]["caminho"] if pastas else None
+        caminho = pasta or ""
         logging.info(f"Tentando abrir pasta: {caminho}")
         
         # Verificar se o caminho existe
         if not caminho:
             logging.warning("Nenhuma pasta configurada")
-            toaster.show_toast(
+            notificar(
                 "⚠️ Nenhuma pasta válida",
                 "Defina uma pasta primeiro.",
-                duration=3,
-                icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                duracao=3
             )
             return
             
         if not os.path.exists(caminho):
             logging.error(f"Pasta não existe: {caminho}")
-            toaster.show_toast(
+            notificar(
                 "⚠️ Pasta não encontrada",
                 "A pasta configurada não existe.",
-                duration=3,
-                icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                duracao=3
             )
             return
         
         # Verificar permissões
         if not os.access(caminho, os.R_OK):
             logging.warning(f"Sem permissão para acessar: {caminho}")
-            toaster.show_toast(
+            notificar(
                 "⚠️ Erro de Permissão",
                 "Sem permissão para acessar a pasta.",
-                duration=3,
-                icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                duracao=3
             )
             return
         
@@ -315,11 +5205,10 @@ def abrir_pasta(icon, item):
                 logging.info("Pasta aberta com explorer")
             except Exception as e2:
                 logging.error(f"Erro ao abrir com explorer: {e2}")
-                toaster.show_toast(
+                notificar(
                     "⚠️ Erro",
                     "Não foi possível abrir a pasta.",
-                    duration=3,
-                    icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                    duracao=3
                 )
         except Exception as e1:
             logging.error(f"Erro ao abrir pasta: {e1}")
@@ -329,20 +5218,18 @@ def abrir_pasta(icon, item):
                 logging.info("Pasta aberta com fallback shell")
             except Exception as e3:
                 logging.error(f"Erro no fallback: {e3}")
-                toaster.show_toast(
+                notificar(
                     "⚠️ Erro",
                     "Não foi possível abrir a pasta.",
-                    duration=3,
-                    icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                    duracao=3
                 )
                 
     except Exception as e:
         logging.error(f"Erro inesperado ao abrir pasta: {e}", exc_info=True)
-        toaster.show_toast(
+        notificar(
             "⚠️ Erro",
             "Erro ao processar solicitação.",
-            duration=3,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+            duracao=3
         )
 
 def mostrar_sobre(icon, item):
@@ -353,11 +5240,10 @@ def mostrar_sobre(icon, item):
         mensagem += "Sistema de monitoramento profissional\n"
         mensagem += "com notificações em tempo real."
         
-        toaster.show_toast(
+        notificar(
             f"ℹ️ Sobre - {APP_NAME}",
             mensagem,
-            duration=6,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+            duracao=6
         )
         logging.info("Informações 'Sobre' exibidas")
     except Exception as e:
@@ -366,78 +5252,189 @@ def mostrar_sobre(icon, item):
 # ---------------------------------------------------
 # Ícone da bandeja
 # ---------------------------------------------------
-def alterar_pasta(icon, item):
-    
-    global pasta
-    
+def _em_segundo_plano(funcao):
+    """Roda a ação do menu em outra thread para não travar o loop da bandeja."""
+    def acao(icon, item):
+        threading.Thread(target=funcao, name="tuba-menu", daemon=True).start()
+    return acao
+
+def _escolher_pasta_exclusivo():
+    """
+    Abre o diálogo de seleção, um de cada vez.
+
+    Returns:
+        str: Pasta escolhida, ou None se cancelado/já havia um diálogo aberto.
+    """
+    if not seletor_lock.acquire(blocking=False):
+        logging.info("Seleção de pasta já está aberta")
+        return None
+    try:
+        return escolher_pasta()
+    finally:
+        seletor_lock.release()
+
+def alterar_pasta():
     try:
         logging.info("Alterando pasta monitorada")
-        parar_monitor()
-        
-        # Pequeno delay para evitar comportamento suspeito
-        time.sleep(0.3)
-        
-        nova = escolher_pasta()
-        if nova and os.path.exists(nova):
-            pasta = nova
-            salvar_config(pasta)
-            
-            # Delay adicional antes de reiniciar
-            time.sleep(0.3)
-            
-            threading.Thread(target=iniciar_monitor, args=(pasta,), daemon=True).start()
-            toaster.show_toast(
-                "📂 Pasta alterada",
-                f"Agora monitorando:\n{pasta}",
-                duration=3,
-                icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
-            )
-            logging.info(f"Pasta alterada para: {pasta}")
-        elif nova is None:
+        # O monitor segue ativo na pasta atual enquanto o diálogo está aberto
+        nova = _escolher_pasta_exclusivo()
+        if nova is None:
             logging.info("Usuário cancelou a seleção de pasta")
-            # Reiniciar monitor com pasta anterior se existir
-            if pasta and os.path.exists(pasta):
-                threading.Thread(target=iniciar_monitor, args=(pasta,), daemon=True).start()
-                toaster.show_toast(
-                    "ℹ️ Seleção cancelada",
-                    "Mantendo pasta atual.",
-                    duration=2,
-                    icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
-                )
-        else:
+            return
+        if not os.path.exists(nova):
             logging.warning("Nova pasta não existe ou inválida")
-            # Reiniciar monitor com pasta anterior se existir
-            if pasta and os.path.exists(pasta):
-                threading.Thread(target=iniciar_monitor, args=(pasta,), daemon=True).start()
-            toaster.show_toast(
+            notificar(
                 "⚠️ Pasta inválida",
                 "A pasta selecionada não existe.",
-                duration=3,
-                icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                duracao=3
+            )
+            return
+        if trocar_pasta_principal(nova):
+            notificar(
+                "📂 Pasta alterada",
+                f"Agora monitorando:\n{pasta}",
+                duracao=3
             )
+            logging.info(f"Pasta alterada para: {pasta}")
     except Exception as e:
         logging.error(f"Erro ao alterar pasta: {e}")
-        toaster.show_toast(
+        notificar(
             "⚠️ Erro",
             f"Erro ao alterar pasta: {str(e)[:30]}",
-            duration=3,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+            duracao=3
+        )
+
+def adicionar_pasta_menu():
+    nova = _escolher_pasta_exclusivo()
+    if not nova:
+        logging.info("Usuário cancelou a seleção de pasta")
+        return
+    if adicionar_pasta(nova):
+        notificar(
+            "📂 Pasta adicionada",
+            f"Agora monitorando também:\n{nova}",
+            duracao=3
         )
 
+def alternar_pausa(icon, item):
+    if monitor_pausado:
+        retomar_monitor()
+    else:
+        pausar_monitor()
+
+def _acao_remover_pasta(caminho):
+    def acao(icon, item):
+        remover_pasta(caminho)
+    return acao
+
+def itens_remover_pasta():
+    """Itens do submenu "Remover pasta", gerados a cada abertura do menu."""
+    from pystray import MenuItem as item
+    return tuple(item(f"{p['rotulo']} ({p['caminho']})", _acao_remover_pasta(p["caminho"])) for p in pastas)
+
+class AtualizadorResumo:
+    """
+    Mantém o título (tooltip) da bandeja com o status e os contadores do dia
+    e salva os contadores em disco periodicamente.
+
+    atualizar_resumo() apenas sinaliza um Event; esta thread redesenha no
+    máximo uma vez a cada `intervalo_minimo` segundos, então nenhuma thread
+    de detecção espera pela bandeja.
+    """
+
+    def __init__(self, icone=None, intervalo_minimo=RESUMO_INTERVALO_MINIMO,
+                 intervalo_salvar=CONTADORES_INTERVALO_SALVAR):
+        self.icone = icone
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_salvar = intervalo_salvar
+        self.sinal = threading.Event()
+        self.encerrar = threading.Event()
+        self.thread = None
+
+    def iniciar(self):
+        self.sinal.set()  # primeira atualização imediata
+        self.thread = threading.Thread(target=self._loop, name="tuba-resumo", daemon=True)
+        self.thread.start()
+
+    def titulo(self):
+        if saude_monitor != "ok" and not monitor_pausado:
+            status = f"🟠 {saude_monitor}"
+        else:
+            status = "🟢 Ativo" if monitor_ativo and not monitor_pausado else "🔴 Pausado"
+        if coordenador_hub is not None:
+            status += f" · {coordenador_hub.descricao()}"
+        c = obter_contador()
+        return f"{APP_NAME} - {status}\nHoje: {c.hoje()} pedidos · última hora: {c.ultima_hora()}"
+
+    def _aplicar(self):
+        if self.icone is None:
+            return
+        titulo = self.titulo()
+        if titulo != self.icone.title:
+            self.icone.title = titulo
+
+    def _loop(self):
+        proximo_salvar = time.monotonic() + self.intervalo_salvar
+        while not self.encerrar.is_set():
+            # Sem sinais, redesenha a cada minuto para a "última hora" e a
+            # virada do dia avançarem sozinhas
+            self.sinal.wait(timeout=60)
+            self.sinal.clear()
+            try:
+                self._aplicar()
+                if time.monotonic() >= proximo_salvar:
+                    obter_contador().salvar()
+                    proximo_salvar = time.monotonic() + self.intervalo_salvar
+            except Exception as e:
+                logging.error(f"Erro ao atualizar resumo da bandeja: {e}")
+            self.encerrar.wait(self.intervalo_minimo)
+
+    def parar(self):
+        self.encerrar.set()
+        self.sinal.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        obter_contador().salvar()
+
+def atualizar_resumo():
+    """Pede uma atualização do tooltip (não bloqueia)."""
+    if atualizador_resumo is not None:
+        atualizador_resumo.sinal.set()
+
+def iniciar_resumo(icone=None):
+    global atualizador_resumo
+    obter_contador()
+    atualizador_resumo = AtualizadorResumo(icone)
+    atualizador_resumo.iniciar()
+    return atualizador_resumo
+
+def encerrar_resumo():
+    global atualizador_resumo
+    if atualizador_resumo is not None:
+        atualizador_resumo.parar()
+        atualizador_resumo = None
+
 def sair(icon, item):
 
     try:
         logging.info("Iniciando encerramento do aplicativo")
         
         # Parar o monitor de forma segura
+        encerrar_hub()
         parar_monitor()
+        encerrar_diario()
+        encerrar_destinos()
+        encerrar_resumo()
+        encerrar_metricas()
+        encerrar_controle()
+        configuracao.parar()
         
         # Notificar o usuário
-        toaster.show_toast(
+        notificar(
             "👋 Encerrando TUBA",
             "O monitor foi encerrado.",
-            duration=1,
-            icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+            duracao=1
         )
         
         # Aguardar brevemente para garantir a notificação
@@ -458,6 +5455,10 @@ def sair(icon, item):
 
 def iniciar_bandeja():
     try:
+        import pystray
+        from pystray import MenuItem as item, Menu
+        from PIL import Image
+
         # Validar se o ícone existe
         if not os.path.exists(ICON_PATH):
             logging.error(f"Ícone não encontrado: {ICON_PATH}")
@@ -473,7 +5474,13 @@ def iniciar_bandeja():
                  
             # Seção de pastas
             item("📂 Abrir pasta monitorada", abrir_pasta),
-            item("🔄 Alterar pasta monitorada", alterar_pasta),
+            item("🔄 Alterar pasta monitorada", _em_segundo_plano(alterar_pasta)),
+            item("➕ Adicionar pasta", _em_segundo_plano(adicionar_pasta_menu)),
+            item("➖ Remover pasta", Menu(itens_remover_pasta)),
+            Menu.SEPARATOR,
+
+            # Pausa: só silencia; ao retomar, o que chegou é avisado em um resumo
+            item(lambda i: "▶️ Retomar" if monitor_pausado else "⏸️ Pausar", alternar_pausa),
             Menu.SEPARATOR,
             
             # Seção de informações e configurações
@@ -484,26 +5491,66 @@ def iniciar_bandeja():
             item("❌ Sair", sair)
         )
         
-        # Criar e executar ícone da bandeja com título dinâmico
+        # Criar e executar ícone da bandeja; o título é mantido pelo AtualizadorResumo
         titulo = f"{APP_NAME} v{APP_VERSION} - {'🟢 Ativo' if monitor_ativo else '🔴 Pausado'}"
         icone = pystray.Icon("TUBA", image, titulo, menu)
+        iniciar_resumo(icone)
         logging.info("Iniciando ícone da bandeja")
         icone.run()
     except Exception as e:
         logging.error(f"Erro ao iniciar bandeja: {e}")
         # Em caso de erro crítico, notificar e encerrar
         try:
-            toaster.show_toast(
+            notificar(
                 "⚠️ Erro Crítico",
                 "Não foi possível iniciar a interface.",
-                duration=5
+                duracao=5
             )
             time.sleep(5)
         except:
             pass
         sys.exit(1)
 
+def executar_headless(pastas_lista):
+    """Roda apenas o monitor e o pipeline de notificação, sem bandeja, até Ctrl+C."""
+    if not iniciar_tuba(pastas_lista):
+        sys.exit(1)
+    iniciar_resumo()
+    logging.info("Modo headless: pressione Ctrl+C para encerrar")
+    try:
+        while True:
+            time.sleep(1)
+    finally:
+        encerrar_hub()
+        parar_monitor()
+        encerrar_diario()
+        encerrar_destinos()
+        encerrar_resumo()
+        encerrar_metricas()
+        encerrar_controle()
+        configuracao.parar()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="TUBA", description=APP_DESCRIPTION)
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="roda apenas o monitor, sem bandeja; as notificações vão para o log/console",
+    )
+    subcomandos = parser.add_subparsers(dest="comando")
+    parser_pedidos = subcomandos.add_parser("pedidos", help="consulta o diário de pedidos e sai")
+    parser_pedidos.add_argument("consulta", choices=["hoje", "entre", "ultimos"])
+    parser_pedidos.add_argument("valores", nargs="*", help="entre: HORA_INICIO HORA_FIM; ultimos: QUANTIDADE")
+    parser_pedidos.add_argument("--dia", help="AAAA-MM-DD (padrão: hoje)")
+    parser_pedidos.add_argument("--canal", help="filtra pelo rótulo da pasta")
+    parser_pedidos.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+    if args.comando == "pedidos":
+        executar_consulta_pedidos(args)
+        sys.exit(0)
+    modo_headless = args.headless
+    configurar_logging()
+
     try:
         logging.info(f"=== Iniciando {APP_NAME} v{APP_VERSION} ===")
         logging.info(f"Autor: {APP_AUTHOR}")
@@ -512,38 +5559,46 @@ if __name__ == "__main__":
         # Verificar recursos necessários
         if not verificar_recursos():
             logging.warning("Alguns recursos estão faltando, mas continuando...")
+
+        # Sons ficam em memória: nenhum evento relê o WAV do disco
+        cache_sons.precarregar([START_SOUND, ALERT_SOUND, PAUSE_SOUND])
+        iniciar_metricas()
+        iniciar_controle()
         
         # Carregar configuração
-        pasta = carregar_config()
-        logging.info(f"Pasta carregada na inicialização: {pasta}")
+        pastas[:] = carregar_config()
+        pasta = pastas[0]["caminho"] if pastas else None
+        logging.info(f"Pastas carregadas na inicialização: {[p['caminho'] for p in pastas]}")
         if not pasta:
             logging.error("Nenhuma pasta selecionada")
-            toaster.show_toast(
+            notificar(
                 "⚠️ Nenhuma pasta selecionada",
                 "Selecione uma pasta para monitorar.",
-                duration=4,
-                icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                duracao=4
             )
             time.sleep(4)
             sys.exit(1)
         
-        # Validar pasta antes de iniciar
-        if not os.path.exists(pasta):
-            logging.error(f"Pasta configurada não existe: {pasta}")
-            toaster.show_toast(
+        # Validar pastas antes de iniciar
+        if not any(os.path.exists(p["caminho"]) for p in pastas):
+            logging.error(f"Pastas configuradas não existem: {[p['caminho'] for p in pastas]}")
+            notificar(
                 "⚠️ Pasta inválida",
                 "A pasta configurada não existe mais.",
-                duration=4,
-                icon_path=ICON_PATH if os.path.exists(ICON_PATH) else None
+                duracao=4
             )
             time.sleep(4)
             sys.exit(1)
+
+        # Edições no config.json passam a valer sem reiniciar
+        configuracao.observar()
         
-        # Delay inicial para evitar comportamento suspeito
-        time.sleep(0.5)
-        
+        if modo_headless:
+            executar_headless(list(pastas))
+            sys.exit(0)
+
         # Iniciar monitoramento em thread daemon
-        threading.Thread(target=iniciar_monitor, args=(pasta,), daemon=True).start()
+        threading.Thread(target=iniciar_tuba, args=(list(pastas),), daemon=True).start()
         
         # Iniciar interface da bandeja (loop principal)
         iniciar_bandeja()
@@ -554,10 +5609,10 @@ if __name__ == "__main__":
     except Exception as e:
         logging.error(f"Erro crítico na inicialização: {e}", exc_info=True)
         try:
-            toaster.show_toast(
+            notificar(
                 "⚠️ Erro Crítico",
                 f"Erro ao iniciar: {str(e)[:50]}",
-                duration=5
+                duracao=5
             )
             time.sleep(5)
         except: